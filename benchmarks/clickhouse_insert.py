@@ -0,0 +1,74 @@
+"""
+Arrow vs row-list insert benchmark for processed windows.
+
+Inserts batches of synthetic windows into a scratch copy of analytics.processed
+with client.insert (row serialisation) and client.insert_arrow (Arrow format),
+reporting build and insert time separately.
+
+    CLICKHOUSE_HOST=localhost python -m benchmarks.clickhouse_insert --sizes 1000,10000,100000
+"""
+
+import argparse
+import time
+
+import clickhouse_connect
+
+from benchmarks.clickhouse_transport import _synthetic_window
+from src.configs.clickhouse_conf import ClickhouseConf
+from src.models import arrow
+from src.services.clickhouse import transform_processor_output
+
+DATABASE = "bench_insert"
+TABLE = f"{DATABASE}.processed"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="windows per batch")
+    parser.add_argument("--metrics", type=int, default=15, help="metrics per window")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conf = ClickhouseConf()
+    client = clickhouse_connect.get_client(
+        host=conf.host, port=conf.port, username=conf.user, password=conf.password
+    )
+    client.command(f"CREATE DATABASE IF NOT EXISTS {DATABASE}")
+    client.command(f"DROP TABLE IF EXISTS {TABLE}")
+    client.command(
+        f"CREATE TABLE {TABLE} AS analytics.processed ENGINE = MergeTree"
+        " ORDER BY (snssai_sst, snssai_sd, dnn, event, window_start)"
+    )
+
+    print(f"{'batch':>8}  {'path':<6}{'build ms':>10}{'insert ms':>11}{'rows/s':>12}")
+    for size in map(int, args.sizes.split(",")):
+        rows = [transform_processor_output(_synthetic_window(i, args.metrics)) for i in range(size)]
+
+        for path in ("rows", "arrow"):
+            build = insert = 0.0
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                if path == "arrow":
+                    payload = arrow.processed_table(rows)
+                else:
+                    payload = [list(r.values()) for r in rows]
+                built = time.perf_counter()
+                if path == "arrow":
+                    client.insert_arrow(TABLE, payload)
+                else:
+                    client.insert(TABLE, payload, column_names=list(rows[0].keys()))
+                done = time.perf_counter()
+                build += built - started
+                insert += done - built
+
+            total = (build + insert) / args.repeat
+            print(
+                f"{size:>8}  {path:<6}{build / args.repeat * 1000:>10.1f}"
+                f"{insert / args.repeat * 1000:>11.1f}{size / total:>12,.0f}"
+            )
+
+    client.command(f"DROP DATABASE {DATABASE}")
+
+
+if __name__ == "__main__":
+    main()
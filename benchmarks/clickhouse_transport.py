@@ -0,0 +1,94 @@
+"""
+Throughput benchmark for the ClickHouse transports.
+
+For every transport (http, native) and wire compression (none, lz4, zstd) it
+batch-inserts synthetic processed windows into a scratch table and then
+selects them back, reporting rows/s for both. Clients are built exactly as
+ClickHouseService builds them.
+
+    CLICKHOUSE_HOST=localhost python -m benchmarks.clickhouse_transport -n 200000 --batch 5000
+"""
+
+import argparse
+import random
+import time
+from itertools import product
+
+from src.configs.clickhouse_conf import ClickhouseConf
+from src.services.clickhouse import ClickHouseService, transform_processor_output
+
+DATABASE = "bench_transport"
+TABLE = f"{DATABASE}.processed"
+
+
+def _synthetic_window(i: int, n_metrics: int) -> dict:
+    start = 1767225600 + i * 60
+    return {
+        "tags": {
+            "snssai_sst": str(1 + i % 3),
+            "snssai_sd": f"{i % 16:06d}",
+            "dnn": random.choice(["internet", "ims", "iot"]),
+            "event": "PERF_DATA",
+            "supi": f"imsi-00101{i % 5000:09d}",
+        },
+        "window_start": start,
+        "window_end": start + 60,
+        "sample_count": random.randrange(1, 120),
+        "metrics": {
+            f"m{k}": {
+                "mean": random.random() * 100,
+                "min": random.random(),
+                "max": random.random() * 200,
+                "std": random.random(),
+                "count": 60,
+            }
+            for k in range(n_metrics)
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=5000, help="rows per insert")
+    parser.add_argument("--metrics", type=int, default=8, help="metrics per window")
+    parser.add_argument("--transports", default="http,native")
+    parser.add_argument("--compressions", default="none,lz4,zstd")
+    parser.add_argument("--http-port", type=int, default=8123)
+    parser.add_argument("--native-port", type=int, default=9000)
+    args = parser.parse_args()
+
+    rows = [transform_processor_output(_synthetic_window(i, args.metrics)) for i in range(args.rows)]
+    column_names = list(rows[0].keys())
+    values = [list(r.values()) for r in rows]
+
+    conf = ClickhouseConf()
+    ports = {"http": args.http_port, "native": args.native_port}
+    print(f"{'transport':<10}{'compression':<13}{'insert rows/s':>15}{'select rows/s':>15}")
+    for transport, compression in product(args.transports.split(","), args.compressions.split(",")):
+        conf.transport, conf.compression, conf.port = transport, compression, ports[transport]
+        client = ClickHouseService(pool_size=0)._create_client()
+
+        client.command(f"CREATE DATABASE IF NOT EXISTS {DATABASE}")
+        client.command(f"DROP TABLE IF EXISTS {TABLE}")
+        client.command(
+            f"CREATE TABLE {TABLE} AS analytics.processed ENGINE = MergeTree"
+            " ORDER BY (snssai_sst, snssai_sd, dnn, event, window_start)"
+        )
+
+        started = time.perf_counter()
+        for i in range(0, len(values), args.batch):
+            client.insert(TABLE, values[i : i + args.batch], column_names=column_names)
+        insert_rate = len(values) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        selected = client.query(f"SELECT * FROM {TABLE}").result_rows
+        select_rate = len(selected) / (time.perf_counter() - started)
+
+        print(f"{transport:<10}{compression:<13}{insert_rate:>15,.0f}{select_rate:>15,.0f}")
+        client.command(f"DROP DATABASE {DATABASE}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Bytes-on-disk benchmark for decision payload storage.
+
+Loads the same synthetic decisions into scratch tables using the old layout
+(base64 text, default codec) and the new ones (binary gzip / binary zstd with
+ZSTD(1)), then reports the size of the payload column from system.columns.
+
+    CLICKHOUSE_HOST=localhost CLICKHOUSE_PORT=8123 python -m benchmarks.decision_storage -n 20000
+"""
+
+import argparse
+import base64
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import clickhouse_connect
+
+from src.configs.clickhouse_conf import ClickhouseConf
+from src.models.decision import compress
+
+DATABASE = "bench_decisions"
+
+LAYOUTS = {
+    # name: (column definition, encoder)
+    "base64_text": (
+        "String",
+        lambda doc: base64.b64encode(compress("gzip", doc)).decode("ascii"),
+    ),
+    "binary_gzip": ("String CODEC(ZSTD(1))", lambda doc: compress("gzip", doc)),
+    "binary_zstd": ("String CODEC(ZSTD(1))", lambda doc: compress("zstd", doc)),
+}
+
+
+def _synthetic_decision(cell_id: int, ts: datetime, n_ues: int) -> bytes:
+    doc = {
+        "cell_id": cell_id,
+        "timestamp": ts.isoformat().replace("+00:00", "Z"),
+        "model": "handover-v3",
+        "actions": [
+            {
+                "type": random.choice(["handover", "keep", "throttle"]),
+                "supi": f"imsi-00101{random.randrange(10**9):09d}",
+                "target_cell": random.randrange(1, 64),
+                "score": round(random.random(), 4),
+                "features": {f"f{i}": round(random.gauss(0, 1), 5) for i in range(16)},
+            }
+            for _ in range(n_ues)
+        ],
+    }
+    return json.dumps(doc).encode("utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--rows", type=int, default=10000)
+    parser.add_argument("--ues", type=int, default=20, help="actions per decision")
+    args = parser.parse_args()
+
+    conf = ClickhouseConf()
+    client = clickhouse_connect.get_client(
+        host=conf.host, port=conf.port, username=conf.user, password=conf.password
+    )
+    client.command(f"CREATE DATABASE IF NOT EXISTS {DATABASE}")
+
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    docs = [
+        (i % 32, start + timedelta(seconds=i), _synthetic_decision(i % 32, start + timedelta(seconds=i), args.ues))
+        for i in range(args.rows)
+    ]
+
+    print(f"{'layout':<14}{'on disk':>14}{'uncompressed':>16}{'bytes/row':>12}")
+    for name, (column, encode) in LAYOUTS.items():
+        table = f"{DATABASE}.{name}"
+        client.command(f"DROP TABLE IF EXISTS {table}")
+        client.command(
+            f"CREATE TABLE {table} (cell_id Int32, timestamp DateTime64(3), compressed_data {column})"
+            " ENGINE = MergeTree ORDER BY (cell_id, timestamp)"
+        )
+        client.insert(
+            table,
+            [[cell, ts, encode(doc)] for cell, ts, doc in docs],
+            column_names=["cell_id", "timestamp", "compressed_data"],
+        )
+        client.command(f"OPTIMIZE TABLE {table} FINAL")
+        compressed, uncompressed = client.query(
+            "SELECT data_compressed_bytes, data_uncompressed_bytes FROM system.columns"
+            " WHERE database = {db:String} AND table = {t:String} AND name = 'compressed_data'",
+            parameters={"db": DATABASE, "t": name},
+        ).result_rows[0]
+        print(f"{name:<14}{compressed:>14,}{uncompressed:>16,}{compressed / args.rows:>12.1f}")
+
+    client.command(f"DROP DATABASE {DATABASE}")
+
+
+if __name__ == "__main__":
+    main()
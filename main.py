@@ -6,8 +6,10 @@ from threading import Thread
 from fastapi import FastAPI
 
 from src.auth_middleware import AuthMiddleware
+from src.compression_middleware import CompressionMiddleware
 from src.routers.v1 import v1_router
 from src.services.databases import ClickHouse, Influx
+from src.services.decision_decoder import DecisionDecoder
 from src.sink import KafkaSinkManager
 
 from policy_client import PolicyClient, SyncPolicyClient
@@ -115,6 +117,8 @@ async def lifespan(app: FastAPI):
             traceback.print_exc()
 
     sink_manager = KafkaSinkManager(KAFKA_HOST, KAFKA_PORT, policy_client)
+    # Ingest cardinality sketches for /api/v1/cardinality (None when disabled)
+    app.state.cardinality = sink_manager.cardinality
 
     def kafka_worker():
         """
@@ -142,12 +146,17 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Warning: Error stopping Kafka sink: {e}")
 
-    ClickHouse.service.client.close()
+    DecisionDecoder.shutdown()
+    ClickHouse.service.close()
+    await Influx.service.close_async()
+    # Flushes points still queued by the batching write API
+    Influx.service.close()
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(AuthMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.include_router(v1_router, prefix="/api/v1", tags=["v1"])
 
 if ENCRYPTION_ENABLED:
@@ -1,11 +1,14 @@
 CREATE DATABASE IF NOT EXISTS analytics;
 
+-- compressed_data holds the decoded (binary) gzip/zstd payload, not base64 text.
+-- The payload is already entropy-coded, so a cheap ZSTD level is enough to pick
+-- up the framing/header redundancy without burning CPU on merges.
 CREATE TABLE IF NOT EXISTS analytics.decisions (
     cell_id Int32,
     id UInt64,
     timestamp DateTime64(3),
-    compression_method String,
-    compressed_data String
+    compression_method LowCardinality(String),
+    compressed_data String CODEC(ZSTD(1))
 ) ENGINE = ReplacingMergeTree()
 PARTITION BY toYYYYMM(timestamp)
 ORDER BY (cell_id, timestamp)
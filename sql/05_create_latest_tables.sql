@@ -0,0 +1,52 @@
+-- Current state per cell / per slice group, for polling control loops.
+-- ReplacingMergeTree keeps the row with the highest version column per key;
+-- readers use FINAL, which is cheap because there is one row per key.
+
+CREATE TABLE IF NOT EXISTS analytics.decisions_latest
+(
+    cell_id            Int32,
+    id                 UInt64,
+    timestamp          DateTime64(3),
+    compression_method LowCardinality(String),
+    compressed_data    String CODEC(ZSTD(1))
+)
+ENGINE = ReplacingMergeTree(timestamp)
+ORDER BY cell_id;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.decisions_latest_mv
+TO analytics.decisions_latest
+AS
+SELECT cell_id, id, timestamp, compression_method, compressed_data
+FROM analytics.decisions;
+
+CREATE TABLE IF NOT EXISTS analytics.processed_latest
+(
+    window_start            DateTime64(3),
+    window_end              DateTime64(3),
+    window_duration_seconds UInt32,
+    sample_count            UInt32,
+    snssai_sst              String,
+    snssai_sd               String,
+    dnn                     String,
+    event                   String,
+    ue_tags                 Map(String, String),
+    metrics                 Map(String, Float64)
+)
+ENGINE = ReplacingMergeTree(window_end)
+ORDER BY (snssai_sst, snssai_sd, dnn, event, window_duration_seconds);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.processed_latest_mv
+TO analytics.processed_latest
+AS
+SELECT
+    window_start,
+    window_end,
+    window_duration_seconds,
+    sample_count,
+    snssai_sst,
+    snssai_sd,
+    dnn,
+    event,
+    ue_tags,
+    metrics
+FROM analytics.processed;
@@ -0,0 +1,43 @@
+-- Convert analytics.decisions.compressed_data from base64 text to raw bytes.
+--
+-- Run once, with data-storage stopped, BEFORE deploying the version that writes
+-- binary payloads (rows written afterwards are already binary and must not be
+-- decoded a second time):
+--
+--   clickhouse-client --multiquery < sql/migrations/001_decisions_binary_payload.sql
+--
+-- The first and last statements report bytes on disk for the column so the
+-- saving can be recorded (see also benchmarks/decision_storage.py).
+
+-- Before
+SELECT
+    name,
+    type,
+    compression_codec,
+    formatReadableSize(data_compressed_bytes) AS on_disk,
+    formatReadableSize(data_uncompressed_bytes) AS uncompressed
+FROM system.columns
+WHERE database = 'analytics' AND table = 'decisions' AND name = 'compressed_data';
+
+ALTER TABLE analytics.decisions
+    MODIFY COLUMN compression_method LowCardinality(String);
+
+ALTER TABLE analytics.decisions
+    MODIFY COLUMN compressed_data String CODEC(ZSTD(1));
+
+-- Rewrites every part, which also applies the new codec to existing data
+ALTER TABLE analytics.decisions
+    UPDATE compressed_data = base64Decode(compressed_data) WHERE 1
+    SETTINGS mutations_sync = 2;
+
+OPTIMIZE TABLE analytics.decisions FINAL;
+
+-- After
+SELECT
+    name,
+    type,
+    compression_codec,
+    formatReadableSize(data_compressed_bytes) AS on_disk,
+    formatReadableSize(data_uncompressed_bytes) AS uncompressed
+FROM system.columns
+WHERE database = 'analytics' AND table = 'decisions' AND name = 'compressed_data';
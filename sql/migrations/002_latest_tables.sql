@@ -0,0 +1,29 @@
+-- Create the "latest" tables on an existing deployment and backfill them.
+--
+--   clickhouse-client --multiquery < sql/05_create_latest_tables.sql
+--   clickhouse-client --multiquery < sql/migrations/002_latest_tables.sql
+--
+-- The materialized views only see inserts made after they exist, so seed the
+-- tables with the current latest row per key.
+
+INSERT INTO analytics.decisions_latest
+SELECT cell_id, id, timestamp, compression_method, compressed_data
+FROM analytics.decisions
+ORDER BY timestamp DESC
+LIMIT 1 BY cell_id;
+
+INSERT INTO analytics.processed_latest
+SELECT
+    window_start,
+    window_end,
+    window_duration_seconds,
+    sample_count,
+    snssai_sst,
+    snssai_sd,
+    dnn,
+    event,
+    ue_tags,
+    metrics
+FROM analytics.processed
+ORDER BY window_end DESC
+LIMIT 1 BY snssai_sst, snssai_sd, dnn, event, window_duration_seconds;
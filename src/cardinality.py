@@ -0,0 +1,180 @@
+"""
+Streaming cardinality estimates of what flows through ingest.
+
+HyperLogLog sketches count the distinct values of each tag key (and of whole
+tag sets, i.e. series) per Kafka topic in fixed memory, over sliding time
+windows. Exposed at /api/v1/cardinality and as "cardinality.*" gauges.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from src.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Pseudo tag key under which whole tag sets (series) are counted
+SERIES_KEY = "_series"
+
+
+def _hash(value: str) -> int:
+    # Not hash(): it is salted per process, so estimates would vary between runs
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def _window_label(seconds: int) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def estimate(registers: np.ndarray) -> float:
+    """HyperLogLog estimate of one register array, with linear counting for small ranges."""
+    m = registers.size
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return raw
+
+
+class WindowedSketch:
+    """
+    HyperLogLog over a sliding window: a ring of `buckets` register arrays,
+    each covering `bucket_seconds`. A window's estimate merges the buckets it
+    spans, so it covers between window - bucket_seconds and window seconds.
+    Memory is buckets * 2**precision bytes, whatever the traffic.
+    """
+
+    def __init__(self, precision: int, bucket_seconds: int, buckets: int) -> None:
+        self.precision = precision
+        self.bucket_seconds = bucket_seconds
+        self._shift = 64 - precision
+        self._mask = (1 << self._shift) - 1
+        # bytearrays rather than numpy rows: per-value updates stay plain Python
+        self._registers = [bytearray(1 << precision) for _ in range(buckets)]
+        # Bucket number each ring slot currently holds (-1: never used)
+        self._epochs = [-1] * buckets
+        self._lock = threading.Lock()
+
+    def _row(self, now: float) -> bytearray:
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % len(self._epochs)
+        row = self._registers[slot]
+        if self._epochs[slot] != epoch:
+            row[:] = bytes(len(row))
+            self._epochs[slot] = epoch
+        return row
+
+    def add(self, values: list[str], now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        shift, mask = self._shift, self._mask
+        with self._lock:
+            row = self._row(now)
+            for value in values:
+                x = _hash(value)
+                index = x >> shift
+                # Rank: position of the leftmost 1 in the remaining bits
+                rank = shift - (x & mask).bit_length() + 1
+                if rank > row[index]:
+                    row[index] = rank
+
+    def estimate(self, window_seconds: int, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        epoch = int(now // self.bucket_seconds)
+        spanned = min(math.ceil(window_seconds / self.bucket_seconds), len(self._epochs))
+        with self._lock:
+            live = [
+                np.frombuffer(bytes(row), dtype=np.uint8)
+                for row, e in zip(self._registers, self._epochs)
+                if epoch - spanned < e <= epoch
+            ]
+        if not live:
+            return 0
+        return round(estimate(np.maximum.reduce(live)))
+
+
+class CardinalityTracker:
+    """
+    Sketches of the distinct values per (topic, tag key), plus SERIES_KEY for
+    distinct tag sets. At most `max_sketches` are kept; tag keys beyond that
+    are not tracked and counted as cardinality.keys.dropped.
+    """
+
+    def __init__(
+        self,
+        precision: int = 10,
+        bucket_seconds: int = 600,
+        buckets: int = 144,
+        windows: tuple[int, ...] = (600, 3600, 86400),
+        max_sketches: int = 64,
+    ) -> None:
+        self.precision = precision
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        # Windows longer than the ring cannot be answered
+        self.windows = tuple(w for w in windows if w <= bucket_seconds * buckets)
+        self.max_sketches = max_sketches
+        self._sketches: dict[tuple[str, str], WindowedSketch] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def error(self) -> float:
+        """Standard error of an estimate."""
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def _sketch(self, topic: str, key: str) -> WindowedSketch | None:
+        sketch = self._sketches.get((topic, key))
+        if sketch is not None:
+            return sketch
+        with self._lock:
+            sketch = self._sketches.get((topic, key))
+            if sketch is None:
+                if len(self._sketches) >= self.max_sketches:
+                    Metrics.inc("cardinality.keys.dropped")
+                    return None
+                sketch = self._sketches[(topic, key)] = WindowedSketch(
+                    self.precision, self.bucket_seconds, self.buckets
+                )
+                created = True
+            else:
+                created = False
+        if created:
+            for window in self.windows:
+                Metrics.gauge(
+                    f"cardinality.{topic}.{key}.{_window_label(window)}",
+                    lambda s=sketch, w=window: s.estimate(w),
+                )
+        return sketch
+
+    def observe(self, topic: str, tags: dict, now: float | None = None) -> None:
+        """Count the tag values of one record, and its tag set as a series."""
+        tags = {k: str(v) for k, v in tags.items() if v is not None}
+        if not tags:
+            return
+        now = time.time() if now is None else now
+        for key, value in tags.items():
+            sketch = self._sketch(topic, key)
+            if sketch is not None:
+                sketch.add([value], now)
+        series = self._sketch(topic, SERIES_KEY)
+        if series is not None:
+            series.add([",".join(f"{k}={v}" for k, v in sorted(tags.items()))], now)
+
+    def estimates(self, now: float | None = None) -> dict:
+        """{topic: {tag key: {window label: distinct values}}}"""
+        with self._lock:
+            sketches = dict(self._sketches)
+        result: dict[str, dict[str, dict[str, int]]] = {}
+        for (topic, key), sketch in sorted(sketches.items()):
+            result.setdefault(topic, {})[key] = {
+                _window_label(w): sketch.estimate(w, now) for w in self.windows
+            }
+        return result
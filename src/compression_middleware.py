@@ -0,0 +1,221 @@
+"""
+Response compression (zstd, brotli, gzip) negotiated from Accept-Encoding.
+
+Pure ASGI so streaming responses are compressed chunk by chunk and flushed
+after every chunk, rather than buffered. Bodies that arrive whole are only
+compressed above a per-path size threshold. Large chunks are compressed on a
+worker thread, not the event loop.
+"""
+
+import logging
+import os
+import zlib
+
+import anyio
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import Metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency: pip install "nwdaf-storage[brotli]"
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Per-path thresholds, longest prefix wins: "/api/v1/decisions=4096,/api/v1/metrics=-1" (-1 disables)
+COMPRESSION_THRESHOLDS = os.getenv("COMPRESSION_THRESHOLDS", "")
+# Chunks at least this large are compressed on a worker thread
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", str(16 * 1024)))
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson")
+
+
+class _Gzip:
+    def __init__(self, level: int = 6) -> None:
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Zstd:
+    def __init__(self, level: int = 3) -> None:
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        flush = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._c.compress(data) + self._c.flush(flush)
+
+
+class _Brotli:
+    def __init__(self, quality: int = 4) -> None:
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+# Server preference when the client accepts several with the same q-value
+ENCODERS = {"zstd": _Zstd, "gzip": _Gzip}
+if brotli is not None:
+    ENCODERS = {"zstd": _Zstd, "br": _Brotli, "gzip": _Gzip}
+
+
+def parse_thresholds(spec: str) -> dict[str, int]:
+    thresholds = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        path, _, size = item.partition("=")
+        try:
+            thresholds[path.strip()] = int(size)
+        except ValueError:
+            logger.warning(f"Ignoring invalid compression threshold: {item}")
+    return thresholds
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the best supported encoding from an Accept-Encoding header."""
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in ENCODERS:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        thresholds: dict[str, int] | None = None,
+        offload_size: int = COMPRESSION_OFFLOAD_SIZE,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        # Longest prefix first so "/api/v1/decisions/latest" can override "/api/v1/decisions"
+        self.thresholds = sorted(
+            (thresholds if thresholds is not None else parse_thresholds(COMPRESSION_THRESHOLDS)).items(),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self.offload_size = offload_size
+
+    def threshold_for(self, path: str) -> int:
+        for prefix, size in self.thresholds:
+            if path.startswith(prefix):
+                return size
+        return self.minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        threshold = self.threshold_for(scope["path"])
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", "")) if threshold >= 0 else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, threshold, self.offload_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, threshold: int, offload_size: int) -> None:
+        self.send = send
+        self.encoding = encoding
+        self.threshold = threshold
+        self.offload_size = offload_size
+        self.start: Message | None = None
+        self.encoder = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(_COMPRESSIBLE_TYPES)
+            )
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            await self._send_start()
+            await self.send(message)
+            return
+
+        if self.encoder is None:
+            # Whole body in one message: only worth it above the threshold
+            if not more_body and len(body) < self.threshold:
+                self.passthrough = True
+                await self._send_start()
+                await self.send(message)
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            if not more_body:
+                compressed = await self._compress(body, final=True)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send_start()
+                await self.send({"type": "http.response.body", "body": compressed})
+                self._record()
+                return
+            await self._send_start()
+
+        compressed = await self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        if not more_body:
+            self._record()
+
+    async def _send_start(self) -> None:
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self.send(start)
+
+    async def _compress(self, data: bytes, final: bool) -> bytes:
+        self.bytes_in += len(data)
+        if len(data) >= self.offload_size:
+            out = await anyio.to_thread.run_sync(self.encoder.compress, data, final)
+        else:
+            out = self.encoder.compress(data, final)
+        self.bytes_out += len(out)
+        return out
+
+    def _record(self) -> None:
+        Metrics.inc(f"http.compression.{self.encoding}.responses")
+        Metrics.inc("http.compression.bytes_in", self.bytes_in)
+        Metrics.inc("http.compression.bytes_out", self.bytes_out)
@@ -1,12 +1,13 @@
 from .clickhouse_conf import ClickhouseConf
 from .conf import Conf
+from .decision_conf import DecisionConf
 from .influx_conf import InfluxConf
 
-__all__ = ["ClickhouseConf", "InfluxConf"]
+__all__ = ["ClickhouseConf", "DecisionConf", "InfluxConf"]
 
 
 def load_all() -> None:
     """Load all configs"""
     config: Conf
-    for config in [ClickhouseConf, InfluxConf]:
+    for config in [ClickhouseConf, DecisionConf, InfluxConf]:
         config.load()
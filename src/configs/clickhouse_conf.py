@@ -9,8 +9,23 @@ logger = logging.getLogger("Config")
 class ClickhouseConf(Conf):
     host: str
     port: int
+    transport: str
+    compression: str
+    insert_format: str
     user: str
     password: str
+    decision_codec: str
+    decision_zstd_level: int
+    pool_min: int
+    pool_max: int
+    pool_timeout: float
+    pool_idle_seconds: float
+    pool_validate_after: float
+    cache_max_bytes: int
+    cache_settled_after: float
+    cache_settled_ttl: float
+    cache_recent_ttl: float
+    cache_revalidate_after: float
 
     _instance = None
     _loaded = False
@@ -28,9 +43,36 @@ class ClickhouseConf(Conf):
     def load_env(cls, file: str = ".env") -> None:
 
         cls.host = os.getenv("CLICKHOUSE_HOST", "localhost")
-        cls.port = int(os.getenv("CLICKHOUSE_PORT", "9000"))
+        # "http" (clickhouse-connect) or "native" (TCP protocol, clickhouse-driver)
+        cls.transport = os.getenv("CLICKHOUSE_TRANSPORT", "http").lower()
+        default_port = "9000" if cls.transport == "native" else "8123"
+        cls.port = int(os.getenv("CLICKHOUSE_PORT", default_port))
+        # Wire compression for inserts and selects: lz4, zstd or none
+        cls.compression = os.getenv("CLICKHOUSE_COMPRESSION", "lz4").lower()
+        # Batch inserts: "arrow" (columnar, needs pyarrow) or "rows"
+        cls.insert_format = os.getenv("CLICKHOUSE_INSERT_FORMAT", "arrow").lower()
         cls.user = os.getenv("CLICKHOUSE_USER", "default")
         cls.password = os.getenv("CLICKHOUSE_PASSWORD", "")
+        # How decision payloads are stored: "gzip" keeps the bytes as received,
+        # "zstd" re-encodes them (smaller and faster to decode on read).
+        cls.decision_codec = os.getenv("CLICKHOUSE_DECISION_CODEC", "gzip").lower()
+        cls.decision_zstd_level = int(os.getenv("CLICKHOUSE_DECISION_ZSTD_LEVEL", "3"))
+        # Connection pool: grows from min to max under load (the API threadpool runs
+        # up to 40 sync handlers), shrinks back after pool_idle_seconds
+        cls.pool_min = int(os.getenv("CLICKHOUSE_POOL_MIN", "4"))
+        cls.pool_max = int(os.getenv("CLICKHOUSE_POOL_MAX", "16"))
+        cls.pool_timeout = float(os.getenv("CLICKHOUSE_POOL_TIMEOUT", "10"))
+        cls.pool_idle_seconds = float(os.getenv("CLICKHOUSE_POOL_IDLE_SECONDS", "300"))
+        cls.pool_validate_after = float(os.getenv("CLICKHOUSE_POOL_VALIDATE_AFTER", "30"))
+        # Query result cache for /processed and /decisions ranges (0 bytes disables it).
+        # Ranges ending more than cache_settled_after seconds ago no longer change.
+        cls.cache_max_bytes = int(os.getenv("CLICKHOUSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        cls.cache_settled_after = float(os.getenv("CLICKHOUSE_CACHE_SETTLED_AFTER", "600"))
+        cls.cache_settled_ttl = float(os.getenv("CLICKHOUSE_CACHE_SETTLED_TTL", "3600"))
+        cls.cache_recent_ttl = float(os.getenv("CLICKHOUSE_CACHE_RECENT_TTL", "5"))
+        # Other replicas' writes are not invalidated here; older entries are re-checked
+        # against a cheap count()/max() validator before being served (0 disables)
+        cls.cache_revalidate_after = float(os.getenv("CLICKHOUSE_CACHE_REVALIDATE_AFTER", "30"))
 
         cls._loaded = True
         logger.info("ClickHouse configuration loaded")
@@ -43,6 +85,21 @@ class ClickhouseConf(Conf):
         return {
             "host": cls.host,
             "port": cls.port,
+            "transport": cls.transport,
+            "compression": cls.compression,
+            "insert_format": cls.insert_format,
             "user": cls.user,
             "password": cls.password,
+            "decision_codec": cls.decision_codec,
+            "decision_zstd_level": cls.decision_zstd_level,
+            "pool_min": cls.pool_min,
+            "pool_max": cls.pool_max,
+            "pool_timeout": cls.pool_timeout,
+            "pool_idle_seconds": cls.pool_idle_seconds,
+            "pool_validate_after": cls.pool_validate_after,
+            "cache_max_bytes": cls.cache_max_bytes,
+            "cache_settled_after": cls.cache_settled_after,
+            "cache_settled_ttl": cls.cache_settled_ttl,
+            "cache_recent_ttl": cls.cache_recent_ttl,
+            "cache_revalidate_after": cls.cache_revalidate_after,
         }
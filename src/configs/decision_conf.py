@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+from src.configs.conf import Conf
+
+logger = logging.getLogger("Config")
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Columns that always exist on analytics.decisions
+CORE_DECISION_COLUMNS = ("cell_id", "id", "timestamp", "compression_method", "compressed_data")
+
+# /decisions query parameters; an extracted field of the same name could not be filtered on
+RESERVED_DECISION_PARAMS = (
+    "start_time",
+    "end_time",
+    "cell_id",
+    "offset",
+    "limit",
+    "columns",
+    "include_payload",
+    "decode",
+    "pointer",
+    "format",
+)
+
+
+def _to_datetime(value) -> datetime:
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+class DecisionField:
+    """A decision document member extracted into its own column at ingest."""
+
+    def __init__(self, name: str, path: str, type_: type) -> None:
+        self.name = name
+        self.path = path
+        self.type = type_
+
+    def convert(self, value):
+        """Coerce a document (or query string) value to the column type; None if absent."""
+        if value is None:
+            return None
+        if self.type is datetime:
+            return _to_datetime(value)
+        if self.type is bool:
+            return _to_bool(value)
+        if self.type is str and isinstance(value, (dict, list)):
+            raise ValueError(f"Field [{self.name}] at [{self.path}] is not a scalar")
+        return self.type(value)
+
+
+class DecisionConf(Conf):
+    """
+    Decision fields to extract into typed columns, read from DECISION_FIELDS_PATH:
+
+        action_type:
+          path: action.type      # dotted path into the decision document
+          type: string
+    """
+
+    fields: dict[str, DecisionField] = {}
+
+    _loaded = False
+
+    _TYPE_MAP = {
+        "float": float,
+        "integer": int,
+        "int": int,
+        "string": str,
+        "str": str,
+        "datetime": datetime,
+        "bool": bool,
+        "boolean": bool,
+    }
+
+    @classmethod
+    def _parse(cls, raw: dict) -> dict[str, DecisionField]:
+        parsed = {}
+        for name, spec in (raw or {}).items():
+            if name in RESERVED_DECISION_PARAMS:
+                raise ValueError(
+                    f"Decision field [{name}] clashes with a /decisions query parameter; rename it "
+                    f"(reserved: {', '.join(RESERVED_DECISION_PARAMS)})"
+                )
+            if not _IDENTIFIER.match(name) or name in CORE_DECISION_COLUMNS:
+                logger.warning(f"Invalid decision column name [{name}], skipping")
+                continue
+            if isinstance(spec, str):
+                spec = {"type": spec}
+            type_string = str(spec.get("type", "string")).lower().strip()
+            if type_string not in cls._TYPE_MAP:
+                logger.warning(
+                    f"Unknown type [{type_string}] for decision field [{name}], defaulting to string"
+                )
+            path = spec.get("path", name)
+            parsed[name] = DecisionField(name, path, cls._TYPE_MAP.get(type_string, str))
+        return parsed
+
+    @classmethod
+    def load_env(cls, file: str = ".env") -> None:
+        path = Path(os.getenv("DECISION_FIELDS_PATH", "confs/decision_fields.yml"))
+        if path.exists():
+            with open(path, "r") as f:
+                cls.fields = cls._parse(yaml.safe_load(f))
+            logger.info(f"Loaded {len(cls.fields)} extracted decision fields")
+        else:
+            cls.fields = {}
+        cls._loaded = True
+
+    @classmethod
+    def get(cls) -> dict:
+        if not cls._loaded:
+            cls.load_env()
+        return {name: field.path for name, field in cls.fields.items()}
+
+    @classmethod
+    def get_fields(cls) -> dict[str, DecisionField]:
+        """Get extracted decision fields by column name"""
+        if not cls._loaded:
+            cls.load_env()
+        return cls.fields
@@ -10,6 +10,17 @@ class InfluxConf(Conf):
     token:  str
     org:    str
     bucket: str
+    query_slices: int
+    query_slice_seconds: int
+    write_mode: str
+    write_precision: str
+    write_batch_size: int
+    write_flush_interval: int
+    write_jitter_interval: int
+    write_retry_interval: int
+    write_max_retries: int
+    write_max_retry_delay: int
+    write_exponential_base: int
 
     _instance = None
     _loaded = False
@@ -30,6 +41,24 @@ class InfluxConf(Conf):
         cls.token  = os.getenv("INFLUX_TOKEN", "")
         cls.org    = os.getenv("INFLUX_ORG", "myorg")
         cls.bucket = os.getenv("INFLUX_BUCKET", "mybucket")
+        # /raw/aggregate splits long ranges into up to query_slices concurrent
+        # queries, each covering at least query_slice_seconds
+        cls.query_slices = int(os.getenv("INFLUX_QUERY_SLICES", "4"))
+        cls.query_slice_seconds = int(os.getenv("INFLUX_QUERY_SLICE_SECONDS", "3600"))
+        # Writes: "batching" queues points and reports outcomes through callbacks;
+        # "synchronous" blocks each sink flush until InfluxDB acknowledges it.
+        cls.write_mode = os.getenv("INFLUX_WRITE_MODE", "batching").lower()
+        # Timestamp precision of written points: s, ms, us or ns. Points of a
+        # series falling in the same unit overwrite each other.
+        cls.write_precision = os.getenv("INFLUX_WRITE_PRECISION", "ns").lower()
+        # Batching and retries; intervals in milliseconds
+        cls.write_batch_size = int(os.getenv("INFLUX_WRITE_BATCH_SIZE", "5000"))
+        cls.write_flush_interval = int(os.getenv("INFLUX_WRITE_FLUSH_INTERVAL", "1000"))
+        cls.write_jitter_interval = int(os.getenv("INFLUX_WRITE_JITTER_INTERVAL", "0"))
+        cls.write_retry_interval = int(os.getenv("INFLUX_WRITE_RETRY_INTERVAL", "5000"))
+        cls.write_max_retries = int(os.getenv("INFLUX_WRITE_MAX_RETRIES", "5"))
+        cls.write_max_retry_delay = int(os.getenv("INFLUX_WRITE_MAX_RETRY_DELAY", "125000"))
+        cls.write_exponential_base = int(os.getenv("INFLUX_WRITE_EXPONENTIAL_BASE", "2"))
 
         cls._loaded = True
         logger.info("InfluxDB configuration loaded")
@@ -44,4 +73,15 @@ class InfluxConf(Conf):
             "token": cls.token,
             "org": cls.org,
             "bucket": cls.bucket,
+            "query_slices": cls.query_slices,
+            "query_slice_seconds": cls.query_slice_seconds,
+            "write_mode": cls.write_mode,
+            "write_precision": cls.write_precision,
+            "write_batch_size": cls.write_batch_size,
+            "write_flush_interval": cls.write_flush_interval,
+            "write_jitter_interval": cls.write_jitter_interval,
+            "write_retry_interval": cls.write_retry_interval,
+            "write_max_retries": cls.write_max_retries,
+            "write_max_retry_delay": cls.write_max_retry_delay,
+            "write_exponential_base": cls.write_exponential_base,
         }
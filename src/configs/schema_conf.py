@@ -14,6 +14,14 @@ class SchemaConf(Conf):
     core_fields: dict[str, type] = {}
     extra_fields: dict[str, type] = {}
     tags: set[str] = set()
+    # Distinct values a raw tag may take before it stops being written as a tag,
+    # and what happens to it then: "field" (kept as a string field) or "drop"
+    max_tag_values: int = 10000
+    tag_overflow: str = "field"
+    # Buckets of the shard tag set on points whose identifying tags are not tags
+    shards: int = 64
+
+    _loaded = False
 
     _TYPE_MAP = {
         "float": float,
@@ -91,10 +99,19 @@ class SchemaConf(Conf):
     @classmethod
     def load(cls) -> None:
         cls.load_yml()
+        cls.max_tag_values = int(os.getenv("RAW_TAG_MAX_VALUES", "10000"))
+        cls.tag_overflow = os.getenv("RAW_TAG_OVERFLOW", "field").lower()
+        if cls.tag_overflow not in ("field", "drop"):
+            logger.warning(f"Unknown RAW_TAG_OVERFLOW [{cls.tag_overflow}], defaulting to field")
+            cls.tag_overflow = "field"
+        cls.shards = int(os.getenv("RAW_SHARDS", "64"))
+        cls._loaded = True
 
     @classmethod
     def get(cls) -> dict:
         """Get all schema configuration"""
+        if not cls._loaded:
+            cls.load()
         return {
             "core_fields": cls.core_fields,
             "extra_fields": cls.extra_fields,
@@ -103,14 +120,20 @@ class SchemaConf(Conf):
     @classmethod
     def get_extra_fields(cls) -> dict[str, type]:
         """Get extra fields with parsed types"""
+        if not cls._loaded:
+            cls.load()
         return cls.extra_fields
 
     @classmethod
     def get_core_fields(cls) -> dict[str, type]:
         """Get core fields with parsed types"""
+        if not cls._loaded:
+            cls.load()
         return cls.core_fields
 
     @classmethod
     def get_tags(cls) -> set[str]:
         """Get tag field names for InfluxDB"""
+        if not cls._loaded:
+            cls.load()
         return cls.tags
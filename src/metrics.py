@@ -0,0 +1,83 @@
+"""
+In-process metrics: counters, gauges and timing summaries.
+
+Kept dependency-free on purpose; everything is exposed as JSON at /api/v1/metrics.
+"""
+
+import threading
+from collections.abc import Callable
+
+
+class _Timing:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "avg_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class Metrics:
+    """Process-wide registry. Names are dotted, e.g. "clickhouse.pool.created"."""
+
+    _lock = threading.Lock()
+    _counters: dict[str, float] = {}
+    _gauges: dict[str, Callable[[], float]] = {}
+    _timings: dict[str, _Timing] = {}
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1) -> None:
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + value
+
+    @classmethod
+    def observe(cls, name: str, seconds: float) -> None:
+        with cls._lock:
+            timing = cls._timings.get(name)
+            if timing is None:
+                timing = cls._timings[name] = _Timing()
+            timing.observe(seconds)
+
+    @classmethod
+    def gauge(cls, name: str, read: Callable[[], float]) -> None:
+        """Register a gauge; `read` is called when a snapshot is taken."""
+        with cls._lock:
+            cls._gauges[name] = read
+
+    @classmethod
+    def counter(cls, name: str) -> float:
+        with cls._lock:
+            return cls._counters.get(name, 0)
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls._lock:
+            counters = dict(cls._counters)
+            gauges = dict(cls._gauges)
+            timings = {name: t.to_dict() for name, t in cls._timings.items()}
+        return {
+            "counters": counters,
+            "gauges": {name: read() for name, read in gauges.items()},
+            "timings": timings,
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._counters = {}
+            cls._gauges = {}
+            cls._timings = {}
@@ -0,0 +1,98 @@
+"""
+Arrow tables for processed windows and decisions.
+
+The tables match the ClickHouse schemas (sql/01, sql/03) column for column, so
+they can be inserted with the Arrow format or handed to any other Arrow-aware
+exporter (Parquet, Flight, ...) unchanged.
+
+pyarrow is optional (pip install "nwdaf-storage[arrow]"); check `available`.
+"""
+
+from datetime import datetime
+from itertools import accumulate, chain
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+available = pa is not None
+
+
+def _require() -> None:
+    if pa is None:
+        raise ImportError('pyarrow is not installed (pip install "nwdaf-storage[arrow]")')
+
+
+def _map_array(maps: list[dict], value_type):
+    """Build a map<string, value_type> column from dicts without per-row Arrow calls."""
+    offsets = pa.array(list(accumulate((len(m) for m in maps), initial=0)), type=pa.int32())
+    keys = pa.array(list(chain.from_iterable(maps)), type=pa.string())
+    items = pa.array(list(chain.from_iterable(m.values() for m in maps)), type=value_type)
+    return pa.MapArray.from_arrays(offsets, keys, items)
+
+
+def processed_schema():
+    _require()
+    return pa.schema([
+        ("window_start", pa.timestamp("ms", tz="UTC")),
+        ("window_end", pa.timestamp("ms", tz="UTC")),
+        ("window_duration_seconds", pa.uint32()),
+        ("sample_count", pa.uint32()),
+        ("snssai_sst", pa.string()),
+        ("snssai_sd", pa.string()),
+        ("dnn", pa.string()),
+        ("event", pa.string()),
+        ("ue_tags", pa.map_(pa.string(), pa.string())),
+        ("metrics", pa.map_(pa.string(), pa.float64())),
+    ])
+
+
+def processed_table(rows: list[dict]):
+    """Arrow table from transform_processor_output() rows."""
+    schema = processed_schema()
+    columns = []
+    for field in schema:
+        if pa.types.is_map(field.type):
+            columns.append(_map_array([row[field.name] for row in rows], field.type.item_type))
+        else:
+            columns.append(pa.array([row[field.name] for row in rows], type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+_FIELD_TYPES = {
+    str: "string",
+    int: "int64",
+    float: "float64",
+    bool: "bool_",
+}
+
+
+def _field_type(type_: type):
+    if type_ is datetime:
+        return pa.timestamp("ms", tz="UTC")
+    return getattr(pa, _FIELD_TYPES[type_])()
+
+
+def decisions_schema(fields: dict | None = None):
+    """Decision columns; `fields` maps extracted column names to DecisionField."""
+    _require()
+    return pa.schema(
+        [
+            ("cell_id", pa.int32()),
+            ("id", pa.uint64()),
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("compression_method", pa.string()),
+            ("compressed_data", pa.binary()),
+        ]
+        + [(name, _field_type(field.type)) for name, field in (fields or {}).items()]
+    )
+
+
+def decisions_table(rows: list[dict], fields: dict | None = None):
+    """Arrow table from decision rows keyed by column name; missing extracted values are null."""
+    schema = decisions_schema(fields)
+    return pa.Table.from_arrays(
+        [pa.array([row.get(f.name) for row in rows], type=f.type) for f in schema],
+        schema=schema,
+    )
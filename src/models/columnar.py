@@ -0,0 +1,158 @@
+"""
+Column-major query results.
+
+ClickHouse drivers decode results column by column; ColumnarResult keeps them
+that way so reshaping (renames, exploding a Map column into one column per key)
+never loops over rows in Python. Row dicts are only built by to_rows(), at the
+serialization boundary.
+"""
+
+from collections.abc import Sequence
+from itertools import chain
+
+import numpy as np
+
+
+class ColumnarResult:
+    def __init__(self, names: Sequence[str], columns: Sequence[Sequence]) -> None:
+        if len(names) != len(columns):
+            raise ValueError("names and columns must have the same length")
+        self._names = list(names)
+        self._columns = [c if isinstance(c, list) else list(c) for c in columns]
+        # Columns exploded from a Map: a None there means "key absent", not null
+        self.sparse: set[str] = set()
+        # Map column whose explosion is deferred until columns are asked for
+        self._pending: list[dict] | None = None
+
+    @classmethod
+    def from_query(cls, result) -> "ColumnarResult":
+        """Wrap a driver QueryResult without transposing it into rows."""
+        columns = result.result_columns
+        if not columns:
+            columns = [[] for _ in result.column_names]
+        return cls(result.column_names, columns)
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "ColumnarResult":
+        """Columns for the union of row keys, in first-seen order; missing values are None."""
+        names = list(dict.fromkeys(chain.from_iterable(rows)))
+        return cls(names, [[row.get(name) for row in rows] for name in names])
+
+    def copy(self) -> "ColumnarResult":
+        """
+        Shallow copy that can be reshaped independently of the original; column
+        lists and pending maps are shared, since reshaping never mutates them.
+        """
+        clone = ColumnarResult.__new__(ColumnarResult)
+        clone._names = list(self._names)
+        clone._columns = list(self._columns)
+        clone.sparse = set(self.sparse)
+        clone._pending = self._pending
+        return clone
+
+    def estimated_size(self) -> int:
+        """Rough in-memory size in bytes, for cache accounting."""
+        cells = len(self) * len(self._columns)
+        if self._pending:
+            cells += sum(map(len, self._pending)) * 2
+        payload = sum(
+            sum(map(len, column))
+            for column in self._columns
+            if column and isinstance(column[0], (bytes, str))
+        )
+        return cells * 32 + payload
+
+    def __len__(self) -> int:
+        if self._columns:
+            return len(self._columns[0])
+        return len(self._pending) if self._pending is not None else 0
+
+    @property
+    def names(self) -> list[str]:
+        self._explode_pending()
+        return self._names
+
+    @property
+    def columns(self) -> list[list]:
+        self._explode_pending()
+        return self._columns
+
+    def column(self, name: str) -> list:
+        return self.columns[self.names.index(name)]
+
+    def rename(self, mapping: dict[str, str]) -> "ColumnarResult":
+        self._names = [mapping.get(name, name) for name in self._names]
+        self.sparse = {mapping.get(name, name) for name in self.sparse}
+        return self
+
+    def explode_map(self, name: str) -> "ColumnarResult":
+        """
+        Replace Map column `name` with one column per key (sorted).
+
+        The work is deferred: to_rows() merges each map straight into its row,
+        while `names`/`columns` trigger the numpy pivot.
+        """
+        if name not in self._names:
+            return self
+        self._explode_pending()
+        position = self._names.index(name)
+        self._pending = self._columns[position]
+        del self._names[position], self._columns[position]
+        return self
+
+    def _explode_pending(self) -> None:
+        """Scatter the pending maps into a (keys x rows) grid; rows lacking a key get None."""
+        maps, self._pending = self._pending, None
+        if not maps:
+            return
+
+        lengths = np.fromiter(map(len, maps), dtype=np.int64, count=len(maps))
+        total = int(lengths.sum())
+        if not total:
+            return
+
+        keys = list(chain.from_iterable(maps))
+        index = {key: i for i, key in enumerate(dict.fromkeys(keys))}
+        codes = np.fromiter(map(index.__getitem__, keys), dtype=np.int64, count=total)
+        values = np.fromiter(chain.from_iterable(m.values() for m in maps), dtype=np.float64, count=total)
+        rows = np.repeat(np.arange(len(maps)), lengths)
+
+        grid = np.zeros((len(index), len(maps)), dtype=np.float64)
+        present = np.zeros(grid.shape, dtype=bool)
+        grid[codes, rows] = values
+        present[codes, rows] = True
+
+        for key in sorted(index):
+            i = index[key]
+            column = grid[i].tolist()
+            if not present[i].all():
+                for row in np.flatnonzero(~present[i]).tolist():
+                    column[row] = None
+            self._names.append(key)
+            self._columns.append(column)
+            self.sparse.add(key)
+
+    def to_rows(self) -> list[dict]:
+        """Row dicts; absent exploded-map keys are left out, as in the original maps."""
+        if self._pending is not None and not self.sparse:
+            # Fast path: merge each map into its row, no pivot needed
+            if not self._columns:
+                return [dict(extra) for extra in self._pending]
+            rows = [dict(zip(self._names, values)) for values in zip(*self._columns)]
+            for row, extra in zip(rows, self._pending):
+                row.update(extra)
+            return rows
+        self._explode_pending()
+
+        names = self._names
+        if not self.sparse:
+            return [dict(zip(names, values)) for values in zip(*self._columns)]
+        sparse = [name in self.sparse for name in names]
+        return [
+            {
+                name: value
+                for name, value, is_sparse in zip(names, values, sparse)
+                if value is not None or not is_sparse
+            }
+            for values in zip(*self._columns)
+        ]
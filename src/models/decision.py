@@ -0,0 +1,387 @@
+import base64
+import codecs
+import gzip
+import io
+import json
+import logging
+import re
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+import zstandard
+
+from src.configs.decision_conf import DecisionField
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_CODECS = ("gzip", "zstd")
+
+# Decompressed bytes handed to the header scanner per step
+_STREAM_CHUNK = 16 * 1024
+
+HEADER_FIELDS = ("cell_id", "timestamp")
+
+
+def decompress(method: str, payload: bytes) -> bytes:
+    """Decompress a decision payload stored/received with `method`."""
+    if method == "gzip":
+        return gzip.decompress(payload)
+    if method == "zstd":
+        # Frames written by compress() always carry the content size
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unsupported compression method: {method}")
+
+
+def compress(method: str, data: bytes, level: int = 3) -> bytes:
+    """Compress a decision document with `method`."""
+    if method == "gzip":
+        return gzip.compress(data)
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported compression method: {method}")
+
+
+def iter_decompress(method: str, payload: bytes, chunk_size: int = _STREAM_CHUNK) -> Iterator[bytes]:
+    """
+    Lazily decompress `payload`, yielding at most `chunk_size` bytes at a time.
+
+    Only as much input is inflated as the consumer asks for, so stopping early
+    skips the rest of the document.
+    """
+    if method == "gzip":
+        inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        data = payload
+        while data and not inflater.eof:
+            chunk = inflater.decompress(data, chunk_size)
+            data = inflater.unconsumed_tail
+            if chunk:
+                yield chunk
+        if not inflater.eof:
+            remainder = inflater.flush()
+            if remainder:
+                yield remainder
+    elif method == "zstd":
+        reader = zstandard.ZstdDecompressor().read_to_iter(
+            io.BytesIO(payload), read_size=chunk_size, write_size=chunk_size
+        )
+        yield from reader
+    else:
+        raise ValueError(f"Unsupported compression method: {method}")
+
+
+_WS = re.compile(r"\s*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_SCALAR_END = re.compile(r"[,}\]\s]")
+_IN_STRING = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+
+
+class HeaderScanner:
+    """
+    Incremental tokenizer that picks scalar members out of a JSON object.
+
+    Keys are dotted paths ("cell_id", "action.type") through nested objects.
+    Text is fed in arbitrary chunks; containers that cannot hold a wanted key
+    are skipped without being parsed. `feed` returns True as soon as every
+    wanted key has been seen. Raises ValueError if the input is not a JSON object.
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self.wanted = set(keys)
+        self.found: dict = {}
+        # Objects worth descending into, e.g. ("action",) for "action.type"
+        self._prefixes = {
+            tuple(parts[:i])
+            for parts in (key.split(".") for key in self.wanted)
+            for i in range(1, len(parts))
+        }
+        self._path: list[str] = []
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: str | None = None
+        self._depth = 0
+        self._in_string = False
+
+    @property
+    def complete(self) -> bool:
+        return self.wanted <= self.found.keys()
+
+    @property
+    def ended(self) -> bool:
+        """The closing brace of the object was reached."""
+        return self._state == "end"
+
+    def feed(self, text: str) -> bool:
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        while not self.complete and self._step():
+            pass
+        return self.complete
+
+    def _peek(self) -> str | None:
+        self._pos = _WS.match(self._buf, self._pos).end()
+        return self._buf[self._pos] if self._pos < len(self._buf) else None
+
+    def _step(self) -> bool:
+        """Advance one token; False means more input is needed (or the object ended)."""
+        if self._state == "skip":
+            return self._skip_container()
+
+        c = self._peek()
+        if c is None or self._state == "end":
+            return False
+
+        if self._state == "start":
+            if c != "{":
+                raise ValueError("Decision document is not a JSON object")
+            self._pos += 1
+            self._state = "key"
+        elif self._state == "key":
+            if c == "}":
+                return self._close_object()
+            match = _STRING.match(self._buf, self._pos)
+            if match is None:
+                if c != '"':
+                    raise ValueError(f"Expected object key at offset {self._pos}")
+                return False
+            self._key = json.loads(match.group())
+            self._pos = match.end()
+            self._state = "colon"
+        elif self._state == "colon":
+            if c != ":":
+                raise ValueError(f"Expected ':' at offset {self._pos}")
+            self._pos += 1
+            self._state = "value"
+        elif self._state == "value":
+            if c == "{" and (*self._path, self._key) in self._prefixes:
+                self._path.append(self._key)
+                self._pos += 1
+                self._state = "key"
+                return True
+            if c in "{[":
+                self._pos += 1
+                self._depth = 1
+                self._state = "skip"
+                return True
+            if c == '"':
+                match = _STRING.match(self._buf, self._pos)
+                if match is None:
+                    return False
+                end = match.end()
+            else:
+                match = _SCALAR_END.search(self._buf, self._pos)
+                if match is None:
+                    return False
+                end = match.start()
+            key = ".".join((*self._path, self._key))
+            if key in self.wanted:
+                self.found[key] = json.loads(self._buf[self._pos:end])
+            self._pos = end
+            self._state = "comma"
+        elif self._state == "comma":
+            if c == "}":
+                return self._close_object()
+            if c != ",":
+                raise ValueError(f"Expected ',' at offset {self._pos}")
+            self._pos += 1
+            self._state = "key"
+        return True
+
+    def _close_object(self) -> bool:
+        if not self._path:
+            self._state = "end"
+            return False
+        self._path.pop()
+        self._pos += 1
+        self._state = "comma"
+        return True
+
+    def _skip_container(self) -> bool:
+        buf = self._buf
+        while self._depth:
+            if self._in_string:
+                match = _IN_STRING.search(buf, self._pos)
+                if match is None:
+                    self._pos = len(buf)
+                    return False
+                if match.group() == "\\":
+                    if match.end() >= len(buf):
+                        # Escape split across chunks; resume at the backslash
+                        self._pos = match.start()
+                        return False
+                    self._pos = match.end() + 1
+                    continue
+                self._in_string = False
+            else:
+                match = _STRUCTURAL.search(buf, self._pos)
+                if match is None:
+                    self._pos = len(buf)
+                    return False
+                c = match.group()
+                if c == '"':
+                    self._in_string = True
+                elif c in "{[":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+            self._pos = match.end()
+        self._state = "comma"
+        return True
+
+
+def extract_header(method: str, payload: bytes, keys: Iterable[str] = HEADER_FIELDS) -> dict:
+    """
+    Return the members at `keys` (dotted paths) of a compressed decision document.
+
+    Streams the decompressed output through a HeaderScanner and stops as soon
+    as every key is found, so large documents are only partially inflated.
+    Falls back to a full decode when the scan cannot answer (missing keys,
+    nested values, multi-member streams or a malformed prefix).
+    """
+    keys = tuple(keys)
+    scanner = HeaderScanner(keys)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for chunk in iter_decompress(method, payload):
+            if scanner.feed(decoder.decode(chunk)):
+                return scanner.found
+            if scanner.ended:
+                break
+    except (ValueError, zlib.error, zstandard.ZstdError):
+        pass
+
+    document = json.loads(decompress(method, payload))
+    if not isinstance(document, dict):
+        raise ValueError("Decision document is not a JSON object")
+    found = {}
+    for key in keys:
+        value = document
+        for part in key.split("."):
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            found[key] = value
+    return found
+
+
+def resolve_pointer(document, pointer: str):
+    """Resolve an RFC 6901 JSON pointer ("/actions/0/type"); KeyError if it does not exist."""
+    if pointer == "":
+        return document
+    if not pointer.startswith("/"):
+        raise ValueError(f"Invalid JSON pointer: {pointer}")
+    value = document
+    for token in pointer[1:].split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        if isinstance(value, list):
+            if not token.isdigit() or int(token) >= len(value):
+                raise KeyError(pointer)
+            value = value[int(token)]
+        elif isinstance(value, dict) and token in value:
+            value = value[token]
+        else:
+            raise KeyError(pointer)
+    return value
+
+
+def decode_document(
+    method: str, payload: bytes, pointers: tuple[str, ...] = ()
+) -> tuple[bytes, str | None]:
+    """
+    Decompress and parse a stored decision, returning (json_bytes, error).
+
+    Without pointers the decompressed text is returned verbatim once it parses;
+    with pointers only {pointer: subtree} is serialized (missing ones are null).
+    Never raises, so one corrupt payload cannot abort a page being decoded in bulk.
+    Runs in worker processes: keep it a module-level function.
+    """
+    try:
+        text = decompress(method, payload)
+        document = json.loads(text)
+        if not pointers:
+            return text, None
+        projected = {}
+        for pointer in pointers:
+            try:
+                projected[pointer] = resolve_pointer(document, pointer)
+            except KeyError:
+                projected[pointer] = None
+        return json.dumps(projected).encode("utf-8"), None
+    except Exception as e:
+        return b"null", str(e)
+
+
+class Decision:
+    """
+    A decision as consumed from `network.decisions`.
+
+    The payload is kept as raw compressed bytes; base64 only exists on the wire
+    (Kafka message in, API response out). `fields` holds the values of the
+    configured extracted columns (see DecisionConf).
+    """
+
+    def __init__(
+        self,
+        cell_id: int,
+        timestamp: datetime,
+        compression_method: str,
+        payload: bytes,
+        fields: dict | None = None,
+    ) -> None:
+        self.cell_id = cell_id
+        self.timestamp = timestamp
+        self.compression_method = compression_method
+        self.payload = payload
+        self.fields = fields or {}
+
+    @classmethod
+    def from_message(
+        cls, message: dict, extract: Iterable[DecisionField] = ()
+    ) -> "Decision":
+        """
+        Build a Decision from a Kafka message: {"compression": "gzip", "data": "base64..."}.
+
+        `extract` fields are read in the same partial pass as the header; values
+        that are missing or fail conversion are stored as NULL.
+        Raises ValueError when the message or the decision document is malformed.
+        """
+        compression_method = message.get("compression")
+        encoded = message.get("data")
+        if not compression_method or not encoded:
+            raise ValueError(f"Invalid decision message format: {list(message.keys())}")
+        if compression_method not in SUPPORTED_CODECS:
+            raise ValueError(f"Unsupported compression method: {compression_method}")
+
+        payload = base64.b64decode(encoded)
+        # Only the header is needed here; the document itself is stored as-is
+        extract = tuple(extract)
+        header = extract_header(
+            compression_method, payload, (*HEADER_FIELDS, *(f.path for f in extract))
+        )
+
+        cell_id = header.get("cell_id")
+        timestamp_str = header.get("timestamp")
+        if not cell_id or not timestamp_str:
+            raise ValueError(f"Missing cell_id or timestamp in decision: {list(header.keys())}")
+
+        timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
+
+        fields = {}
+        for field in extract:
+            try:
+                fields[field.name] = field.convert(header.get(field.path))
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Cannot extract decision field [{field.name}]: {e}")
+                fields[field.name] = None
+
+        return cls(cell_id, timestamp, compression_method, payload, fields)
+
+    def encoded(self, method: str, level: int = 3) -> tuple[str, bytes]:
+        """Return (method, payload) re-encoded with `method` if it differs from the current one."""
+        if method == self.compression_method:
+            return self.compression_method, self.payload
+        raw = decompress(self.compression_method, self.payload)
+        return method, compress(method, raw, level)
@@ -1,9 +1,84 @@
+import hashlib
 import json
+import logging
+import threading
+from collections.abc import Callable
 from datetime import datetime, timezone
 
-from influxdb_client.client.write.point import Point
+from influxdb_client.client.write.point import DEFAULT_WRITE_PRECISION, Point
+
+from src.metrics import Metrics
+
+logger = logging.getLogger(__name__)
 
 RAW_MEASUREMENT: str = "raw"
+# Tags identifying a series of the raw measurement, in /raw paging order, when
+# the schema configures none
+RAW_TAGS: tuple[str, ...] = ("event", "snssai_sst", "snssai_sd", "dnn", "supi", "gpsi", "ueIpv4Addr")
+# Tag set on points whose identifying tags were written as fields (or dropped):
+# a bounded hash of their values, see RawEncoder
+SHARD_TAG: str = "shard"
+
+
+def series_tags(configured: set[str]) -> tuple[str, ...]:
+    """Tag keys of raw series in paging order: "event", then the configured tags (RAW_TAGS without any)."""
+    if not configured:
+        return RAW_TAGS
+    known = [tag for tag in RAW_TAGS if tag == "event" or tag in configured]
+    return (*known, *sorted(configured - set(known)))
+
+
+def filter_keys() -> tuple[str, ...]:
+    """Keys /raw accepts as filters: the schema's tags and RAW_TAGS, which older points may carry."""
+    from src.configs.schema_conf import SchemaConf
+
+    return tuple(dict.fromkeys((*RAW_TAGS, *series_tags(SchemaConf.get_tags()))))
+
+
+def _shard(values: list[str], shards: int) -> str:
+    # Not hash(): it is salted per process, and a UE must keep its shard across restarts
+    digest = hashlib.blake2b("\x00".join(values).encode(), digest_size=8).digest()
+    return str(int.from_bytes(digest, "big") % shards)
+
+
+def _untyped(value):
+    """Field value of a metric the schema does not type: numbers as floats, the rest as text."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _to_integral(value) -> float:
+    """Integer-typed metric, validated but stored as float like every other number."""
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not an integer")
+    return number
+
+
+def _to_bool(value) -> float:
+    """Bool-typed metric as 1.0 / 0.0, the float untyped bools were always written as."""
+    if isinstance(value, str):
+        return float(value.strip().lower() in ("1", "true", "yes"))
+    return float(bool(value))
+
+
+def _to_text(value) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+# Numbers of every schema type are written as floats: a field's type is fixed per
+# shard, so an int or bool value would be rejected once the field holds floats.
+# InfluxDB has no time field type: datetimes are stored as ISO 8601 text.
+_CONVERTERS: dict[type, Callable] = {
+    float: float, int: _to_integral, bool: _to_bool, str: _to_text, datetime: _to_text,
+}
 
 
 class Raw:
@@ -16,16 +91,127 @@ class Raw:
         self.event = event
         self.metrics = metrics
 
-    def to_point(self) -> Point:
-        point = Point(RAW_MEASUREMENT).time(self.timestamp)
-        point.tag("event", self.event)
-        for k, v in self.tags.items():
-            point.tag(k, str(v))
-        for k, v in self.metrics.items():
-            if isinstance(v, (int, float)):
-                point.field(k, float(v))
-            elif isinstance(v, (dict, list)):
-                point.field(k, json.dumps(v))
-            elif v is not None:
-                point.field(k, str(v))
+
+class TagGuard:
+    """
+    Bounded record of the distinct values seen per tag key.
+
+    Once a key has taken `max_values` distinct values, the next new one marks
+    it as overflowing for the life of the process and its values are forgotten,
+    so memory stays bounded at max_values per key.
+    """
+
+    def __init__(self, max_values: int) -> None:
+        self.max_values = max_values
+        self.overflowing: set[str] = set()
+        self._values: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def admit(self, key: str, value: str) -> bool:
+        """Whether `value` may be written as a tag of `key`."""
+        with self._lock:
+            if key in self.overflowing:
+                return False
+            seen = self._values.setdefault(key, set())
+            if value in seen:
+                return True
+            if len(seen) < self.max_values:
+                seen.add(value)
+                return True
+            self.overflowing.add(key)
+            del self._values[key]
+        Metrics.inc("raw.tags.overflowed")
+        logger.warning(f"Raw tag [{key}] exceeded {self.max_values} distinct values; no longer written as a tag")
+        return False
+
+
+class RawEncoder:
+    """
+    Encodes Raw records as points following the schema (SchemaConf):
+
+    - only `tags` become tags; other tag keys are written as string fields.
+      Without configured tags, every tag key is a tag.
+    - metrics listed in `fields` are validated against their configured type
+      with a converter chosen once, here (numbers are still written as floats);
+      other metrics keep the untyped encoding.
+    - a tag past `max_tag_values` distinct values is written as a field
+      (overflow="field") or dropped (overflow="drop") from then on.
+
+    InfluxDB keeps one point per series and timestamp. Two UEs reporting at the
+    same instant differ only by their supi / ueIpv4Addr; once those are no longer
+    tags, the later point would overwrite the earlier one. Such points get a
+    SHARD_TAG tag, a hash of the values taken off the series key into `shards`
+    buckets: series stay bounded, and same-timestamp points only collide when
+    their values land in the same bucket (0 shards: no tag, every such point
+    collides).
+    """
+
+    def __init__(
+        self,
+        tags: set[str] | None = None,
+        fields: dict[str, type] | None = None,
+        max_tag_values: int = 10000,
+        overflow: str = "field",
+        shards: int = 64,
+    ) -> None:
+        self.tags = set(tags or ())
+        self.overflow = overflow
+        self.shards = shards
+        self.guard = TagGuard(max_tag_values)
+        self._converters = {name: _CONVERTERS.get(type_, _to_text) for name, type_ in (fields or {}).items()}
+
+    @property
+    def series_tags(self) -> tuple[str, ...]:
+        return series_tags(self.tags)
+
+    @property
+    def order_tags(self) -> tuple[str, ...]:
+        """series_tags, then SHARD_TAG: every tag telling same-timestamp points apart."""
+        return (*self.series_tags, SHARD_TAG) if self.shards else self.series_tags
+
+    def is_tag(self, key: str) -> bool:
+        """Whether `key` is currently written as a tag (not a field, nor demoted)."""
+        if key == "event":
+            return True
+        if self.tags and key not in self.tags:
+            return False
+        return key not in self.guard.overflowing
+
+    @classmethod
+    def from_conf(cls) -> "RawEncoder":
+        from src.configs.schema_conf import SchemaConf
+
+        return cls(
+            tags=SchemaConf.get_tags(),
+            fields={**SchemaConf.get_core_fields(), **SchemaConf.get_extra_fields()},
+            max_tag_values=SchemaConf.max_tag_values,
+            overflow=SchemaConf.tag_overflow,
+            shards=SchemaConf.shards,
+        )
+
+    def encode(self, raw: Raw, write_precision: str = DEFAULT_WRITE_PRECISION) -> Point:
+        point = Point(RAW_MEASUREMENT).time(raw.timestamp, write_precision)
+        point.tag("event", raw.event)
+        # Values kept off the series key, which the shard must still tell apart
+        untagged = []
+        for k, v in raw.tags.items():
+            value = str(v)
+            if self.tags and k not in self.tags:
+                point.field(k, value)
+            elif self.guard.admit(k, value):
+                point.tag(k, value)
+                continue
+            elif self.overflow == "field":
+                point.field(k, value)
+            untagged.append(f"{k}={value}")
+        if untagged and self.shards:
+            point.tag(SHARD_TAG, _shard(sorted(untagged), self.shards))
+        for k, v in raw.metrics.items():
+            if v is None:
+                continue
+            try:
+                point.field(k, self._converters.get(k, _untyped)(v))
+            except (TypeError, ValueError):
+                Metrics.inc("raw.fields.invalid")
+                logger.debug(f"Dropping raw field [{k}]: {v!r} does not match its schema type")
         return point
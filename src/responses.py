@@ -0,0 +1,125 @@
+"""
+JSON responses serialised with orjson.
+
+orjson handles datetime, numpy arrays/scalars and nested dicts natively, so
+handlers can return query results as-is instead of going through
+jsonable_encoder and stdlib json.
+"""
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+from collections.abc import Awaitable
+from decimal import Decimal
+from typing import Any, TypeVar
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from src.models.columnar import ColumnarResult
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Status logged for requests whose client left before the response (nginx's)
+CLIENT_CLOSED_REQUEST = 499
+
+T = TypeVar("T")
+
+# Accepted values for the `format` query parameter
+ROWS = "rows"
+COLUMNAR = "columnar"
+FORMAT_PATTERN = f"^({ROWS}|{COLUMNAR})$"
+FORMAT_DESCRIPTION = (
+    "rows: a list of objects; columnar: {columns: [...], data: [[...]]} with one"
+    " array per column (null where a row has no value)"
+)
+
+
+def _default(obj: Any):
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "item"):  # numpy scalars outside arrays
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def columnar_response(result: ColumnarResult, headers: dict | None = None, **extra) -> FastJSONResponse:
+    """Column-major payload: each metric name is sent once instead of once per row."""
+    return FastJSONResponse({"columns": result.names, "data": result.columns, **extra}, headers=headers)
+
+
+def etag(request: Request, validator: tuple) -> str:
+    """
+    Weak ETag for `request` given a validator of the data it reads (e.g. row
+    count and latest timestamp). Weak, since the compression layer may re-encode
+    the body. The query string is part of it: page, format, columns, ...
+    """
+    digest = hashlib.blake2b(f"{request.url.query}|{validator!r}".encode(), digest_size=16)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def is_not_modified(request: Request, tag: str) -> bool:
+    """If-None-Match check using weak comparison (RFC 9110, 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(tag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": tag})
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before the response was ready."""
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """
+    Await `work`, cancelling it as soon as the client disconnects, and raise
+    ClientDisconnected then. Database calls kill their server-side query when
+    cancelled. Only for requests without a body: it reads the receive channel.
+    """
+    task = asyncio.ensure_future(work)
+
+    async def disconnected() -> None:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if not task.done():
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task
+        raise ClientDisconnected()
+    return task.result()
+
+
+def client_closed() -> Response:
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
@@ -0,0 +1,26 @@
+"""
+Endpoint exposing the ingest cardinality estimates
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+
+from src.responses import FastJSONResponse
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+
+@router.get("")
+def get_cardinality(request: Request):
+    """
+    Estimated distinct values per topic and tag key ("_series": distinct tag
+    sets) over each sliding window, as counted at ingest by this worker.
+    """
+    tracker = getattr(request.app.state, "cardinality", None)
+    if tracker is None:
+        raise HTTPException(status_code=503, detail="Cardinality tracking is not enabled")
+    return FastJSONResponse({
+        "precision": tracker.precision,
+        "error": tracker.error,
+        "bucket_seconds": tracker.bucket_seconds,
+        "topics": tracker.estimates(),
+    })
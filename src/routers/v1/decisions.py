@@ -2,20 +2,112 @@
 Endpoints for querying decision data
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
+from src.configs.decision_conf import DecisionConf
+from src.models.columnar import ColumnarResult
+from src.responses import (
+    COLUMNAR,
+    FORMAT_DESCRIPTION,
+    FORMAT_PATTERN,
+    ClientDisconnected,
+    FastJSONResponse,
+    cancel_on_disconnect,
+    client_closed,
+    columnar_response,
+    dumps,
+    etag,
+    is_not_modified,
+    not_modified,
+)
 from src.services.databases import ClickHouse
+from src.services.decision_decoder import DecisionDecoder
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
+
+
+def _extracted_filters(request: Request) -> dict:
+    """Query parameters named after extracted decision columns, converted to the column type."""
+    filters = {}
+    for name, field in DecisionConf.get_fields().items():
+        value = request.query_params.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = field.convert(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Invalid value for {name}: {value}")
+    return filters
+
+
+def _projected_columns(columns: str | None) -> list[str] | None:
+    if columns is None:
+        return None
+    selected = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in selected if c not in DecisionConf.get_fields()]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown decision columns: {unknown}")
+    return selected
+
+
+def _check_format(output_format: str, decode: bool) -> None:
+    if output_format == COLUMNAR and decode:
+        raise HTTPException(status_code=422, detail="format=columnar cannot be combined with decode=true")
+
+
+def _validated_pointers(pointer: list[str] | None) -> tuple[str, ...]:
+    pointers = tuple(pointer or ())
+    if any(p and not p.startswith("/") for p in pointers):
+        raise HTTPException(status_code=422, detail=f"Invalid JSON pointer(s): {list(pointers)}")
+    return pointers
+
+
+def _stream_decoded(rows: list[dict], pointers: tuple[str, ...]):
+    """Yield a JSON array of rows whose compressed_data is replaced by the parsed decision."""
+    yield b"["
+    decoded = DecisionDecoder.decode(rows, pointers)
+    for i, (row, (document, error)) in enumerate(zip(rows, decoded)):
+        meta = {k: v for k, v in row.items() if k not in ("compressed_data", "compression_method")}
+        if error is not None:
+            meta["error"] = error
+        # The decision is already JSON text; splice it in instead of re-encoding it
+        head = dumps(meta)
+        yield (b"," if i else b"") + head[:-1] + (b',"decision":' if meta else b'"decision":')
+        yield document
+        yield b"}"
+    yield b"]"
+
+
+@router.get("/fields")
+def get_decision_fields():
+    """
+    Returns the decision fields extracted into columns at ingest, with their
+    document path and type. Each can be used as a /decisions filter or column.
+    """
+    return FastJSONResponse({
+        name: {"path": field.path, "type": field.type.__name__}
+        for name, field in DecisionConf.get_fields().items()
+    })
 
 
 @router.get("")
-def get_decisions(
+async def get_decisions(
+    request: Request,
     start_time: int = Query(..., description="Start time (Unix timestamp in seconds)"),
     end_time: int = Query(..., description="End time (Unix timestamp in seconds)"),
     cell_id: int | None = Query(None, description="Cell ID filter (optional)"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    columns: str | None = Query(
+        None, description="Comma-separated extracted columns to return (default: all)"
+    ),
+    include_payload: bool = Query(True, description="Include compressed_data in the response"),
+    decode: bool = Query(False, description="Return the parsed decision JSON instead of compressed_data"),
+    pointer: list[str] | None = Query(
+        None, description="With decode=true, JSON pointer(s) (e.g. /action/type) to return instead of the whole decision"
+    ),
+    output_format: str = Query("rows", alias="format", pattern=FORMAT_PATTERN, description=FORMAT_DESCRIPTION),
 ):
     """
     Query decision data with filters.
@@ -24,25 +116,115 @@ def get_decisions(
     - cell_id: Cell identifier
     - id: Decision record ID
     - timestamp: When the decision was made
-    - compression_method: Compression algorithm used (e.g., "gzip")
+    - compression_method: Compression algorithm used ("gzip" or "zstd")
     - compressed_data: Base64-encoded compressed decision JSON
 
+    - one column per extracted decision field (see /decisions/fields)
+
     To decompress the data:
     1. Decode base64
     2. Decompress using the specified compression method
     3. Parse resulting JSON
+
+    Extracted fields can be filtered on by passing them as query parameters
+    (e.g. ?action_type=handover); with include_payload=false only the
+    extracted columns are shipped.
+
+    With decode=true the server decompresses the page (in a process pool) and
+    streams each row with a "decision" member holding the parsed JSON, or
+    {pointer: subtree} when pointer= is given.
+
+    Responses carry an ETag derived from the row count, latest timestamp and a
+    hash of the row ids in the range; a matching If-None-Match gets 304 Not
+    Modified without the query being run.
+
+    If the client disconnects before the response is ready, the ClickHouse
+    query is killed.
     """
+    filters = _extracted_filters(request)
+    projected = _projected_columns(columns)
+    pointers = _validated_pointers(pointer)
+    _check_format(output_format, decode)
     try:
-        results = ClickHouse.service.query_decisions(
-            start_time=start_time,
-            end_time=end_time,
-            cell_id=cell_id,
-            offset=offset,
-            limit=limit,
+        validator = await cancel_on_disconnect(
+            request,
+            ClickHouse.service.decisions_validator_async(
+                start_time=start_time, end_time=end_time, cell_id=cell_id, filters=filters
+            ),
+        )
+        tag = etag(request, validator)
+        if is_not_modified(request, tag):
+            return not_modified(tag)
+        headers = {"ETag": tag}
+
+        query = (
+            ClickHouse.service.query_decisions_columns_async
+            if output_format == COLUMNAR
+            else ClickHouse.service.query_decisions_async
+        )
+        results = await cancel_on_disconnect(
+            request,
+            query(
+                start_time=start_time,
+                end_time=end_time,
+                cell_id=cell_id,
+                offset=offset,
+                limit=limit,
+                filters=filters,
+                columns=projected,
+                include_payload=include_payload or decode,
+                # The page must be the one the ETag describes
+                token=validator,
+            ),
         )
-        return results
+        if output_format == COLUMNAR:
+            return columnar_response(results, headers=headers)
+        if decode:
+            return StreamingResponse(
+                _stream_decoded(results, pointers), media_type="application/json", headers=headers
+            )
+        # Binary payloads are base64-encoded by the response encoder
+        return FastJSONResponse(results, headers=headers)
 
+    except ClientDisconnected:
+        return client_closed()
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error querying decisions: {str(e)}"
         )
+
+
+@router.get("/latest")
+def get_latest_decisions(
+    cell_id: int | None = Query(None, description="Cell ID filter (optional, default: all cells)"),
+    include_payload: bool = Query(True, description="Include compressed_data in the response"),
+    decode: bool = Query(False, description="Return the parsed decision JSON instead of compressed_data"),
+    pointer: list[str] | None = Query(
+        None, description="With decode=true, JSON pointer(s) to return instead of the whole decision"
+    ),
+    output_format: str = Query("rows", alias="format", pattern=FORMAT_PATTERN, description=FORMAT_DESCRIPTION),
+):
+    """
+    Latest decision for every cell (or one cell), in the same shape as /decisions.
+
+    Served from a materialized "latest" table, so polling it costs one row per
+    cell regardless of history. Extracted columns are not included.
+    """
+    pointers = _validated_pointers(pointer)
+    _check_format(output_format, decode)
+    try:
+        results = ClickHouse.service.query_latest_decisions(
+            cell_id=cell_id,
+            include_payload=include_payload or decode,
+        )
+        if output_format == COLUMNAR:
+            return columnar_response(ColumnarResult.from_rows(results))
+        if decode:
+            return StreamingResponse(_stream_decoded(results, pointers), media_type="application/json")
+        # Binary payloads are base64-encoded by the response encoder
+        return FastJSONResponse(results)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error querying latest decisions: {str(e)}"
+        )
@@ -0,0 +1,19 @@
+"""
+Endpoints exposing in-process service metrics
+"""
+
+from fastapi import APIRouter
+
+from src.metrics import Metrics
+from src.responses import FastJSONResponse
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+
+@router.get("")
+def get_metrics():
+    """
+    Snapshot of this worker's counters, gauges and timing summaries
+    (e.g. clickhouse.pool.in_use, clickhouse.pool.wait_seconds).
+    """
+    return FastJSONResponse(Metrics.snapshot())
@@ -4,9 +4,10 @@ Endpoints for policy service queries
 
 from fastapi import APIRouter, HTTPException, Query
 
+from src.responses import FastJSONResponse
 from src.services.databases import ClickHouse, Influx
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 
 @router.get("/fields")
@@ -29,7 +30,7 @@ def get_available_fields():
         clickhouse_metrics = []
         print(f"Warning: Failed to get ClickHouse metrics: {e}")
 
-    return {
+    return FastJSONResponse({
         "influx": influx_fields,
         "clickhouse": clickhouse_metrics
-    }
+    })
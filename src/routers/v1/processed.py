@@ -1,17 +1,75 @@
 import logging
 import os
 
+import anyio.to_thread
 from fastapi import APIRouter, HTTPException, Query, Header, Request
 
+from src.models.columnar import ColumnarResult
+from src.responses import (
+    COLUMNAR,
+    FORMAT_DESCRIPTION,
+    FORMAT_PATTERN,
+    ClientDisconnected,
+    FastJSONResponse,
+    cancel_on_disconnect,
+    client_closed,
+    columnar_response,
+    etag,
+    is_not_modified,
+    not_modified,
+)
 from src.services.databases import ClickHouse
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 POLICY_ENABLED = os.getenv("POLICY_ENABLED", "false").lower() == "true"
 
 
+def _apply_policy(request: Request, results: list[dict], x_component_id: str | None) -> list[dict]:
+    """Filter/transform rows through the policy service for the calling component."""
+    if not (POLICY_ENABLED and x_component_id):
+        return results
+    policy_client = getattr(request.app.state, "policy_client", None) if hasattr(request, "app") else None
+    if not policy_client:
+        return results
+
+    source_id = "data-storage:clickhouse"
+    filtered = []
+    for row in results:
+        try:
+            result = policy_client.process_data(
+                source_id=source_id,
+                sink_id=x_component_id,
+                data=row,
+                action="read",
+            )
+            if result.allowed:
+                filtered.append(result.data)
+        except Exception as e:
+            if policy_client._async_client.fail_open:
+                filtered.append(row)
+                logger.warning(f"Policy failed for row, allowing (fail_open): {e}")
+            else:
+                logger.warning(f"Policy failed for row, blocking (fail_closed): {e}")
+    return filtered
+
+
+async def _apply_policy_async(request: Request, results: list[dict], x_component_id: str | None) -> list[dict]:
+    """_apply_policy for async handlers: the policy client blocks, so it runs on a worker thread."""
+    if not (POLICY_ENABLED and x_component_id):
+        return results
+    return await anyio.to_thread.run_sync(_apply_policy, request, results, x_component_id)
+
+
+def _columnar(request: Request, result: ColumnarResult, x_component_id: str | None, headers: dict | None = None):
+    if POLICY_ENABLED and x_component_id:
+        # Policies work on rows; only pay for them when a policy may apply
+        result = ColumnarResult.from_rows(_apply_policy(request, result.to_rows(), x_component_id))
+    return columnar_response(result, headers=headers)
+
+
 @router.get("/fields")
 def get_processed_fields():
     """
@@ -20,13 +78,13 @@ def get_processed_fields():
     Example: {"thrputUl_mbps_mean": ["PERF_DATA"], "speed_mean": ["UE_MOBILITY"]}
     """
     try:
-        return ClickHouse.service.get_metric_event_map()
+        return FastJSONResponse(ClickHouse.service.get_metric_event_map())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching metric fields: {str(e)}")
 
 
 @router.get("")
-def get_processed_data(
+async def get_processed_data(
     request: Request,
     start_time: int = Query(..., description="Window start (Unix timestamp, seconds)"),
     end_time: int = Query(..., description="Window end (Unix timestamp, seconds)"),
@@ -37,6 +95,7 @@ def get_processed_data(
     window_duration_seconds: int | None = Query(None, description="Window duration filter (seconds)"),
     offset: int = Query(0, ge=0, description="Records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Max records to return"),
+    output_format: str = Query("rows", alias="format", pattern=FORMAT_PATTERN, description=FORMAT_DESCRIPTION),
     x_component_id: str = Header(None, alias="X-Component-ID"),
 ):
     """
@@ -45,44 +104,102 @@ def get_processed_data(
     Groups are identified by snssai_sst + dnn + event. Additional UE-level tags
     (ueIpv4Addr, supi, etc.) are returned in the ue_tags field of each row.
     Metric stats are flattened: thrputUl_mbps_mean, thrputUl_mbps_min, etc.
+    With format=columnar each metric name is sent once, as a column.
+
+    Responses carry an ETag derived from the row count and latest window_end of
+    the range; a request with a matching If-None-Match gets 304 Not Modified
+    without the query being run. The page returned with an ETag is always one
+    loaded against that same validator.
+
+    If the client disconnects before the response is ready, the ClickHouse
+    query is killed.
+    """
+    filters = {
+        "snssai_sst": snssai_sst,
+        "snssai_sd": snssai_sd,
+        "dnn": dnn,
+        "event": event,
+        "window_duration_seconds": window_duration_seconds,
+    }
+    try:
+        headers = validator = None
+        # Policy output depends on more than the stored rows; never validate it
+        if not (POLICY_ENABLED and x_component_id):
+            validator = await cancel_on_disconnect(
+                request,
+                ClickHouse.service.processed_validator_async(start_time=start_time, end_time=end_time, **filters),
+            )
+            tag = etag(request, validator)
+            if is_not_modified(request, tag):
+                return not_modified(tag)
+            headers = {"ETag": tag}
+
+        query = (
+            ClickHouse.service.query_processed_columns_async
+            if output_format == COLUMNAR
+            else ClickHouse.service.query_processed_async
+        )
+        results = await cancel_on_disconnect(
+            request,
+            query(
+                start_time=start_time,
+                end_time=end_time,
+                **filters,
+                offset=offset,
+                limit=limit,
+                # The page must be the one the ETag describes
+                token=validator,
+            ),
+        )
+
+        if output_format == COLUMNAR:
+            if POLICY_ENABLED and x_component_id:
+                results = ColumnarResult.from_rows(
+                    await _apply_policy_async(request, results.to_rows(), x_component_id)
+                )
+            return columnar_response(results, headers=headers)
+        return FastJSONResponse(await _apply_policy_async(request, results, x_component_id), headers=headers)
+
+    except ClientDisconnected:
+        return client_closed()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying processed data: {str(e)}")
+
+
+@router.get("/latest")
+def get_latest_processed(
+    request: Request,
+    snssai_sst: str | None = Query(None, description="S-NSSAI SST (slice type)"),
+    snssai_sd: str | None = Query(None, description="S-NSSAI SD (slice differentiator, 6 hex digits)"),
+    dnn: str | None = Query(None, description="Data Network Name"),
+    event: str | None = Query(None, description="Event type filter (e.g. PERF_DATA, UE_MOBILITY)"),
+    window_duration_seconds: int | None = Query(None, description="Window duration filter (seconds)"),
+    output_format: str = Query("rows", alias="format", pattern=FORMAT_PATTERN, description=FORMAT_DESCRIPTION),
+    x_component_id: str = Header(None, alias="X-Component-ID"),
+):
+    """
+    Latest processed window for every snssai_sst + snssai_sd + dnn + event +
+    window duration group, in the same shape as /processed.
+
+    Served from a materialized "latest" table: the cost depends on the number
+    of groups, not on how much history is stored.
     """
     try:
-        results = ClickHouse.service.query_processed(
-            start_time=start_time,
-            end_time=end_time,
+        query = (
+            ClickHouse.service.query_latest_processed_columns
+            if output_format == COLUMNAR
+            else ClickHouse.service.query_latest_processed
+        )
+        results = query(
             snssai_sst=snssai_sst,
             snssai_sd=snssai_sd,
             dnn=dnn,
             event=event,
             window_duration_seconds=window_duration_seconds,
-            offset=offset,
-            limit=limit,
         )
-
-        if POLICY_ENABLED and x_component_id:
-            policy_client = getattr(request.app.state, "policy_client", None) if hasattr(request, "app") else None
-            if policy_client:
-                source_id = "data-storage:clickhouse"
-                filtered = []
-                for row in results:
-                    try:
-                        result = policy_client.process_data(
-                            source_id=source_id,
-                            sink_id=x_component_id,
-                            data=row,
-                            action="read",
-                        )
-                        if result.allowed:
-                            filtered.append(result.data)
-                    except Exception as e:
-                        if policy_client._async_client.fail_open:
-                            filtered.append(row)
-                            logger.warning(f"Policy failed for row, allowing (fail_open): {e}")
-                        else:
-                            logger.warning(f"Policy failed for row, blocking (fail_closed): {e}")
-                results = filtered
-
-        return results
+        if output_format == COLUMNAR:
+            return _columnar(request, results, x_component_id)
+        return FastJSONResponse(_apply_policy(request, results, x_component_id))
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error querying processed data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error querying latest processed data: {str(e)}")
@@ -2,74 +2,241 @@ import logging
 import os
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Query, Header, Request
+import anyio.to_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
+from fastapi.responses import StreamingResponse
 
+from src.models.columnar import ColumnarResult
+from src.responses import COLUMNAR, FORMAT_DESCRIPTION, FORMAT_PATTERN, FastJSONResponse, columnar_response, dumps
+from src.models.raw import filter_keys
 from src.services.databases import Influx
+from src.services.influx_query import AGGREGATES
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 POLICY_ENABLED = os.getenv("POLICY_ENABLED", "false").lower() == "true"
 
+# /raw/stream sends rows in chunks of about this many bytes
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _tags(
+    request: Request,
+    event: str | None = Query(None, description="Event type (e.g. PERF_DATA, UE_MOBILITY)"),
+    snssai_sst: str | None = Query(None, description="S-NSSAI SST (slice type)"),
+    snssai_sd: str | None = Query(None, description="S-NSSAI SD (slice differentiator)"),
+    dnn: str | None = Query(None, description="Data Network Name"),
+    supi: str | None = Query(None, description="Subscription Permanent Identifier"),
+    gpsi: str | None = Query(None, description="Generic Public Subscription Identifier"),
+    ueIpv4Addr: str | None = Query(None, description="UE IPv4 address"),
+) -> dict:
+    """
+    Tag filters: the RAW_TAGS keys, declared so they are documented, plus any
+    other tag key of the schema, read from the query string since the schema is
+    only known at runtime.
+    """
+    tags = {
+        k: v
+        for k, v in dict(
+            event=event, snssai_sst=snssai_sst, snssai_sd=snssai_sd, dnn=dnn,
+            supi=supi, gpsi=gpsi, ueIpv4Addr=ueIpv4Addr,
+        ).items()
+        if v is not None
+    }
+    keys = filter_keys()
+    tags.update({k: v for k, v in request.query_params.items() if k in keys and k not in tags})
+    return tags
+
+
+def _split(value: str | None) -> list[str] | None:
+    """Comma-separated query parameter as a list (None when absent)."""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _series_allowed(policy_client, x_component_id: str, series: dict) -> bool:
+    """Policies work on rows: check a series as its tags plus the aggregated field."""
+    row = {**series["tags"], series["field"]: series["values"][-1] if series["values"] else None}
+    try:
+        result = policy_client.process_data(
+            source_id="data-storage:influx",
+            sink_id=x_component_id,
+            data=row,
+            action="read",
+        )
+        return result.allowed and series["field"] in result.data
+    except Exception:
+        return policy_client._async_client.fail_open
+
+
+def _allowed_rows(policy_client, x_component_id: str, rows):
+    for row in rows:
+        try:
+            result = policy_client.process_data(
+                source_id="data-storage:influx",
+                sink_id=x_component_id,
+                data=row,
+                action="read",
+            )
+            if result.allowed:
+                yield result.data
+        except Exception:
+            if policy_client._async_client.fail_open:
+                yield row
+
+
+def _ndjson(rows):
+    """One JSON document per line, sent in chunks so each write is worth compressing."""
+    chunk = bytearray()
+    for row in rows:
+        chunk += dumps(row)
+        chunk += b"\n"
+        if len(chunk) >= STREAM_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+@router.get("/fields")
+async def get_raw_fields():
+    """Fields of the raw measurement; any of them can be selected with fields=."""
+    try:
+        return FastJSONResponse(await Influx.service.known_fields_async())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching raw fields: {str(e)}")
+
 
 @router.get("")
-def get_raw_data(
+async def get_raw_data(
     request: Request,
     start_time: int = Query(..., description="Start time (Unix timestamp in seconds)"),
     end_time: int = Query(..., description="End time (Unix timestamp in seconds)"),
-    batch_number: int = Query(1, ge=1, description="Batch number"),
-    event: str = Query(None),
-    ueIpv4Addr: str = Query(None),
-    supi: str = Query(None),
-    gpsi: str = Query(None),
-    dnn: str = Query(None),
-    snssai_sst: str = Query(None),
-    snssai_sd: str = Query(None),
+    cursor: str | None = Query(None, description="next_cursor of the previous page; omit for the first page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return (default: all, see /raw/fields)"),
+    output_format: str = Query("rows", alias="format", pattern=FORMAT_PATTERN, description=FORMAT_DESCRIPTION),
+    tags: dict = Depends(_tags),
     x_component_id: str = Header(None, alias="X-Component-ID"),
 ):
     """
-    Query raw data by time range and optional tag filters.
-    At least one tag filter is recommended for meaningful results.
-    """
-    tags = {k: v for k, v in {
-        "event": event,
-        "ueIpv4Addr": ueIpv4Addr,
-        "supi": supi,
-        "gpsi": gpsi,
-        "dnn": dnn,
-        "snssai_sst": snssai_sst,
-        "snssai_sd": snssai_sd,
-    }.items() if v is not None}
+    Query raw data by time range and optional tag filters (e.g. supi=..., dnn=...:
+    any tag key of the schema). At least one is recommended for meaningful results.
 
+    Returns up to 50 rows (one per series and timestamp, oldest first) and
+    next_cursor: pass it as cursor to get the following page; null on the last.
+    fields= limits the fields read from InfluxDB; unknown names return 422.
+    """
     try:
-        results, has_next = Influx.service.query_raw_data(
+        results, next_cursor = await Influx.service.query_raw_data_async(
             start_time=start_time,
             end_time=end_time,
             tags=tags,
-            batch_number=batch_number,
+            cursor=cursor,
+            fields=_split(fields),
         )
 
         if POLICY_ENABLED and x_component_id:
             policy_client = getattr(request.app.state, "policy_client", None)
             if policy_client:
-                filtered = []
-                for row in results:
-                    try:
-                        result = policy_client.process_data(
-                            source_id="data-storage:influx",
-                            sink_id=x_component_id,
-                            data=row,
-                            action="read",
-                        )
-                        if result.allowed:
-                            filtered.append(result.data)
-                    except Exception as e:
-                        if policy_client._async_client.fail_open:
-                            filtered.append(row)
-                results = filtered
-
-        return {"data": results, "has_next": has_next}
+                # The policy client blocks: keep it off the event loop
+                results = await anyio.to_thread.run_sync(
+                    lambda: list(_allowed_rows(policy_client, x_component_id, results))
+                )
+
+        if output_format == COLUMNAR:
+            return columnar_response(ColumnarResult.from_rows(results), next_cursor=next_cursor)
+        return FastJSONResponse({"data": results, "next_cursor": next_cursor})
 
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error querying raw data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/aggregate")
+async def get_raw_aggregate(
+    request: Request,
+    start_time: int = Query(..., description="Start time (Unix timestamp in seconds)"),
+    end_time: int = Query(..., description="End time (Unix timestamp in seconds)"),
+    every: str = Query("1m", description="Window size: a number and s, m, h or d (e.g. 30s, 5m, 1h)"),
+    fn: str = Query("mean", description=f"Comma-separated aggregates: {', '.join(AGGREGATES)}"),
+    group_by: str | None = Query(None, description="Comma-separated tags to group by (tag keys of the schema)"),
+    fields: str | None = Query(None, description="Comma-separated fields to aggregate (default: all numeric)"),
+    tags: dict = Depends(_tags),
+    x_component_id: str = Header(None, alias="X-Component-ID"),
+):
+    """
+    Downsampled raw metrics, aggregated in InfluxDB (aggregateWindow).
+
+    Takes the same tag filters as /raw, except on keys written as fields
+    (422). Returns one compact series per
+    group_by tag values, field and function:
+    {"series": [{"tags": {...}, "field": "rsrp", "fn": "mean", "times": [...], "values": [...]}]}
+    Windows without points are left out.
+    """
+    try:
+        series = await Influx.service.aggregate_raw_data_async(
+            start_time=start_time,
+            end_time=end_time,
+            every=every,
+            functions=_split(fn) or [],
+            tags=tags,
+            group_by=_split(group_by),
+            fields=_split(fields),
+        )
+
+        if POLICY_ENABLED and x_component_id:
+            policy_client = getattr(request.app.state, "policy_client", None)
+            if policy_client:
+                series = await anyio.to_thread.run_sync(
+                    lambda: [s for s in series if _series_allowed(policy_client, x_component_id, s)]
+                )
+
+        return FastJSONResponse({"series": series})
+
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error aggregating raw data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stream")
+def stream_raw_data(
+    request: Request,
+    start_time: int = Query(..., description="Start time (Unix timestamp in seconds)"),
+    end_time: int = Query(..., description="End time (Unix timestamp in seconds)"),
+    fields: str | None = Query(None, description="Comma-separated fields to return (default: all, see /raw/fields)"),
+    tags: dict = Depends(_tags),
+    x_component_id: str = Header(None, alias="X-Component-ID"),
+):
+    """
+    Every raw row in the range as newline-delimited JSON, without paging.
+    Takes the same tag filters as /raw.
+
+    Rows are the same as /raw's, grouped by series and in time order within a
+    series. They are converted and sent while InfluxDB is still answering, so
+    large ranges start arriving at once and are never held in memory.
+    """
+    try:
+        rows = Influx.service.stream_raw_data(
+            start_time=start_time,
+            end_time=end_time,
+            tags=tags,
+            fields=_split(fields),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error streaming raw data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if POLICY_ENABLED and x_component_id:
+        policy_client = getattr(request.app.state, "policy_client", None)
+        if policy_client:
+            rows = _allowed_rows(policy_client, x_component_id, rows)
+
+    return StreamingResponse(_ndjson(rows), media_type="application/x-ndjson")
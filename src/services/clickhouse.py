@@ -1,16 +1,47 @@
-from contextlib import contextmanager
+import logging
+import uuid
+from collections.abc import Callable
 from datetime import datetime, timezone
-from queue import Empty, Queue
 
+import anyio
+import anyio.to_thread
 import clickhouse_connect
 from clickhouse_connect.driver.client import Client
+from clickhouse_connect.driver.exceptions import OperationalError
 
 from src.configs.clickhouse_conf import ClickhouseConf
+from src.configs.decision_conf import CORE_DECISION_COLUMNS, DecisionConf
+from src.models import arrow
+from src.metrics import Metrics
+from src.models.columnar import ColumnarResult
+from src.models.decision import SUPPORTED_CODECS
+from src.services.clickhouse_native import NETWORK_ERRORS, NativeClient
 from src.services.clickhouse_query import QueryCH
+from src.services.pool import ClientPool
+from src.services.query_cache import QueryCache
+from src.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 _KNOWN_TAGS = {"snssai_sst", "snssai_sd", "dnn", "event"}
 _REQUIRED_TAGS = {"snssai_sst", "dnn", "event"}
 
+# Extracted decision fields are nullable: not every document carries every field
+_COLUMN_TYPES = {
+    str: "Nullable(String)",
+    int: "Nullable(Int64)",
+    float: "Nullable(Float64)",
+    bool: "Nullable(Bool)",
+    datetime: "Nullable(DateTime64(3))",
+}
+_PARAM_TYPES = {
+    str: "String",
+    int: "Int64",
+    float: "Float64",
+    bool: "Bool",
+    datetime: "DateTime64(3)",
+}
+
 
 def transform_processor_output(data: dict) -> dict:
     """
@@ -66,40 +97,99 @@ def transform_processor_output(data: dict) -> dict:
     }
 
 
+def _processed_columns(result: ColumnarResult) -> ColumnarResult:
+    """Explode the metrics map into columns and expose window bounds as *_time."""
+    return result.explode_map("metrics").rename(
+        {"window_start": "window_start_time", "window_end": "window_end_time"}
+    )
+
+
+def _first_row(result: ColumnarResult) -> tuple:
+    """The single row of an aggregate query, e.g. a validator."""
+    return tuple(column[0] for column in result.columns)
+
+
 class ClickHouseService:
-    def __init__(self, pool_size: int = 4) -> None:
+    def __init__(self, pool_size: int | None = None) -> None:
         self.conf = ClickhouseConf()
-        self._pool: Queue[Client] = Queue(maxsize=pool_size)
-        self._pool_size = pool_size
+        self._pool_size = self.conf.pool_min if pool_size is None else pool_size
+        self._pool: ClientPool[Client] = ClientPool(
+            self._create_client,
+            min_size=self._pool_size,
+            max_size=max(self._pool_size, self.conf.pool_max),
+            timeout=self.conf.pool_timeout,
+            idle_timeout=self.conf.pool_idle_seconds,
+            validate_after=self.conf.pool_validate_after,
+            health_check=lambda client: client.ping(),
+            close=lambda client: client.close(),
+            is_broken=self._is_broken,
+            name="clickhouse",
+        )
+        # Range results for /processed and /decisions; the sinks invalidate on write
+        self.cache: QueryCache[ColumnarResult] = QueryCache(
+            max_bytes=self.conf.cache_max_bytes,
+            settled_after=self.conf.cache_settled_after,
+            settled_ttl=self.conf.cache_settled_ttl,
+            recent_ttl=self.conf.cache_recent_ttl,
+            name="clickhouse",
+            revalidate_after=self.conf.cache_revalidate_after,
+        )
+        # Identical concurrent queries (a dashboard refreshed by many viewers) share one call
+        self._flight = SingleFlight(name="clickhouse")
 
     def connect(self):
-        for _ in range(self._pool_size):
-            self._pool.put(self._create_client())
-
-    def _create_client(self) -> Client:
+        # Checked here rather than on the first decision, which may come much later
+        if self.conf.decision_codec not in SUPPORTED_CODECS:
+            raise ValueError(f"Unknown CLICKHOUSE_DECISION_CODEC: {self.conf.decision_codec}")
+        self._pool.fill()
+        self.ensure_decision_columns()
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def _create_client(self) -> Client | NativeClient:
+        compression = None if self.conf.compression in ("", "none") else self.conf.compression
+        if self.conf.transport == "native":
+            return NativeClient(
+                host=self.conf.host,
+                port=self.conf.port,
+                username=self.conf.user,
+                password=self.conf.password,
+                compression=compression,
+            )
+        if self.conf.transport != "http":
+            raise ValueError(f"Unknown CLICKHOUSE_TRANSPORT: {self.conf.transport}")
         return clickhouse_connect.get_client(
             host=self.conf.host,
             port=self.conf.port,
             username=self.conf.user,
             password=self.conf.password,
+            compress=compression or False,
         )
 
-    @contextmanager
+    def _is_broken(self, e: Exception) -> bool:
+        if self.conf.transport == "native":
+            return isinstance(e, NETWORK_ERRORS)
+        return isinstance(e, OperationalError)
+
     def _get_client(self):
-        """Borrow a client from the pool; create a one-off if pool is empty (startup race)."""
-        try:
-            client = self._pool.get(timeout=5)
-        except Empty:
-            # Pool empty — create a single fresh client without touching the pool.
-            # Concurrent threads that also hit Empty each get their own one-off client;
-            # the pool naturally refills as normal borrowers return their clients.
-            client = self._create_client()
-            yield client
+        """Borrow a client from the pool (waits up to pool_timeout, then raises PoolTimeout)."""
+        return self._pool.connection()
+
+    def ensure_decision_columns(self) -> None:
+        """Add a column to analytics.decisions for every configured extracted field."""
+        fields = DecisionConf.get_fields()
+        if not fields:
             return
         try:
-            yield client
-        finally:
-            self._pool.put(client)
+            with self._get_client() as client:
+                for name, field in fields.items():
+                    client.command(
+                        f"ALTER TABLE analytics.decisions ADD COLUMN IF NOT EXISTS"
+                        f" {name} {_COLUMN_TYPES[field.type]}"
+                    )
+        except Exception as e:
+            logger.warning(f"Could not add extracted decision columns: {e}")
 
     def get_metric_keys(self) -> list[str]:
         with self._get_client() as client:
@@ -127,24 +217,153 @@ class ClickHouseService:
         except Exception as e:
             raise Exception(f"Failed to write to ClickHouse: {e}")
 
+    def _use_arrow(self) -> bool:
+        # The native protocol is columnar already; Arrow is an HTTP input format
+        return (
+            self.conf.insert_format == "arrow"
+            and self.conf.transport == "http"
+            and arrow.available
+        )
+
     def write_batch(self, data_list: list[dict]) -> None:
         try:
             transformed_list = [transform_processor_output(d) for d in data_list]
             if not transformed_list:
                 return
-            column_names = list(transformed_list[0].keys())
-            values = [list(d.values()) for d in transformed_list]
             with self._get_client() as client:
+                if self._use_arrow():
+                    client.insert_arrow(
+                        "analytics.processed",
+                        arrow.processed_table(transformed_list),
+                        settings={"async_insert": 1, "wait_for_async_insert": 0},
+                    )
+                    return
                 client.insert(
                     "analytics.processed",
-                    values,
-                    column_names=column_names,
+                    [list(d.values()) for d in transformed_list],
+                    column_names=list(transformed_list[0].keys()),
                     settings={"async_insert": 1, "wait_for_async_insert": 0},
                 )
         except Exception as e:
             raise Exception(f"Failed to batch write to ClickHouse: {e}")
 
-    def query_processed(
+    def _query_columns(self, query: str, params: dict, column_formats: dict | None = None) -> ColumnarResult:
+        with self._get_client() as client:
+            result = client.query(query, parameters=params, column_formats=column_formats)
+        return ColumnarResult.from_query(result)
+
+    async def _query_columns_async(
+        self, query: str, params: dict, column_formats: dict | None = None
+    ) -> ColumnarResult:
+        """
+        _query_columns on a worker thread, awaited without holding the caller's
+        thread. The query runs under its own query_id: if the awaiting task is
+        cancelled (the HTTP client went away), it is killed on the server rather
+        than left running to completion.
+        """
+        query_id = uuid.uuid4().hex
+
+        def run() -> ColumnarResult:
+            with self._get_client() as client:
+                result = client.query(
+                    query, parameters=params, column_formats=column_formats, settings={"query_id": query_id}
+                )
+            return ColumnarResult.from_query(result)
+
+        try:
+            return await anyio.to_thread.run_sync(run, abandon_on_cancel=True)
+        except anyio.get_cancelled_exc_class():
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(self._kill_query, query_id)
+            raise
+
+    def _kill_query(self, query_id: str) -> None:
+        try:
+            with self._get_client() as client:
+                client.command(
+                    "KILL QUERY WHERE query_id = {query_id:String} ASYNC", parameters={"query_id": query_id}
+                )
+            Metrics.inc("clickhouse.queries.killed")
+        except Exception as e:
+            logger.warning(f"Could not kill query {query_id}: {e}")
+
+    def _cached_columns(
+        self,
+        table: str,
+        start_time: int,
+        end_time: int,
+        query: str,
+        params: dict,
+        column_formats: dict | None = None,
+        transform: Callable[[ColumnarResult], ColumnarResult] | None = None,
+        validator: tuple[str, dict] | None = None,
+        max_ttl: float | None = None,
+        token: tuple | None = None,
+    ) -> ColumnarResult:
+        """
+        _query_columns through the range cache; the SQL text and parameters are the
+        key. Concurrent misses for the same key share a single query.
+
+        `validator` is a (query, params) aggregate over the same rows; long-lived
+        entries are only served while it is unchanged, which catches writes made
+        by other replicas that this process's invalidations never see.
+        `token` is a validator result the caller already holds (its ETag): only
+        an entry loaded against it is served, otherwise the page is reloaded.
+        """
+        def load() -> ColumnarResult:
+            result = self._query_columns(query, params, column_formats)
+            return transform(result) if transform else result
+
+        def validate() -> tuple:
+            return _first_row(self._query_columns(*validator))
+
+        key = (query, tuple(sorted(params.items())))
+        # Callers holding different tokens must not share a load
+        result = self._flight.do(
+            (key, token),
+            lambda: self.cache.cached(
+                key, table, start_time, end_time, load, ColumnarResult.estimated_size,
+                validate if validator else None, max_ttl, token,
+            ),
+        )
+        # Callers reshape what they get back; the shared result must stay untouched
+        return result.copy()
+
+    async def _cached_columns_async(
+        self,
+        table: str,
+        start_time: int,
+        end_time: int,
+        query: str,
+        params: dict,
+        column_formats: dict | None = None,
+        transform: Callable[[ColumnarResult], ColumnarResult] | None = None,
+        validator: tuple[str, dict] | None = None,
+        max_ttl: float | None = None,
+        token: tuple | None = None,
+    ) -> ColumnarResult:
+        """_cached_columns for async callers; same cache and coalescing."""
+        async def load() -> ColumnarResult:
+            result = await self._query_columns_async(query, params, column_formats)
+            return transform(result) if transform else result
+
+        async def validate() -> tuple:
+            return _first_row(await self._query_columns_async(*validator))
+
+        async def cached() -> ColumnarResult:
+            return await self.cache.cached_async(
+                key, table, start_time, end_time, load, ColumnarResult.estimated_size,
+                validate if validator else None, max_ttl, token,
+            )
+
+        key = (query, tuple(sorted(params.items())))
+        result = await self._flight.do_async((key, token), cached)
+        return result.copy()
+
+    def query_processed(self, *args, **kwargs) -> list[dict]:
+        return self.query_processed_columns(*args, **kwargs).to_rows()
+
+    def _processed_where(
         self,
         start_time: int,
         end_time: int,
@@ -153,100 +372,368 @@ class ClickHouseService:
         snssai_sd: str | None = None,
         event: str | None = None,
         window_duration_seconds: int | None = None,
-        offset: int = 0,
-        limit: int = 100,
-    ) -> list[dict]:
+    ) -> tuple[str, dict]:
         params: dict = {
             "start_time": start_time,
             "end_time": end_time,
-            "offset": offset,
-            "limit": limit,
         }
 
-        query = (
-            "SELECT * FROM analytics.processed"
+        where = (
             " WHERE toUnixTimestamp(window_start) >= {start_time:Int64}"
             " AND toUnixTimestamp(window_end) <= {end_time:Int64}"
         )
 
         if snssai_sst is not None:
-            query += " AND snssai_sst = {snssai_sst:String}"
+            where += " AND snssai_sst = {snssai_sst:String}"
             params["snssai_sst"] = snssai_sst
 
         if dnn is not None:
-            query += " AND dnn = {dnn:String}"
+            where += " AND dnn = {dnn:String}"
             params["dnn"] = dnn
 
         if snssai_sd is not None:
-            query += " AND snssai_sd = {snssai_sd:String}"
+            where += " AND snssai_sd = {snssai_sd:String}"
             params["snssai_sd"] = snssai_sd
 
         if event is not None:
-            query += " AND event = {event:String}"
+            where += " AND event = {event:String}"
             params["event"] = event
 
         if window_duration_seconds is not None:
             # Stored as Int32; use exact integer match
-            query += " AND window_duration_seconds = {window_duration_seconds:Int32}"
+            where += " AND window_duration_seconds = {window_duration_seconds:Int32}"
             params["window_duration_seconds"] = int(window_duration_seconds)
 
+        return where, params
+
+    def query_processed_columns(
+        self,
+        start_time: int,
+        end_time: int,
+        snssai_sst: str | None = None,
+        dnn: str | None = None,
+        snssai_sd: str | None = None,
+        event: str | None = None,
+        window_duration_seconds: int | None = None,
+        offset: int = 0,
+        limit: int = 100,
+        token: tuple | None = None,
+    ) -> ColumnarResult:
+        """`token`: the processed_validator result the caller's ETag is derived from."""
+        query, params = self._processed_query(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds, offset, limit
+        )
+        validator = self._processed_validator_query(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+        )
+        return self._cached_columns(
+            "processed", start_time, end_time, query, params, transform=_processed_columns,
+            validator=validator, token=token,
+        )
+
+    async def query_processed_async(self, *args, **kwargs) -> list[dict]:
+        return (await self.query_processed_columns_async(*args, **kwargs)).to_rows()
+
+    async def query_processed_columns_async(
+        self,
+        start_time: int,
+        end_time: int,
+        snssai_sst: str | None = None,
+        dnn: str | None = None,
+        snssai_sd: str | None = None,
+        event: str | None = None,
+        window_duration_seconds: int | None = None,
+        offset: int = 0,
+        limit: int = 100,
+        token: tuple | None = None,
+    ) -> ColumnarResult:
+        query, params = self._processed_query(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds, offset, limit
+        )
+        validator = self._processed_validator_query(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+        )
+        return await self._cached_columns_async(
+            "processed", start_time, end_time, query, params, transform=_processed_columns,
+            validator=validator, token=token,
+        )
+
+    def _processed_query(
+        self, start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds, offset, limit
+    ) -> tuple[str, dict]:
+        where, params = self._processed_where(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+        )
+        params["offset"] = offset
+        params["limit"] = limit
+
         # LIMIT 1 BY deduplicates rows with the same identity key
         # (data-storage can receive the same window more than once on restart).
         # Key excludes window_start so that LIMIT 1 BY actually collapses duplicates.
-        query += (
-            " ORDER BY window_end DESC"
+        query = (
+            "SELECT * FROM analytics.processed"
+            + where
+            + " ORDER BY window_end DESC"
             " LIMIT 1 BY snssai_sst, snssai_sd, dnn, event, window_start"
             " LIMIT {limit:Int32} OFFSET {offset:Int32}"
         )
+        return query, params
 
-        with self._get_client() as client:
-            result = client.query(query, parameters=params)
-            column_names = result.column_names
-            rows = [dict(zip(column_names, row)) for row in result.result_rows]
-
-        for row in rows:
-            metrics = row.pop("metrics", {})
-            row.update(metrics)
-            if "window_start" in row:
-                row["window_start_time"] = row.pop("window_start")
-            if "window_end" in row:
-                row["window_end_time"] = row.pop("window_end")
-        return rows
-
-    def query_decisions(
+    def processed_validator(
+        self,
+        start_time: int,
+        end_time: int,
+        snssai_sst: str | None = None,
+        dnn: str | None = None,
+        snssai_sd: str | None = None,
+        event: str | None = None,
+        window_duration_seconds: int | None = None,
+    ) -> tuple:
+        """
+        (row count, latest window_end) of the rows a /processed query selects.
+
+        An aggregate over the primary key, much cheaper than the query itself;
+        if it is unchanged, so is every page of that query. Cached like results,
+        but for at most revalidate_after seconds: other replicas' writes must show.
+        """
+        query, params = self._processed_validator_query(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+        )
+        return _first_row(self._cached_columns(
+            "processed", start_time, end_time, query, params, max_ttl=self.cache.revalidate_after or None
+        ))
+
+    async def processed_validator_async(
+        self,
+        start_time: int,
+        end_time: int,
+        snssai_sst: str | None = None,
+        dnn: str | None = None,
+        snssai_sd: str | None = None,
+        event: str | None = None,
+        window_duration_seconds: int | None = None,
+    ) -> tuple:
+        query, params = self._processed_validator_query(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+        )
+        return _first_row(await self._cached_columns_async(
+            "processed", start_time, end_time, query, params, max_ttl=self.cache.revalidate_after or None
+        ))
+
+    def _processed_validator_query(
+        self, start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+    ) -> tuple[str, dict]:
+        where, params = self._processed_where(
+            start_time, end_time, snssai_sst, dnn, snssai_sd, event, window_duration_seconds
+        )
+        return "SELECT count() AS rows, max(window_end) AS last FROM analytics.processed" + where, params
+
+    def query_latest_processed(self, *args, **kwargs) -> list[dict]:
+        return self.query_latest_processed_columns(*args, **kwargs).to_rows()
+
+    def query_latest_processed_columns(
+        self,
+        snssai_sst: str | None = None,
+        dnn: str | None = None,
+        snssai_sd: str | None = None,
+        event: str | None = None,
+        window_duration_seconds: int | None = None,
+    ) -> ColumnarResult:
+        """Most recent window per (slice, dnn, event, window duration), from analytics.processed_latest."""
+        params: dict = {}
+        conditions = []
+        for name, value in (
+            ("snssai_sst", snssai_sst),
+            ("dnn", dnn),
+            ("snssai_sd", snssai_sd),
+            ("event", event),
+        ):
+            if value is not None:
+                conditions.append(f"{name} = {{{name}:String}}")
+                params[name] = value
+        if window_duration_seconds is not None:
+            conditions.append("window_duration_seconds = {window_duration_seconds:Int32}")
+            params["window_duration_seconds"] = int(window_duration_seconds)
+
+        query = QueryCH.processed_latest
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        return _processed_columns(self._query_columns(query, params))
+
+    def query_latest_decisions(
+        self,
+        cell_id: int | None = None,
+        include_payload: bool = True,
+    ) -> list[dict]:
+        """Most recent decision per cell, from analytics.decisions_latest."""
+        query = QueryCH.decisions_latest if include_payload else QueryCH.decisions_latest_meta
+        params: dict = {}
+        if cell_id is not None:
+            query += " WHERE cell_id = {cell_id:Int32}"
+            params["cell_id"] = cell_id
+
+        return self._query_columns(
+            query, params, column_formats={"compressed_data": "bytes"}
+        ).to_rows()
+
+    def query_decisions(self, *args, **kwargs) -> list[dict]:
+        return self.query_decisions_columns(*args, **kwargs).to_rows()
+
+    def query_decisions_columns(
         self,
         start_time: int,
         end_time: int,
         cell_id: int | None = None,
         offset: int = 0,
         limit: int = 100,
-    ) -> list[dict]:
-        params = {
+        filters: dict | None = None,
+        columns: list[str] | None = None,
+        include_payload: bool = True,
+        token: tuple | None = None,
+    ) -> ColumnarResult:
+        """
+        Query decisions, optionally filtered/projected on extracted columns.
+
+        `filters` maps extracted column names to (already converted) values;
+        `columns` selects which extracted columns are returned (default: all).
+        With include_payload=False the compressed blob is not fetched at all.
+        `token` is the decisions_validator result the caller's ETag is derived
+        from; a cached page loaded against another validator is not served.
+        """
+        query, params = self._decisions_query(
+            start_time, end_time, cell_id, offset, limit, filters, columns, include_payload
+        )
+        # Payloads are binary; without this the driver would try to utf-8 decode them
+        return self._cached_columns(
+            "decisions", start_time, end_time, query, params, column_formats={"compressed_data": "bytes"},
+            validator=self._decisions_validator_query(start_time, end_time, cell_id, filters), token=token,
+        )
+
+    async def query_decisions_async(self, *args, **kwargs) -> list[dict]:
+        return (await self.query_decisions_columns_async(*args, **kwargs)).to_rows()
+
+    async def query_decisions_columns_async(
+        self,
+        start_time: int,
+        end_time: int,
+        cell_id: int | None = None,
+        offset: int = 0,
+        limit: int = 100,
+        filters: dict | None = None,
+        columns: list[str] | None = None,
+        include_payload: bool = True,
+        token: tuple | None = None,
+    ) -> ColumnarResult:
+        query, params = self._decisions_query(
+            start_time, end_time, cell_id, offset, limit, filters, columns, include_payload
+        )
+        return await self._cached_columns_async(
+            "decisions", start_time, end_time, query, params, column_formats={"compressed_data": "bytes"},
+            validator=self._decisions_validator_query(start_time, end_time, cell_id, filters), token=token,
+        )
+
+    def _decisions_query(
+        self, start_time, end_time, cell_id, offset, limit, filters, columns, include_payload
+    ) -> tuple[str, dict]:
+        extracted = DecisionConf.get_fields()
+        where, params = self._decisions_where(start_time, end_time, cell_id, filters)
+        params["offset"] = offset
+        params["limit"] = limit
+
+        selected = ["cell_id", "id", "timestamp", "compression_method"]
+        if include_payload:
+            selected.append("compressed_data")
+        for name in extracted if columns is None else columns:
+            if name not in extracted:
+                raise ValueError(f"Unknown decision column: {name}")
+            selected.append(name)
+
+        query = (
+            f"SELECT {', '.join(selected)} FROM analytics.decisions"
+            + where
+            + " ORDER BY timestamp DESC LIMIT {limit:Int32} OFFSET {offset:Int32}"
+        )
+        return query, params
+
+    def _decisions_where(
+        self,
+        start_time: int,
+        end_time: int,
+        cell_id: int | None = None,
+        filters: dict | None = None,
+    ) -> tuple[str, dict]:
+        extracted = DecisionConf.get_fields()
+        params: dict = {
             "start_time": start_time,
             "end_time": end_time,
-            "offset": offset,
-            "limit": limit,
         }
 
+        where = (
+            " WHERE toUnixTimestamp(timestamp) >= {start_time:Int64}"
+            " AND toUnixTimestamp(timestamp) <= {end_time:Int64}"
+        )
+
         if cell_id is not None:
-            query = QueryCH.decisions
+            where += " AND cell_id = {cell_id:Int32}"
             params["cell_id"] = cell_id
-        else:
-            query = QueryCH.decisions_all
 
-        with self._get_client() as client:
-            result = client.query(query, parameters=params)
+        for name, value in (filters or {}).items():
+            if name not in extracted:
+                raise ValueError(f"Unknown decision column: {name}")
+            where += f" AND {name} = {{f_{name}:{_PARAM_TYPES[extracted[name].type]}}}"
+            params[f"f_{name}"] = value
 
-        column_names = result.column_names
-        return [dict(zip(column_names, row)) for row in result.result_rows]
+        return where, params
+
+    def decisions_validator(
+        self,
+        start_time: int,
+        end_time: int,
+        cell_id: int | None = None,
+        filters: dict | None = None,
+    ) -> tuple:
+        """
+        (row count, latest timestamp, id digest) of the rows a /decisions query
+        selects; see processed_validator. A re-sent decision replaces its row
+        (ReplacingMergeTree) under a new id, leaving count and timestamp alone: only
+        the digest moves. Payloads are not read; id is a plain UInt64 column.
+        """
+        query, params = self._decisions_validator_query(start_time, end_time, cell_id, filters)
+        return _first_row(self._cached_columns(
+            "decisions", start_time, end_time, query, params, max_ttl=self.cache.revalidate_after or None
+        ))
+
+    async def decisions_validator_async(
+        self,
+        start_time: int,
+        end_time: int,
+        cell_id: int | None = None,
+        filters: dict | None = None,
+    ) -> tuple:
+        query, params = self._decisions_validator_query(start_time, end_time, cell_id, filters)
+        return _first_row(await self._cached_columns_async(
+            "decisions", start_time, end_time, query, params, max_ttl=self.cache.revalidate_after or None
+        ))
+
+    def _decisions_validator_query(self, start_time, end_time, cell_id, filters) -> tuple[str, dict]:
+        where, params = self._decisions_where(start_time, end_time, cell_id, filters)
+        query = (
+            "SELECT count() AS rows, max(timestamp) AS last,"
+            " sum(cityHash64(id)) AS digest FROM analytics.decisions"
+            + where
+        )
+        return query, params
 
     def write_decision(
         self,
         cell_id: int,
         timestamp: datetime,
         compression_method: str,
-        compressed_data: str,
+        compressed_data: bytes,
+        fields: dict | None = None,
     ) -> None:
+        fields = fields or {}
         try:
             with self._get_client() as client:
                 count_query = "SELECT COUNT(*) FROM analytics.decisions WHERE cell_id = {cell_id:Int32}"
@@ -255,9 +742,51 @@ class ClickHouseService:
 
                 client.insert(
                     "analytics.decisions",
-                    [[cell_id, next_id, timestamp, compression_method, compressed_data]],
-                    column_names=["cell_id", "id", "timestamp", "compression_method", "compressed_data"],
+                    [[cell_id, next_id, timestamp, compression_method, compressed_data, *fields.values()]],
+                    column_names=[
+                        "cell_id", "id", "timestamp", "compression_method", "compressed_data", *fields.keys()
+                    ],
                     settings={"async_insert": 1, "wait_for_async_insert": 0},
                 )
         except Exception as e:
             raise Exception(f"Failed to write decision to ClickHouse: {e}")
+
+    def write_decisions(self, decisions: list[dict]) -> None:
+        """
+        Batch insert decisions.
+
+        Each item holds cell_id, timestamp, compression_method, compressed_data and
+        any extracted field values by column name. Ids continue each cell's sequence.
+        """
+        if not decisions:
+            return
+        fields = DecisionConf.get_fields()
+        try:
+            with self._get_client() as client:
+                result = client.query(
+                    "SELECT cell_id, COUNT(*) FROM analytics.decisions"
+                    " WHERE cell_id IN {cells:Array(Int32)} GROUP BY cell_id",
+                    parameters={"cells": sorted({d["cell_id"] for d in decisions})},
+                )
+                last_id = dict(result.result_rows)
+                rows = []
+                for decision in decisions:
+                    cell_id = decision["cell_id"]
+                    last_id[cell_id] = last_id.get(cell_id, 0) + 1
+                    rows.append({**decision, "id": last_id[cell_id]})
+
+                settings = {"async_insert": 1, "wait_for_async_insert": 0}
+                if self._use_arrow():
+                    client.insert_arrow(
+                        "analytics.decisions", arrow.decisions_table(rows, fields), settings=settings
+                    )
+                    return
+                column_names = [*CORE_DECISION_COLUMNS, *fields]
+                client.insert(
+                    "analytics.decisions",
+                    [[row.get(name) for name in column_names] for row in rows],
+                    column_names=column_names,
+                    settings=settings,
+                )
+        except Exception as e:
+            raise Exception(f"Failed to batch write decisions to ClickHouse: {e}")
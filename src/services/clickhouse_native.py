@@ -0,0 +1,106 @@
+"""
+Native (TCP) ClickHouse transport.
+
+Wraps clickhouse-driver behind the subset of the clickhouse-connect Client API
+that ClickHouseService uses, so the service is transport-agnostic.
+"""
+
+import socket
+
+try:
+    from clickhouse_driver import Client as DriverClient
+    from clickhouse_driver.errors import NetworkError, SocketTimeoutError
+except ImportError:  # optional dependency: pip install "nwdaf-storage[native]"
+    DriverClient = None
+    NetworkError = SocketTimeoutError = None
+
+# Errors after which a native connection must not be reused
+NETWORK_ERRORS: tuple[type[BaseException], ...] = tuple(
+    e for e in (NetworkError, SocketTimeoutError, socket.error, EOFError) if e is not None
+)
+
+
+class NativeQueryResult:
+    """Mirrors the parts of clickhouse-connect's QueryResult used by the service."""
+
+    def __init__(self, column_names: list[str], result_columns: list[list]) -> None:
+        self.column_names = column_names
+        self.result_columns = result_columns
+
+    @property
+    def result_rows(self) -> list[tuple]:
+        return list(zip(*self.result_columns))
+
+
+class NativeClient:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        compression: str | None = "lz4",
+    ) -> None:
+        if DriverClient is None:
+            raise ImportError(
+                "CLICKHOUSE_TRANSPORT=native requires clickhouse-driver "
+                '(pip install "nwdaf-storage[native]")'
+            )
+        self._client = DriverClient(
+            host=host,
+            port=port,
+            user=username,
+            password=password,
+            compression=compression or False,
+            # Keep the {name:Type} placeholders used with the HTTP client
+            settings={"server_side_params": True},
+        )
+
+    def query(
+        self,
+        query: str,
+        parameters: dict | None = None,
+        column_formats: dict | None = None,
+        settings: dict | None = None,
+    ) -> NativeQueryResult:
+        settings = dict(settings or {})
+        # An HTTP setting in clickhouse-connect, an execute() argument here
+        query_id = settings.pop("query_id", None)
+        binary = {name for name, fmt in (column_formats or {}).items() if fmt == "bytes"}
+        if binary:
+            settings["strings_as_bytes"] = True
+
+        columns, types = self._client.execute(
+            query, parameters or {}, with_column_types=True, settings=settings, columnar=True, query_id=query_id
+        )
+        names = [name for name, _ in types]
+        columns = [list(column) for column in columns] or [[] for _ in names]
+
+        if binary:
+            # strings_as_bytes applies to every column; decode the ones not asked for as bytes
+            for i, name in enumerate(names):
+                if name not in binary:
+                    columns[i] = [v.decode("utf-8") if isinstance(v, bytes) else v for v in columns[i]]
+        return NativeQueryResult(names, columns)
+
+    def insert(
+        self,
+        table: str,
+        data: list[list],
+        column_names: list[str],
+        settings: dict | None = None,
+    ) -> None:
+        self._client.execute(
+            f"INSERT INTO {table} ({', '.join(column_names)}) VALUES",
+            data,
+            settings=settings,
+        )
+
+    def command(self, cmd: str, parameters: dict | None = None, settings: dict | None = None):
+        return self._client.execute(cmd, parameters or {}, settings=settings)
+
+    def ping(self) -> bool:
+        return self._client.execute("SELECT 1") == [(1,)]
+
+    def close(self) -> None:
+        self._client.disconnect()
@@ -10,33 +10,18 @@ class QueryCH:
     GROUP BY metric_key
     """
 
-    decisions = """
-    SELECT
-        cell_id,
-        id,
-        timestamp,
-        compression_method,
-        compressed_data
-    FROM analytics.decisions
-    WHERE cell_id = {cell_id:Int32}
-      AND toUnixTimestamp(timestamp) >= {start_time:Int64}
-      AND toUnixTimestamp(timestamp) <= {end_time:Int64}
-    ORDER BY timestamp DESC
-    LIMIT {limit:Int32}
-    OFFSET {offset:Int32}
+    # FINAL collapses to one row per key; these tables hold one row per cell/group
+    processed_latest = """
+    SELECT *
+    FROM analytics.processed_latest FINAL
     """
 
-    decisions_all = """
-    SELECT
-        cell_id,
-        id,
-        timestamp,
-        compression_method,
-        compressed_data
-    FROM analytics.decisions
-    WHERE toUnixTimestamp(timestamp) >= {start_time:Int64}
-      AND toUnixTimestamp(timestamp) <= {end_time:Int64}
-    ORDER BY timestamp DESC
-    LIMIT {limit:Int32}
-    OFFSET {offset:Int32}
+    decisions_latest = """
+    SELECT cell_id, id, timestamp, compression_method, compressed_data
+    FROM analytics.decisions_latest FINAL
+    """
+
+    decisions_latest_meta = """
+    SELECT cell_id, id, timestamp, compression_method
+    FROM analytics.decisions_latest FINAL
     """
@@ -0,0 +1,73 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+from src.models.decision import decode_document
+
+logger = logging.getLogger(__name__)
+
+DECODE_WORKERS = int(os.getenv("DECISION_DECODE_WORKERS", str(os.cpu_count() or 1)))
+# Pages smaller than this are decoded in-process; IPC would cost more than it saves
+DECODE_INLINE_BELOW = int(os.getenv("DECISION_DECODE_INLINE_BELOW", "8"))
+
+
+class DecisionDecoder:
+    """Decodes pages of stored decisions on a shared, lazily started process pool."""
+
+    _executor: ProcessPoolExecutor | None = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    # spawn: the API process runs Kafka/flush threads, forking it is unsafe
+                    cls._executor = ProcessPoolExecutor(
+                        max_workers=DECODE_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return cls._executor
+
+    @classmethod
+    def decode(
+        cls, rows: list[dict], pointers: tuple[str, ...] = ()
+    ) -> Iterator[tuple[bytes, str | None]]:
+        """
+        Yield (json_bytes, error) for each row's compressed_data, in row order.
+
+        Results are yielded as soon as the next one in order is ready, so callers
+        can stream them while the rest of the page is still being decoded.
+        """
+        methods = [row["compression_method"] for row in rows]
+        payloads = [row["compressed_data"] for row in rows]
+
+        if len(rows) < DECODE_INLINE_BELOW or DECODE_WORKERS <= 1:
+            yield from map(decode_document, methods, payloads, repeat(pointers))
+            return
+
+        chunksize = max(1, len(rows) // (DECODE_WORKERS * 4))
+        done = 0
+        try:
+            results = cls._get_executor().map(
+                decode_document, methods, payloads, repeat(pointers), chunksize=chunksize
+            )
+            for result in results:
+                yield result
+                done += 1
+        except BrokenProcessPool:
+            logger.warning("Decision decode pool broke, decoding the rest inline")
+            cls.shutdown()
+            yield from map(decode_document, methods[done:], payloads[done:], repeat(pointers))
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
@@ -1,16 +1,179 @@
+import asyncio
+import base64
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
 from influxdb_client.client.influxdb_client import InfluxDBClient
-from influxdb_client.client.write_api import ASYNCHRONOUS
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+from influxdb_client.client.query_api_async import QueryApiAsync
+from influxdb_client.client.write_api import WriteOptions, WriteType
+from influxdb_client.domain.write_precision import WritePrecision
 from src.configs.influx_conf import InfluxConf
-from src.models.raw import Raw, RAW_MEASUREMENT
-from src.services.influx_query import QueryIF
+from src.metrics import Metrics
+from src.models.raw import Raw, RawEncoder, RAW_MEASUREMENT, SHARD_TAG
+from src.services.influx_query import AGGREGATES, QueryIF, field_filter, flux_string
+from src.services.single_flight import SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
 
+# The shard tag only keeps points apart in storage; it is not part of a row
+_RECORD_META = {"result", "table", "_time", "_start", "_stop", "_measurement", SHARD_TAG}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+RAW_PAGE_SIZE = 50
+# How long the raw field list is trusted before being listed again
+FIELDS_TTL = 60.0
+# /raw/aggregate: window sizes such as 30s, 5m, 1h; at most this many windows per series
+EVERY_PATTERN = re.compile(r"^(\d+)(s|m|h|d)$")
+MAX_WINDOWS = 10_000
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_WRITE_MODES = {"batching": WriteType.batching, "synchronous": WriteType.synchronous}
+_WRITE_PRECISIONS = {
+    "s": WritePrecision.S,
+    "ms": WritePrecision.MS,
+    "us": WritePrecision.US,
+    "ns": WritePrecision.NS,
+}
+
+
+def _epoch_ns(ts: datetime) -> int:
+    # Raw points are written from Python datetimes: microsecond precision
+    return (ts - _EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def _tag_filters(tags: dict) -> str:
+    return "".join(f" and r[{flux_string(k)}] == {flux_string(v)}" for k, v in tags.items())
+
+
+def _row_filters(values: dict) -> str:
+    """Flux stage matching pivoted rows, whose columns hold tags and fields alike."""
+    if not values:
+        return ""
+    predicate = " and ".join(f"r[{flux_string(k)}] == {flux_string(v)}" for k, v in values.items())
+    return f"\n  |> filter(fn: (r) => {predicate})"
+
+
+def _row(record) -> dict:
+    """Flat row from a pivoted record: one series at one timestamp, fields as columns."""
+    row = {"timestamp": record.get_time().isoformat()}
+    for k, v in record.values.items():
+        # Fields a series lacks at that timestamp come back as nulls
+        if v is not None and k not in _RECORD_META:
+            row[k] = v
+    return row
+
+
+def _lines(data) -> int:
+    """Points in a line protocol payload handed to a write callback."""
+    return (data.count(b"\n") if isinstance(data, bytes) else data.count("\n")) + 1
+
+
+def encode_cursor(timestamp_ns: int, sent: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp_ns}:{sent}".encode()).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """(timestamp in ns, rows at that timestamp already returned); ValueError if malformed."""
+    try:
+        timestamp_ns, sent = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+        return int(timestamp_ns), int(sent)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _page(rows, times, limit, cursor, after, skip) -> tuple[list[dict], str | None]:
+    """Cut the limit + 1 rows of a page query down to the page and its next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+
+    # Rows of the last timestamp on this page, plus those sent before it if
+    # the whole page shares the cursor's timestamp
+    last = times[limit - 1]
+    sent = sum(1 for t in times[:limit] if t == last)
+    if cursor is not None and last == after:
+        sent += skip
+    return rows[:limit], encode_cursor(last, sent)
+
+
+def _series(records: Iterable, group_by: list[str]) -> list[dict]:
+    """Aggregated records as compact series, one per group_by values, field and function."""
+    series: dict[tuple, dict] = {}
+    for record in records:
+        values = record.values
+        key = (*(values.get(tag) for tag in group_by), values["_field"], values["_agg"])
+        entry = series.get(key)
+        if entry is None:
+            entry = series[key] = {
+                "tags": {tag: values.get(tag) for tag in group_by},
+                "field": values["_field"],
+                "fn": values["_agg"],
+                "times": [],
+                "values": [],
+            }
+        entry["times"].append(record.get_time().isoformat())
+        entry["values"].append(values["_value"])
+    return list(series.values())
+
+
+def _merge_series(parts: list[list[dict]], group_by: list[str]) -> list[dict]:
+    """Join the series of consecutive time slices, in slice order."""
+    if len(parts) == 1:
+        return parts[0]
+    series: dict[tuple, dict] = {}
+    for part in parts:
+        for entry in part:
+            key = (*(entry["tags"].get(tag) for tag in group_by), entry["field"], entry["fn"])
+            merged = series.get(key)
+            if merged is None:
+                series[key] = {**entry, "times": list(entry["times"]), "values": list(entry["values"])}
+            else:
+                merged["times"] += entry["times"]
+                merged["values"] += entry["values"]
+    return list(series.values())
+
+
+def _slices(start_time: int, end_time: int, window_seconds: int, count: int) -> list[tuple[int, int]]:
+    """
+    Split [start_time, end_time) into at most `count` consecutive ranges whose
+    inner bounds are multiples of the window size: aggregateWindow aligns
+    windows to the epoch, so no window straddles two slices.
+    """
+    aligned = start_time - start_time % window_seconds
+    windows = -(-(end_time - aligned) // window_seconds)
+    count = max(1, min(count, windows))
+    step = -(-windows // count) * window_seconds
+    bounds = [start_time, *range(aligned + step, end_time, step), end_time]
+    return list(zip(bounds, bounds[1:]))
+
 
 class InfluxService:
     def __init__(self) -> None:
         self.conf = InfluxConf()
+        # Identical concurrent queries share one call; the rows are shared, read-only
+        self._flight = SingleFlight(name="influx")
+        self._fields: list[str] | None = None
+        self._fields_at = 0.0
+        self._async_client: InfluxDBClientAsync | None = None
+        # Schema-driven point encoding, with the tag cardinality guard
+        self.encoder = RawEncoder.from_conf()
+        Metrics.gauge("raw.tags.overflowing", lambda: len(self.encoder.guard.overflowing))
+        # Points handed to the write API and not yet acknowledged or failed, in
+        # order, as [time handed over, points]; batches are written in order
+        self._unsettled: deque[list] = deque()
+        self._unsettled_lock = threading.Lock()
+        # Their total, kept alongside: the gauge must not iterate the deque
+        self._pending = 0
+        # Queued points reported failed by the callbacks, not yet taken by the sink
+        self._failed_points = 0
+
+        Metrics.gauge("influx.write.pending", lambda: self._pending)
 
     def connect(self):
         self.client = InfluxDBClient(
@@ -18,50 +181,395 @@ class InfluxService:
             token=self.conf.token,
             org=self.conf.org,
         )
-        self.write_api = self.client.write_api(write_options=ASYNCHRONOUS)
+        if self.conf.write_mode not in _WRITE_MODES:
+            raise ValueError(f"Unknown INFLUX_WRITE_MODE: {self.conf.write_mode}")
+        if self.conf.write_precision not in _WRITE_PRECISIONS:
+            raise ValueError(f"Unknown INFLUX_WRITE_PRECISION: {self.conf.write_precision}")
+        self._precision = _WRITE_PRECISIONS[self.conf.write_precision]
+        self.write_api = self.client.write_api(
+            write_options=WriteOptions(
+                write_type=_WRITE_MODES[self.conf.write_mode],
+                batch_size=self.conf.write_batch_size,
+                flush_interval=self.conf.write_flush_interval,
+                jitter_interval=self.conf.write_jitter_interval,
+                retry_interval=self.conf.write_retry_interval,
+                max_retries=self.conf.write_max_retries,
+                max_retry_delay=self.conf.write_max_retry_delay,
+                exponential_base=self.conf.write_exponential_base,
+            ),
+            # Only called in batching mode
+            success_callback=self._on_written,
+            error_callback=self._on_write_error,
+            retry_callback=self._on_write_retry,
+        )
         self.query_api = self.client.query_api()
 
+    def close(self) -> None:
+        """Flush queued points and close the clients."""
+        self.write_api.close()
+        self.client.close()
+
+    def _async_query_api(self) -> QueryApiAsync:
+        # Created on first use: the async client binds to the running event loop
+        if self._async_client is None:
+            self._async_client = InfluxDBClientAsync(
+                url=self.conf.url,
+                token=self.conf.token,
+                org=self.conf.org,
+            )
+        return self._async_client.query_api()
+
+    async def close_async(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
     def write_data(self, data: dict) -> None:
-        raw = Raw(**data)
-        self.write_api.write(bucket=self.conf.bucket, org=self.conf.org, record=raw.to_point())
+        self._write([self.encoder.encode(Raw(**data), self._precision)])
 
     def write_batch(self, data_list: list[dict]) -> None:
-        points = [Raw(**d).to_point() for d in data_list]
-        self.write_api.write(bucket=self.conf.bucket, org=self.conf.org, record=points)
+        self._write([self.encoder.encode(Raw(**d), self._precision) for d in data_list])
 
-    def query_raw_data(self, start_time: int, end_time: int, tags: dict, batch_number: int):
-        _LIMIT = 50
-        offset = (batch_number - 1) * _LIMIT
+    def _write(self, points: list) -> None:
+        """
+        In batching mode, returns once the points are queued: their outcome is
+        reported by the callbacks below. In synchronous mode, returns once
+        InfluxDB has acknowledged them (retrying as configured) or raises.
+        """
+        if not points:
+            return
+        with self._unsettled_lock:
+            self._unsettled.append([time.monotonic(), len(points)])
+            self._pending += len(points)
+        try:
+            self.write_api.write(
+                bucket=self.conf.bucket,
+                org=self.conf.org,
+                record=points,
+            )
+        except Exception:
+            if self.conf.write_mode == "synchronous":
+                self._settle(len(points), written=False)
+            else:
+                # Never queued: drop it from the accounting
+                with self._unsettled_lock:
+                    self._pending -= self._unsettled.pop()[1]
+            raise
+        if self.conf.write_mode == "synchronous":
+            self._settle(len(points), written=True)
 
-        tag_filters = "".join(
-            f' and r["{k}"] == "{v}"' for k, v in tags.items()
-        )
+    def _settle(self, points: int, written: bool) -> None:
+        """
+        Account for the oldest `points` unsettled points; the latency observed is
+        that of the oldest of them, from write_batch() to the outcome.
+        """
+        now = time.monotonic()
+        oldest = None
+        with self._unsettled_lock:
+            remaining = points
+            while remaining and self._unsettled:
+                entry = self._unsettled[0]
+                oldest = entry[0] if oldest is None else oldest
+                taken = min(remaining, entry[1])
+                entry[1] -= taken
+                self._pending -= taken
+                remaining -= taken
+                if not entry[1]:
+                    self._unsettled.popleft()
+        if written:
+            Metrics.inc("influx.write.batches")
+            Metrics.inc("influx.write.points", points)
+        else:
+            Metrics.inc("influx.write.errors")
+            Metrics.inc("influx.write.failed_points", points)
+        if oldest is not None:
+            Metrics.observe("influx.write.latency_seconds", now - oldest)
+
+    def _on_written(self, conf: tuple, data) -> None:
+        self._settle(_lines(data), written=True)
+
+    def _on_write_error(self, conf: tuple, data, exception: Exception) -> None:
+        points = _lines(data)
+        self._settle(points, written=False)
+        with self._unsettled_lock:
+            self._failed_points += points
+        logger.error(f"Failed to write {points} points to InfluxDB: {exception}")
+
+    def take_failed_points(self) -> int:
+        """Queued points that failed to write since the last call (batching mode)."""
+        with self._unsettled_lock:
+            failed, self._failed_points = self._failed_points, 0
+        return failed
+
+    def _on_write_retry(self, conf: tuple, data, exception: Exception) -> None:
+        Metrics.inc("influx.write.retries")
+        logger.warning(f"Retrying write of {_lines(data)} points to InfluxDB: {exception}")
 
+    def query_raw_data(
+        self,
+        start_time: int,
+        end_time: int,
+        tags: dict,
+        cursor: str | None = None,
+        limit: int = RAW_PAGE_SIZE,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """
+        One page of raw rows in (time, series) order, and the cursor of the next
+        page (None on the last one).
+
+        A cursor holds the last timestamp returned and how many rows at that
+        timestamp were already sent; the next page starts its range there, and
+        each series is cut to the rows a page can use before the pivot and sort,
+        so a page costs O(series * page) rather than the rest of the range.
+
+        `fields` restricts the fields read (default: all); unknown names raise
+        ValueError.
+        """
+        if fields:
+            self.validate_fields(fields)
+        query, after, skip = self._raw_page_query(start_time, end_time, tags, cursor, limit, fields)
+        rows, times = self._flight.do(query, lambda: self._run_raw_query(query))
+        return _page(rows, times, limit, cursor, after, skip)
+
+    async def query_raw_data_async(
+        self,
+        start_time: int,
+        end_time: int,
+        tags: dict,
+        cursor: str | None = None,
+        limit: int = RAW_PAGE_SIZE,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """query_raw_data() on the event loop, through the async client."""
+        if fields:
+            await self.validate_fields_async(fields)
+        query, after, skip = self._raw_page_query(start_time, end_time, tags, cursor, limit, fields)
+        rows, times = await self._flight.do_async(query, partial(self._run_raw_query_async, query))
+        return _page(rows, times, limit, cursor, after, skip)
+
+    def _split_filters(self, tags: dict) -> tuple[dict, dict]:
+        """
+        Filters on keys written as tags, matched before the pivot, and on the
+        others (fields per the schema, or tags demoted by the cardinality guard),
+        matched on the pivoted rows, where older points holding them as tags
+        match as well.
+        """
+        series = {k: v for k, v in tags.items() if self.encoder.is_tag(k)}
+        return series, {k: v for k, v in tags.items() if k not in series}
+
+    def _row_queries(self, tags: dict, fields: list[str] | None) -> dict:
+        """Filter stages of the /raw row queries; fields matched after the pivot must be read."""
+        series, rows = self._split_filters(tags)
+        if fields and rows:
+            fields = list(dict.fromkeys([*fields, *rows]))
+        return {
+            "tag_filters": _tag_filters(series),
+            "field_filter": field_filter(fields),
+            "row_filters": _row_filters(rows),
+        }
+
+    def _raw_page_query(self, start_time, end_time, tags, cursor, limit, fields) -> tuple[str, int | None, int]:
+        """Flux query of one page, the cursor's timestamp and how many rows to skip there."""
+        start, after, skip = start_time, None, 0
+        if cursor is not None:
+            after, skip = decode_cursor(cursor)
+            start = f"time(v: {after})"
+
+        filters = self._row_queries(tags, fields)
+        # Rows the page needs at most from any one series
+        cap = f"\n  |> limit(n: {skip + limit + 1})"
+        # Cutting before the pivot could drop the rows a row filter would keep
+        filtered = bool(filters["row_filters"])
         query = QueryIF.query_by_tags.format(
+            bucket=self.conf.bucket,
+            start_time=start,
+            end_time=end_time,
+            measurement=RAW_MEASUREMENT,
+            **filters,
+            series_limit="" if filtered else cap,
+            row_limit=cap if filtered else "",
+            series_columns=", ".join(flux_string(tag) for tag in self.encoder.order_tags),
+            limit=limit + 1,
+            offset=skip,
+        )
+        return query, after, skip
+
+    def _run_raw_query(self, query: str) -> tuple[list[dict], list[int]]:
+        rows = []
+        times = []
+        for record in self.query_api.query_stream(query):
+            rows.append(_row(record))
+            times.append(_epoch_ns(record.get_time()))
+        return rows, times
+
+    async def _run_raw_query_async(self, query: str) -> tuple[list[dict], list[int]]:
+        rows = []
+        times = []
+        async for record in await self._async_query_api().query_stream(query):
+            rows.append(_row(record))
+            times.append(_epoch_ns(record.get_time()))
+        return rows, times
+
+    def stream_raw_data(
+        self,
+        start_time: int,
+        end_time: int,
+        tags: dict,
+        fields: list[str] | None = None,
+    ) -> Iterator[dict]:
+        """
+        Every raw row in the range, one series after the other, each in time
+        order. Records are parsed from the response as it is read and converted
+        one at a time, so memory stays flat however large the range.
+
+        Arguments are validated before returning (ValueError), not on first read.
+        """
+        if fields:
+            self.validate_fields(fields)
+
+        query = QueryIF.stream_by_tags.format(
             bucket=self.conf.bucket,
             start_time=start_time,
             end_time=end_time,
             measurement=RAW_MEASUREMENT,
-            tag_filters=tag_filters,
-            limit=_LIMIT + 1,
-            offset=offset,
+            **self._row_queries(tags, fields),
         )
+        return map(_row, self.query_api.query_stream(query))
+
+    def aggregate_raw_data(
+        self,
+        start_time: int,
+        end_time: int,
+        every: str,
+        functions: list[str],
+        tags: dict,
+        group_by: list[str] | None = None,
+        fields: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        Downsample raw metrics in InfluxDB with aggregateWindow.
+
+        Returns one series per group, field and function:
+        {"tags": {...group_by values}, "field", "fn", "times": [...], "values": [...]}.
+        Raises ValueError for invalid windows, functions, tags or fields.
+        """
+        group_by, _ = self._check_aggregate(start_time, end_time, every, functions, tags, group_by)
+        if fields:
+            self.validate_fields(fields)
+
+        query = self._aggregate_query(start_time, end_time, every, functions, tags, group_by, fields)
+        return self._flight.do(query, lambda: self._run_aggregate(query, group_by))
 
-        result = self.query_api.query(query)
+    async def aggregate_raw_data_async(
+        self,
+        start_time: int,
+        end_time: int,
+        every: str,
+        functions: list[str],
+        tags: dict,
+        group_by: list[str] | None = None,
+        fields: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        aggregate_raw_data() on the event loop. Long ranges are split into up to
+        conf.query_slices time slices of at least conf.query_slice_seconds,
+        queried concurrently and stitched back together; slices meet on window
+        boundaries, so the windows are the same as with one query.
+        """
+        group_by, window_seconds = self._check_aggregate(start_time, end_time, every, functions, tags, group_by)
+        if fields:
+            await self.validate_fields_async(fields)
 
-        rows = {}
-        for table in result:
-            for record in table.records:
-                ts = record.get_time()
-                if ts not in rows:
-                    rows[ts] = {"timestamp": ts.isoformat()}
-                    for k, v in record.values.items():
-                        if not k.startswith("_") and k != "result" and k != "table":
-                            rows[ts][k] = v
-                rows[ts][record.get_field()] = record.get_value()
+        count = min(self.conf.query_slices, (end_time - start_time) // self.conf.query_slice_seconds)
+        slices = _slices(start_time, end_time, window_seconds, count)
+        queries = [
+            self._aggregate_query(start, end, every, functions, tags, group_by, fields)
+            for start, end in slices
+        ]
+        results = await asyncio.gather(*(
+            self._flight.do_async(query, partial(self._run_aggregate_async, query, group_by))
+            for query in queries
+        ))
+        return _merge_series(results, group_by)
 
-        rows = list(rows.values())
-        return rows, len(rows) > _LIMIT
+    def _check_aggregate(self, start_time, end_time, every, functions, tags, group_by) -> tuple[list[str], int]:
+        """
+        Deduplicated group_by tags and the window size in seconds; ValueError if
+        invalid. Aggregates are not pivoted, so tags and group_by must be keys
+        currently written as tags.
+        """
+        if end_time <= start_time:
+            raise ValueError(f"end_time ({end_time}) must be after start_time ({start_time})")
+        match = EVERY_PATTERN.match(every)
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"Invalid window size: {every} (use e.g. 30s, 5m, 1h, 1d)")
+        window_seconds = int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+        if (end_time - start_time) / window_seconds > MAX_WINDOWS:
+            raise ValueError(f"Window {every} yields more than {MAX_WINDOWS} windows for this range")
+        unknown = [fn for fn in functions if fn not in AGGREGATES]
+        if unknown or not functions:
+            raise ValueError(f"Unknown aggregate functions: {unknown}; use {list(AGGREGATES)}")
+        group_by = list(dict.fromkeys(group_by or ()))
+        known = [tag for tag in self.encoder.series_tags if self.encoder.is_tag(tag)]
+        unknown = [tag for tag in group_by if tag not in known]
+        if unknown:
+            raise ValueError(f"Unknown group_by tags: {unknown}; use {known}")
+        _, rows = self._split_filters(tags)
+        if rows:
+            raise ValueError(f"Cannot filter aggregates on {list(rows)}: not written as tags")
+        return group_by, window_seconds
+
+    def _aggregate_query(self, start_time, end_time, every, functions, tags, group_by, fields) -> str:
+        return QueryIF.aggregate.format(
+            bucket=self.conf.bucket,
+            start_time=start_time,
+            end_time=end_time,
+            measurement=RAW_MEASUREMENT,
+            tag_filters=_tag_filters(tags),
+            field_filter=field_filter(fields),
+            group_columns=", ".join(flux_string(c) for c in [*group_by, "_field"]),
+            pipelines=",".join(
+                QueryIF.aggregate_pipeline.format(every=every, fn=fn)
+                for fn in dict.fromkeys(functions)
+            ),
+        )
+
+    def _run_aggregate(self, query: str, group_by: list[str]) -> list[dict]:
+        records = (record for table in self.query_api.query(query) for record in table.records)
+        return _series(records, group_by)
+
+    async def _run_aggregate_async(self, query: str, group_by: list[str]) -> list[dict]:
+        tables = await self._async_query_api().query(query)
+        return _series((record for table in tables for record in table.records), group_by)
+
+    def known_fields(self, refresh: bool = False) -> list[str]:
+        """get_fields(), cached for FIELDS_TTL seconds."""
+        if refresh or self._fields is None or time.monotonic() - self._fields_at > FIELDS_TTL:
+            self._fields = self._flight.do("fields", self.get_fields)
+            self._fields_at = time.monotonic()
+        return self._fields
+
+    async def known_fields_async(self, refresh: bool = False) -> list[str]:
+        if refresh or self._fields is None or time.monotonic() - self._fields_at > FIELDS_TTL:
+            self._fields = await self._flight.do_async("fields", self.get_fields_async)
+            self._fields_at = time.monotonic()
+        return self._fields
+
+    def validate_fields(self, fields: list[str]) -> None:
+        unknown = set(fields).difference(self.known_fields())
+        if unknown:
+            # A field may have appeared since the list was cached
+            unknown = set(fields).difference(self.known_fields(refresh=True))
+        if unknown:
+            raise ValueError(f"Unknown raw fields: {sorted(unknown)}")
+
+    async def validate_fields_async(self, fields: list[str]) -> None:
+        unknown = set(fields).difference(await self.known_fields_async())
+        if unknown:
+            unknown = set(fields).difference(await self.known_fields_async(refresh=True))
+        if unknown:
+            raise ValueError(f"Unknown raw fields: {sorted(unknown)}")
 
     def get_fields(self) -> list[str]:
         query = QueryIF.get_fields.format(
@@ -70,3 +578,11 @@ class InfluxService:
         )
         tables = self.query_api.query(query)
         return [record.get_value() for table in tables for record in table.records if record.get_value()]
+
+    async def get_fields_async(self) -> list[str]:
+        query = QueryIF.get_fields.format(
+            bucket=self.conf.bucket,
+            measurement=RAW_MEASUREMENT,
+        )
+        tables = await self._async_query_api().query(query)
+        return [record.get_value() for table in tables for record in table.records if record.get_value()]
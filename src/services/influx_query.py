@@ -1,11 +1,77 @@
+def flux_string(value) -> str:
+    """Quote a value as a Flux string literal."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("${", "\\${")
+    return f'"{escaped}"'
+
+
+def field_filter(fields) -> str:
+    """
+    Flux stage keeping only `fields` (all fields when empty). Written as an
+    equality chain rather than contains(), which storage cannot push down.
+    """
+    if not fields:
+        return ""
+    predicate = " or ".join(f"r._field == {flux_string(field)}" for field in fields)
+    return f"\n  |> filter(fn: (r) => {predicate})"
+
+
+# Flux aggregates accepted by /raw/aggregate
+AGGREGATES = ("mean", "median", "min", "max", "sum", "count", "first", "last", "stddev", "spread")
+
+
 class QueryIF:
+    # One row per series and timestamp: fields are pivoted into columns and all
+    # series merged into one table before paging, so limit/offset count rows.
+    # Rows sharing a timestamp are ordered by their tags, so a page boundary
+    # inside a timestamp is stable; offset only skips rows of that timestamp.
+    # Filters on keys written as fields (row_filters) apply after the pivot.
+    # Each series/field table is time-ordered, so the first n rows of the page
+    # are among the first n of their series: tables are cut to n before the
+    # pivot (series_limit), or after the row filters when there are some
+    # (row_limit), so a page never pivots or sorts the rest of the range.
     query_by_tags = """
 from(bucket: "{bucket}")
   |> range(start: {start_time}, stop: {end_time})
-  |> filter(fn: (r) => r._measurement == "{measurement}"{tag_filters})
+  |> filter(fn: (r) => r._measurement == "{measurement}"{tag_filters}){field_filter}{series_limit}
+  |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value"){row_filters}{row_limit}
+  |> drop(columns: ["_start", "_stop", "_measurement"])
+  |> group()
+  |> sort(columns: ["_time", {series_columns}])
   |> limit(n: {limit}, offset: {offset})
 """
 
+    # Same rows without the merge and sort, which would make InfluxDB buffer the
+    # whole range before sending anything: series arrive one after the other.
+    stream_by_tags = """
+from(bucket: "{bucket}")
+  |> range(start: {start_time}, stop: {end_time})
+  |> filter(fn: (r) => r._measurement == "{measurement}"{tag_filters}){field_filter}
+  |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value"){row_filters}
+  |> drop(columns: ["_start", "_stop", "_measurement"])
+"""
+
+    # One aggregateWindow pipeline per function over the same filtered stream,
+    # grouped by the requested tags and field; _agg names the function.
+    # Only numeric values are aggregated: raw numbers are written as floats, but
+    # fields written by other clients may hold integers.
+    aggregate = """
+import "types"
+
+data = from(bucket: "{bucket}")
+  |> range(start: {start_time}, stop: {end_time})
+  |> filter(fn: (r) => r._measurement == "{measurement}"{tag_filters}){field_filter}
+  |> filter(fn: (r) => types.isType(v: r._value, type: "float") or types.isType(v: r._value, type: "int") or types.isType(v: r._value, type: "uint"))
+  |> group(columns: [{group_columns}])
+
+union(tables: [{pipelines}])
+  |> keep(columns: ["_time", "_value", "_agg", {group_columns}])
+"""
+
+    aggregate_pipeline = """
+    data
+      |> aggregateWindow(every: {every}, fn: {fn}, createEmpty: false)
+      |> set(key: "_agg", value: "{fn}")"""
+
     get_fields = """
 import "influxdata/influxdb/schema"
 
@@ -0,0 +1,278 @@
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from contextlib import contextmanager
+from typing import Generic, TypeVar
+
+from src.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolTimeout(Exception):
+    """No client became available within the borrow timeout."""
+
+
+class _Waiter:
+    __slots__ = ("event", "client")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.client = None
+
+
+class ClientPool(Generic[T]):
+    """
+    Elastic, thread-safe pool of database clients.
+
+    - Keeps at least `min_size` clients and grows on demand up to `max_size`.
+    - Borrowers wait in FIFO order; a returned client is handed straight to the
+      longest waiter, so a burst cannot starve early callers.
+    - Clients idle for longer than `validate_after` seconds are health-checked
+      before being lent out; failing ones are destroyed and replaced.
+    - Idle clients above `min_size` are closed after `idle_timeout` seconds.
+    - Clients whose use raised an error matching `is_broken` are discarded.
+
+    Wait time, in-use/idle/size and created/destroyed counts are recorded under
+    "<name>.pool.*" in Metrics.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        min_size: int = 1,
+        max_size: int = 8,
+        timeout: float = 10.0,
+        idle_timeout: float = 300.0,
+        validate_after: float = 30.0,
+        health_check: Callable[[T], bool] | None = None,
+        close: Callable[[T], None] | None = None,
+        is_broken: Callable[[Exception], bool] | None = None,
+        name: str = "pool",
+    ) -> None:
+        if max_size < max(min_size, 1):
+            raise ValueError("max_size must be >= min_size and >= 1")
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self._health_check = health_check
+        self._close = close
+        self._is_broken = is_broken or (lambda e: False)
+        self._metric = f"{name}.pool"
+
+        self._lock = threading.Lock()
+        self._idle: deque[tuple[T, float]] = deque()
+        self._waiters: deque[_Waiter] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._reaper: threading.Thread | None = None
+
+        Metrics.gauge(f"{self._metric}.size", lambda: self._size)
+        Metrics.gauge(f"{self._metric}.in_use", lambda: self._in_use)
+        Metrics.gauge(f"{self._metric}.idle", lambda: len(self._idle))
+        Metrics.gauge(f"{self._metric}.waiting", lambda: len(self._waiters))
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def fill(self) -> None:
+        """Create clients up to min_size and start the idle reaper."""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    break
+                self._size += 1
+            try:
+                client = self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append((client, time.monotonic()))
+
+        if self._reaper is None and self.idle_timeout > 0:
+            self._reaper = threading.Thread(target=self._reap_forever, daemon=True, name=f"{self._metric}-reaper")
+            self._reaper.start()
+
+    def close(self) -> None:
+        """Close idle clients; borrowed ones are closed when returned."""
+        with self._lock:
+            self._closed = True
+            idle = [client for client, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for client in idle:
+            self._destroy(client)
+
+    def qsize(self) -> int:
+        """Number of idle clients."""
+        return len(self._idle)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    # -- borrowing ---------------------------------------------------------
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        client = self.acquire(timeout)
+        try:
+            yield client
+        except Exception as e:
+            self.release(client, discard=self._is_broken(e))
+            raise
+        else:
+            self.release(client)
+
+    def acquire(self, timeout: float | None = None) -> T:
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            client, idle_since = self._checkout(deadline)
+            if idle_since is None or self._is_alive(client, idle_since):
+                Metrics.observe(f"{self._metric}.wait_seconds", time.monotonic() - started)
+                return client
+            # Dead client: drop it and try again (a fresh one if the pool is empty)
+            Metrics.inc(f"{self._metric}.health_check_failures")
+            self._discard(client)
+
+    def release(self, client: T, discard: bool = False) -> None:
+        with self._lock:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._hand_off(client)
+                return
+        self._destroy(client)
+        self._replace_for_waiter()
+
+    def _hand_off(self, client: T) -> None:
+        """Give a client to the longest waiter, or park it as idle. Caller holds the lock."""
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.client = client
+            self._in_use += 1
+            waiter.event.set()
+        else:
+            self._idle.append((client, time.monotonic()))
+
+    def _checkout(self, deadline: float) -> tuple[T, float | None]:
+        """Return (client, idle_since); idle_since is None for freshly created clients."""
+        with self._lock:
+            if self._closed:
+                raise PoolTimeout("Pool is closed")
+            if self._idle and not self._waiters:
+                client, idle_since = self._idle.pop()
+                self._in_use += 1
+                return client, idle_since
+            if self._size < self.max_size:
+                self._size += 1
+                self._in_use += 1
+                create = True
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                create = False
+
+        if create:
+            try:
+                return self._create(), None
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._in_use -= 1
+                raise
+
+        waiter.event.wait(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            if waiter.client is None:
+                self._waiters.remove(waiter)
+                Metrics.inc(f"{self._metric}.timeouts")
+                raise PoolTimeout(
+                    f"No client available after waiting; {self._in_use}/{self.max_size} in use"
+                )
+        # Handed over by release(); it was just in use, so no health check needed
+        return waiter.client, None
+
+    def _replace_for_waiter(self) -> None:
+        """After a client was destroyed, create one for the next waiter if there is room."""
+        with self._lock:
+            if not self._waiters or self._size >= self.max_size or self._closed:
+                return
+            self._size += 1
+        try:
+            client = self._create()
+        except Exception as e:
+            logger.warning(f"Failed to create replacement client: {e}")
+            with self._lock:
+                self._size -= 1
+            return
+        with self._lock:
+            self._hand_off(client)
+
+    # -- helpers -----------------------------------------------------------
+
+    def _is_alive(self, client: T, idle_since: float) -> bool:
+        if self._health_check is None or time.monotonic() - idle_since < self.validate_after:
+            return True
+        try:
+            return bool(self._health_check(client))
+        except Exception:
+            return False
+
+    def _discard(self, client: T) -> None:
+        with self._lock:
+            self._in_use -= 1
+            self._size -= 1
+        self._destroy(client)
+
+    def _create(self) -> T:
+        client = self._factory()
+        Metrics.inc(f"{self._metric}.created")
+        return client
+
+    def _destroy(self, client: T) -> None:
+        Metrics.inc(f"{self._metric}.destroyed")
+        if self._close is None:
+            return
+        try:
+            self._close(client)
+        except Exception as e:
+            logger.debug(f"Error closing pooled client: {e}")
+
+    def evict_idle(self) -> int:
+        """Close clients idle for longer than idle_timeout, keeping min_size. Returns the count."""
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            # Oldest returns sit at the left; borrowers take from the right
+            while self._idle and self._size > self.min_size and self._idle[0][1] < cutoff:
+                evicted.append(self._idle.popleft()[0])
+                self._size -= 1
+        for client in evicted:
+            self._destroy(client)
+        return len(evicted)
+
+    def _reap_forever(self) -> None:
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._closed:
+            time.sleep(interval)
+            self.evict_idle()
@@ -0,0 +1,263 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+from src.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Entry:
+    __slots__ = ("value", "size", "table", "start", "end", "expires", "token", "checked")
+
+    def __init__(
+        self, value, size: int, table: str, start: int, end: int, expires: float, token=None, checked: float = 0.0
+    ) -> None:
+        self.value = value
+        self.size = size
+        self.table = table
+        self.start = start
+        self.end = end
+        self.expires = expires
+        # Validator of the rows the value was loaded from, and when it was last confirmed
+        self.token = token
+        self.checked = checked
+
+
+class QueryCache(Generic[T]):
+    """
+    Thread-safe LRU/TTL cache for range query results.
+
+    - Entries are keyed on normalised query parameters and tagged with the table
+      and [start, end] time range (Unix seconds) they cover.
+    - Ranges ending more than `settled_after` seconds ago are complete and get
+      `settled_ttl`; anything more recent gets `recent_ttl`.
+    - Least recently used entries are evicted to stay under `max_bytes`
+      (sizes are estimates supplied by the caller). max_bytes=0 disables caching.
+    - invalidate() drops entries overlapping a range that was just written; for
+      `recent_ttl` afterwards such ranges are only cached with the short TTL,
+      since asynchronous inserts may not be visible yet.
+    - invalidate() only sees this process's writes. Writes by other replicas are
+      caught by revalidation: an entry loaded with a `validate` callable is
+      served for `revalidate_after` seconds, then only while validate() returns
+      what it did when the entry was loaded (0 disables revalidation).
+    - A caller deriving an ETag from a validator passes it as `token`, so the
+      value it gets was loaded against that validator and matches the tag.
+
+    Hits, misses, evictions and invalidations are recorded under "<name>.cache.*"
+    in Metrics.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        settled_after: float,
+        settled_ttl: float,
+        recent_ttl: float,
+        name: str = "query",
+        revalidate_after: float = 0.0,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.settled_after = settled_after
+        self.settled_ttl = settled_ttl
+        self.recent_ttl = recent_ttl
+        self.revalidate_after = revalidate_after
+        self._metric = f"{name}.cache"
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._bytes = 0
+        # (table, start, end, until): ranges written to recently
+        self._dirty: deque[tuple[str, float, float, float]] = deque(maxlen=1024)
+
+        Metrics.gauge(f"{self._metric}.entries", lambda: len(self._entries))
+        Metrics.gauge(f"{self._metric}.bytes", lambda: self._bytes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> T | None:
+        entry = self._entry(key)
+        return None if entry is None else entry.value
+
+    def _entry(self, key: Hashable) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                Metrics.inc(f"{self._metric}.misses")
+                return None
+            self._entries.move_to_end(key)
+        Metrics.inc(f"{self._metric}.hits")
+        return entry
+
+    def put(
+        self,
+        key: Hashable,
+        value: T,
+        size: int,
+        table: str,
+        start: int,
+        end: int,
+        token=None,
+        max_ttl: float | None = None,
+    ) -> None:
+        """Cache `value`; `token` is its validator (see revalidation), `max_ttl` caps its TTL."""
+        if not self.enabled or size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            ttl = self._ttl(table, start, end, now)
+            if max_ttl is not None:
+                ttl = min(ttl, max_ttl)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(value, size, table, start, end, now + ttl, token, now)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                Metrics.inc(f"{self._metric}.evictions")
+
+    def cached(
+        self,
+        key: Hashable,
+        table: str,
+        start: int,
+        end: int,
+        load: Callable[[], T],
+        size: Callable[[T], int],
+        validate: Callable[[], Hashable] | None = None,
+        max_ttl: float | None = None,
+        token: Hashable | None = None,
+    ) -> T:
+        """
+        Return the cached value for `key`, or call `load` and cache its result.
+        With `validate`, entries outliving revalidate_after are checked against it.
+        With `token`, a validator the caller already holds (e.g. for its ETag), an
+        entry is only served if it was loaded against that same token.
+        """
+        if not self.enabled:
+            return load()
+        entry = self._entry(key)
+        if entry is not None:
+            if token is not None:
+                if self._confirm(key, entry, token):
+                    return entry.value
+            elif not self._must_revalidate(entry, validate):
+                return entry.value
+            elif self._confirm(key, entry, validate()):
+                return entry.value
+        if token is None and self._needs_token(table, start, end, validate):
+            token = validate()
+        value = load()
+        self.put(key, value, size(value), table, start, end, token, max_ttl)
+        return value
+
+    async def cached_async(
+        self,
+        key: Hashable,
+        table: str,
+        start: int,
+        end: int,
+        load: Callable[[], Awaitable[T]],
+        size: Callable[[T], int],
+        validate: Callable[[], Awaitable[Hashable]] | None = None,
+        max_ttl: float | None = None,
+        token: Hashable | None = None,
+    ) -> T:
+        """cached() for an async `load` and `validate`."""
+        if not self.enabled:
+            return await load()
+        entry = self._entry(key)
+        if entry is not None:
+            if token is not None:
+                if self._confirm(key, entry, token):
+                    return entry.value
+            elif not self._must_revalidate(entry, validate):
+                return entry.value
+            elif self._confirm(key, entry, await validate()):
+                return entry.value
+        if token is None and self._needs_token(table, start, end, validate):
+            token = await validate()
+        value = await load()
+        self.put(key, value, size(value), table, start, end, token, max_ttl)
+        return value
+
+    def _needs_token(self, table: str, start: int, end: int, validate) -> bool:
+        # Taken before loading: a write in between makes the next check reload,
+        # never confirms a stale value. Entries expiring sooner are never checked.
+        if validate is None or not self.revalidate_after:
+            return False
+        with self._lock:
+            return self._ttl(table, start, end, time.monotonic()) > self.revalidate_after
+
+    def _must_revalidate(self, entry: _Entry, validate) -> bool:
+        return (
+            validate is not None
+            and entry.token is not None
+            and time.monotonic() - entry.checked >= self.revalidate_after
+        )
+
+    def _confirm(self, key: Hashable, entry: _Entry, token) -> bool:
+        """Whether the rows behind `entry` are unchanged; drops it otherwise."""
+        if token == entry.token:
+            entry.checked = time.monotonic()
+            return True
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._drop(key)
+        Metrics.inc(f"{self._metric}.revalidations")
+        logger.debug(f"Cached {entry.table} range [{entry.start}, {entry.end}] changed; reloading")
+        return False
+
+    def invalidate(self, table: str, start: float | None = None, end: float | None = None) -> int:
+        """
+        Drop cached results of `table` overlapping [start, end] (all of them when
+        no range is given). Called by the sinks after writing, so late windows
+        are not hidden behind a long-lived entry.
+        """
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        with self._lock:
+            self._dirty.append((table, start, end, time.monotonic() + self.recent_ttl))
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.table == table and entry.start <= end and entry.end >= start
+            ]
+            for key in stale:
+                self._drop(key)
+        if stale:
+            Metrics.inc(f"{self._metric}.invalidations", len(stale))
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _ttl(self, table: str, start: int, end: int, now: float) -> float:
+        if end > time.time() - self.settled_after:
+            return self.recent_ttl
+        for dirty_table, dirty_start, dirty_end, until in self._dirty:
+            if until > now and dirty_table == table and dirty_start <= end and dirty_end >= start:
+                return self.recent_ttl
+        return self.settled_ttl
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
@@ -0,0 +1,126 @@
+import asyncio
+import inspect
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from typing import TypeVar
+
+import anyio.to_thread
+
+from src.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for it and receive the same result, or the same
+    exception. Sync callers (threadpool handlers) and async callers share one
+    registry, so a sync and an async request for the same key also coalesce.
+    Async waiters never block a thread. Once every caller of an async call has
+    been cancelled, the call itself is cancelled too.
+
+    The shared result is handed to every caller: treat it as read-only.
+    Leaders and coalesced callers are counted under "<name>.singleflight.*" in
+    Metrics.
+    """
+
+    def __init__(self, name: str = "query") -> None:
+        self._metric = f"{name}.singleflight"
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        # Callers still waiting on each call, and the task running each async call
+        self._waiting: dict[Future, int] = {}
+        self._leaders: dict[Future, asyncio.Task] = {}
+
+        Metrics.gauge(f"{self._metric}.in_flight", lambda: len(self._calls))
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._waiting[future] += 1
+                Metrics.inc(f"{self._metric}.coalesced")
+                return future, False
+            future = self._calls[key] = Future()
+            self._waiting[future] = 1
+        Metrics.inc(f"{self._metric}.leaders")
+        return future, True
+
+    def _leave(self, key: Hashable, future: Future) -> None:
+        """A waiter was cancelled; cancel the call when nobody is left waiting for it."""
+        with self._lock:
+            if future not in self._waiting:
+                return  # already finished
+            self._waiting[future] -= 1
+            if self._waiting[future]:
+                return
+            if self._calls.get(key) is future:
+                self._calls.pop(key)
+            task = self._leaders.get(future)
+        if task is not None:
+            Metrics.inc(f"{self._metric}.abandoned")
+            task.cancel()
+
+    def _finish(self, key: Hashable, future: Future, result=None, error: BaseException | None = None) -> None:
+        # Unregister first: callers arriving from now on start a fresh call
+        with self._lock:
+            if self._calls.get(key) is future:
+                self._calls.pop(key)
+            self._waiting.pop(future, None)
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run `fn`, or wait for the identical call already in flight."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], T] | Callable[[], Awaitable[T]]) -> T:
+        """
+        Async variant of do(). `fn` may be a coroutine function or a blocking
+        callable, which then runs on a worker thread. The call runs detached from
+        the leader's task, so a cancelled request does not fail the others; it is
+        cancelled only when all its callers are.
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = self._leaders[future] = asyncio.ensure_future(self._lead(key, future, fn))
+            task.add_done_callback(lambda _: self._leaders.pop(future, None))
+        try:
+            # shield: cancelling one waiter must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            self._leave(key, future)
+            raise
+
+    async def _lead(self, key: Hashable, future: Future, fn) -> None:
+        try:
+            if inspect.iscoroutinefunction(fn):
+                result = await fn()
+            else:
+                result = await anyio.to_thread.run_sync(fn)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        self._finish(key, future, result)
@@ -1,15 +1,15 @@
-import base64
-import gzip
 import json
 import logging
 import os
 import threading
 import time
-from datetime import datetime, timezone
 from typing import Optional
 
 from utils.kmw import PyKafBridge
 
+from src.cardinality import CardinalityTracker
+from src.configs.decision_conf import DecisionConf
+from src.models.decision import Decision
 from src.sinks.clickhouse_sink import ClickHouseSink
 from src.sinks.influx_sink import InfluxSink
 
@@ -19,6 +19,14 @@ logger = logging.getLogger(__name__)
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))
 BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", "1.0"))
 
+# Distinct tag values per topic, estimated over sliding windows (see src/cardinality.py)
+CARDINALITY_ENABLED = os.getenv("CARDINALITY_ENABLED", "true").lower() == "true"
+CARDINALITY_PRECISION = int(os.getenv("CARDINALITY_PRECISION", "10"))
+CARDINALITY_BUCKET_SECONDS = int(os.getenv("CARDINALITY_BUCKET_SECONDS", "600"))
+CARDINALITY_BUCKETS = int(os.getenv("CARDINALITY_BUCKETS", "144"))
+CARDINALITY_WINDOWS = tuple(int(w) for w in os.getenv("CARDINALITY_WINDOWS", "600,3600,86400").split(","))
+CARDINALITY_MAX_SKETCHES = int(os.getenv("CARDINALITY_MAX_SKETCHES", "64"))
+
 
 class KafkaSinkManager:
     def __init__(self, kafka_host: str, kafka_port: str, policy_client=None):
@@ -29,11 +37,25 @@ class KafkaSinkManager:
         self.influx_sink = InfluxSink(logger)
         self.clickhouse_sink = ClickHouseSink(logger)
 
+        self.cardinality: Optional[CardinalityTracker] = None
+        if CARDINALITY_ENABLED:
+            self.cardinality = CardinalityTracker(
+                precision=CARDINALITY_PRECISION,
+                bucket_seconds=CARDINALITY_BUCKET_SECONDS,
+                buckets=CARDINALITY_BUCKETS,
+                windows=CARDINALITY_WINDOWS,
+                max_sketches=CARDINALITY_MAX_SKETCHES,
+            )
+
         self.bridge: Optional[PyKafBridge] = None
         self._running = False
 
         self._influx_buffer: list[dict] = []
+        # Records InfluxDB rejected after they were queued (batching writes)
+        self.influx_failed = 0
         self._ch_buffer: list[dict] = []
+        # Decoded decisions, inserted in batches like processed windows
+        self._decision_buffer: list[dict] = []
         self._buffer_lock = threading.Lock()
         self._last_flush = time.monotonic()
 
@@ -57,6 +79,12 @@ class KafkaSinkManager:
             else:
                 logger.error(f"Failed to flush {len(batch)} records to InfluxDB")
 
+        # Batching writes report their outcome later, through the write callbacks
+        failed = self.influx_sink.take_failed()
+        if failed:
+            self.influx_failed += failed
+            logger.error(f"InfluxDB rejected {failed} records of earlier flushes")
+
     def _flush_ch(self):
         with self._buffer_lock:
             batch = self._ch_buffer
@@ -69,19 +97,37 @@ class KafkaSinkManager:
             else:
                 logger.error(f"Failed to flush {len(batch)} records to ClickHouse")
 
+    def _flush_decisions(self):
+        with self._buffer_lock:
+            batch = self._decision_buffer
+            self._decision_buffer = []
+
+        if batch:
+            success = self.clickhouse_sink.write_decisions(batch)
+            if success:
+                logger.info(f"Flushed {len(batch)} decisions to ClickHouse")
+            else:
+                logger.error(f"Failed to flush {len(batch)} decisions to ClickHouse")
+
     def _flush_all(self):
         self._flush_influx()
         self._flush_ch()
+        self._flush_decisions()
         self._last_flush = time.monotonic()
 
     def _maybe_flush(self):
         if (
             len(self._influx_buffer) >= BATCH_SIZE
             or len(self._ch_buffer) >= BATCH_SIZE
+            or len(self._decision_buffer) >= BATCH_SIZE
             or (time.monotonic() - self._last_flush) >= BATCH_TIMEOUT
         ):
             self._flush_all()
 
+    def _observe(self, topic: str, tags: dict) -> None:
+        if self.cardinality is not None:
+            self.cardinality.observe(topic, tags)
+
     def route_message(self, data: dict) -> dict:
         topic: str = data["topic"]
         message_str: str = data["content"]
@@ -98,6 +144,8 @@ class KafkaSinkManager:
             # Raw data -> InfluxDB
             records = message if isinstance(message, list) else [message]
             for record in records:
+                if isinstance(record, dict):
+                    self._observe(topic, {"event": record.get("event"), **(record.get("tags") or {})})
                 with self._buffer_lock:
                     self._influx_buffer.append(record)
             self._maybe_flush()
@@ -105,50 +153,38 @@ class KafkaSinkManager:
             # Buffer + batch-insert. ClickHouse hates 1-row inserts (one part per
             # insert -> merge storm). Batching keeps part count + CPU sane.
             records = message if isinstance(message, list) else [message]
+            for record in records:
+                if isinstance(record, dict):
+                    self._observe(topic, record.get("tags") or {})
             with self._buffer_lock:
                 self._ch_buffer.extend(records)
             self._maybe_flush()
         elif topic == "network.decisions":
             try:
                 # Message format: {"compression": "gzip", "data": "base64..."}
-                compression_method = message.get("compression")
-                compressed_data = message.get("data")
-
-                if not compression_method or not compressed_data:
-                    logger.error(f"Invalid decision message format: {message.keys()}")
-                    return data
-
-                # Decompress to extract cell_id and timestamp
-                decoded = base64.b64decode(compressed_data)
-                if compression_method == "gzip":
-                    decompressed = gzip.decompress(decoded).decode("utf-8")
-                else:
-                    logger.error(f"Unsupported compression method: {compression_method}")
-                    return data
-
-                decision_data = json.loads(decompressed)
-                cell_id = decision_data.get("cell_id")
-                timestamp_str = decision_data.get("timestamp")
-
-                if not cell_id or not timestamp_str:
-                    logger.error(f"Missing cell_id or timestamp in decision: {decision_data.keys()}")
-                    return data
-
-                # Parse ISO timestamp to datetime
-                timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
+                decision = Decision.from_message(
+                    message, DecisionConf.get_fields().values()
+                )
+                self._observe(topic, {"cell_id": decision.cell_id})
 
-                # Write to ClickHouse (stores compressed data)
+                # Store the decoded bytes (optionally re-encoded), never the base64 text
                 from src.services.databases import ClickHouse
-                ClickHouse.get_service().write_decision(
-                    cell_id=cell_id,
-                    timestamp=timestamp,
-                    compression_method=compression_method,
-                    compressed_data=compressed_data,
+                service = ClickHouse.get_service()
+                compression_method, payload = decision.encoded(
+                    service.conf.decision_codec, service.conf.decision_zstd_level
                 )
-                logger.info(f"Stored decision for cell {cell_id} at {timestamp}")
-
+                with self._buffer_lock:
+                    self._decision_buffer.append({
+                        **decision.fields,
+                        "cell_id": decision.cell_id,
+                        "timestamp": decision.timestamp,
+                        "compression_method": compression_method,
+                        "compressed_data": payload,
+                    })
             except Exception as e:
                 logger.error(f"Failed to process decision message: {e}")
+                return data
+            self._maybe_flush()
         else:
             logger.warning(f"Unknown topic: {topic}")
 
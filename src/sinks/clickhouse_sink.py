@@ -1,3 +1,5 @@
+from datetime import timezone
+
 from src.sinks.sinkI import Sink
 from src.services.databases import ClickHouse
 
@@ -18,6 +20,7 @@ class ClickHouseSink(Sink):
                 return True
 
             self.service.write_data(data)
+            self._invalidate([data])
             return True
         except Exception as e:
             self.logger.error(f"Failed to write to ClickHouse: {e}")
@@ -29,7 +32,29 @@ class ClickHouseSink(Sink):
             if not filtered:
                 return True
             self.service.write_batch(filtered)
+            self._invalidate(filtered)
             return True
         except Exception as e:
             self.logger.error(f"Failed to batch write to ClickHouse: {e}")
             return False
+
+    def write_decisions(self, decisions: list[dict]) -> bool:
+        """Batch insert decoded decisions (see ClickHouseService.write_decisions)."""
+        try:
+            self.service.write_decisions(decisions)
+        except Exception as e:
+            self.logger.error(f"Failed to batch write decisions to ClickHouse: {e}")
+            return False
+        # Naive timestamps are stored as UTC
+        timestamps = [
+            d["timestamp"].replace(tzinfo=d["timestamp"].tzinfo or timezone.utc).timestamp()
+            for d in decisions
+        ]
+        self.service.cache.invalidate("decisions", min(timestamps), max(timestamps))
+        return True
+
+    def _invalidate(self, data_list: list[dict]) -> None:
+        """Drop cached /processed results covering the windows just written (late ones included)."""
+        start = min(d["window_start"] for d in data_list)
+        end = max(d["window_end"] for d in data_list)
+        self.service.cache.invalidate("processed", start, end)
@@ -20,9 +20,15 @@ class InfluxSink(Sink):
             return False
 
     def write_batch(self, data_list: list[dict]) -> bool:
+        # True once queued (INFLUX_WRITE_MODE=batching, see take_failed) or
+        # acknowledged by InfluxDB (synchronous)
         try:
             self.service.write_batch(data_list)
             return True
         except Exception as e:
             self.logger.error(f"Failed to batch write to InfluxDB: {e}")
             return False
+
+    def take_failed(self) -> int:
+        """Records queued by earlier write_batch calls that InfluxDB has since rejected."""
+        return self.service.take_failed_points()
@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime, timezone
+
+from src.configs.decision_conf import DecisionField
+from src.models import arrow
+from src.services.clickhouse import transform_processor_output
+
+pa = pytest.importorskip("pyarrow")
+
+WINDOW = {
+    "tags": {"snssai_sst": "1", "dnn": "internet", "event": "PERF_DATA", "supi": "imsi-001"},
+    "window_start": 1733684400,
+    "window_end": 1733684460,
+    "sample_count": 10,
+    "metrics": {"thrputUl_mbps": {"mean": 11.5, "max": 20.0}},
+}
+
+
+class TestProcessedTable:
+    def test_columns_match_clickhouse_schema(self):
+        table = arrow.processed_table([transform_processor_output(WINDOW)])
+
+        assert table.schema.names == [
+            "window_start", "window_end", "window_duration_seconds", "sample_count",
+            "snssai_sst", "snssai_sd", "dnn", "event", "ue_tags", "metrics",
+        ]
+        assert table.schema.field("metrics").type == pa.map_(pa.string(), pa.float64())
+        assert table.schema.field("window_start").type == pa.timestamp("ms", tz="UTC")
+
+    def test_maps_keep_per_row_entries(self):
+        empty = {**WINDOW, "metrics": {}, "tags": {**WINDOW["tags"], "supi": "imsi-002"}}
+        rows = [transform_processor_output(w) for w in (WINDOW, empty, WINDOW)]
+        table = arrow.processed_table(rows)
+
+        metrics = table.column("metrics").to_pylist()
+        assert metrics[0] == [("thrputUl_mbps_mean", 11.5), ("thrputUl_mbps_max", 20.0)]
+        assert metrics[1] == []
+        assert metrics[2] == metrics[0]
+        assert table.column("ue_tags").to_pylist()[1] == [("supi", "imsi-002")]
+
+    def test_timestamps(self):
+        table = arrow.processed_table([transform_processor_output(WINDOW)])
+        assert table.column("window_start")[0].as_py() == datetime.fromtimestamp(1733684400, tz=timezone.utc)
+
+
+class TestDecisionsTable:
+    def test_extracted_fields_are_typed_and_nullable(self):
+        fields = {
+            "action_type": DecisionField("action_type", "action.type", str),
+            "score": DecisionField("score", "score", float),
+        }
+        ts = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rows = [
+            {"cell_id": 1, "id": 1, "timestamp": ts, "compression_method": "gzip",
+             "compressed_data": b"\x1f\x8b", "action_type": "handover", "score": 0.5},
+            {"cell_id": 1, "id": 2, "timestamp": ts, "compression_method": "gzip",
+             "compressed_data": b"\x1f\x8b"},
+        ]
+
+        table = arrow.decisions_table(rows, fields)
+
+        assert table.schema.field("compressed_data").type == pa.binary()
+        assert table.schema.field("score").type == pa.float64()
+        assert table.column("action_type").to_pylist() == ["handover", None]
@@ -0,0 +1,109 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from src.cardinality import SERIES_KEY, CardinalityTracker, WindowedSketch
+from src.metrics import Metrics
+
+NOW = 1_700_000_000
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    Metrics.reset()
+    yield
+    Metrics.reset()
+
+
+class TestWindowedSketch:
+    def test_estimate_is_within_error_bounds(self):
+        sketch = WindowedSketch(precision=10, bucket_seconds=60, buckets=10)
+        sketch.add([f"imsi-{i}" for i in range(20000)], NOW)
+
+        # 1.04 / sqrt(1024) ~ 3.25%; allow three standard errors
+        assert abs(sketch.estimate(60, NOW) - 20000) < 20000 * 0.1
+
+    def test_small_counts_and_duplicates(self):
+        sketch = WindowedSketch(precision=10, bucket_seconds=60, buckets=10)
+        for _ in range(5):
+            sketch.add(["a", "b", "c"], NOW)
+
+        assert sketch.estimate(60, NOW) == 3
+
+    def test_old_buckets_leave_the_window(self):
+        sketch = WindowedSketch(precision=10, bucket_seconds=60, buckets=10)
+        sketch.add(["old"], NOW - 300)
+        sketch.add(["new"], NOW)
+
+        assert sketch.estimate(60, NOW) == 1
+        assert sketch.estimate(600, NOW) == 2
+        # The ring wrapped around: the old bucket was reused
+        sketch.add(["later"], NOW - 300 + 600)
+        assert sketch.estimate(600, NOW + 300) == 2
+
+
+class TestCardinalityTracker:
+    def test_tag_keys_and_series_per_topic(self):
+        tracker = CardinalityTracker(bucket_seconds=60, buckets=60, windows=(60, 3600))
+        for i in range(10):
+            tracker.observe("raw", {"event": "PERF_DATA", "supi": f"imsi-{i}", "dnn": None}, NOW)
+        tracker.observe("processed", {"dnn": "internet"}, NOW)
+
+        assert tracker.estimates(NOW) == {
+            "processed": {SERIES_KEY: {"1m": 1, "1h": 1}, "dnn": {"1m": 1, "1h": 1}},
+            "raw": {
+                SERIES_KEY: {"1m": 10, "1h": 10},
+                "event": {"1m": 1, "1h": 1},
+                "supi": {"1m": 10, "1h": 10},
+            },
+        }
+
+    def test_sketch_count_is_bounded(self):
+        tracker = CardinalityTracker(max_sketches=2)
+        tracker.observe("raw", {"a": 1, "b": 2, "c": 3}, NOW)
+
+        assert sum(len(keys) for keys in tracker.estimates(NOW).values()) == 2
+        assert Metrics.counter("cardinality.keys.dropped") == 2
+
+    def test_windows_longer_than_the_ring_are_dropped(self):
+        tracker = CardinalityTracker(bucket_seconds=60, buckets=10, windows=(60, 3600))
+
+        assert tracker.windows == (60,)
+
+    def test_estimates_are_gauges(self):
+        tracker = CardinalityTracker(windows=(600, 3600))
+        tracker.observe("network.data.ingested", {"supi": "imsi-1"})
+
+        gauges = Metrics.snapshot()["gauges"]
+        assert gauges["cardinality.network.data.ingested.supi.10m"] == 1
+        assert gauges["cardinality.network.data.ingested.supi.1h"] == 1
+
+
+@pytest.fixture(scope="module")
+def app():
+    from src.routers.v1.cardinality import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1/cardinality")
+    return app
+
+
+class TestCardinalityEndpoint:
+    def test_returns_estimates(self, app):
+        tracker = CardinalityTracker(windows=(600,))
+        tracker.observe("network.decisions", {"cell_id": 1})
+        app.state.cardinality = tracker
+
+        response = TestClient(app).get("/api/v1/cardinality")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["precision"] == 10
+        assert body["topics"] == {"network.decisions": {SERIES_KEY: {"10m": 1}, "cell_id": {"10m": 1}}}
+
+    def test_disabled(self, app):
+        app.state.cardinality = None
+
+        response = TestClient(app).get("/api/v1/cardinality")
+
+        assert response.status_code == 503
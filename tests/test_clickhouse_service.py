@@ -128,6 +128,14 @@ class TestClickHouseService:
         service.connect()
         assert service._pool.qsize() == 2
 
+    def test_connect_rejects_unknown_decision_codec(self, mock_clickhouse_client, monkeypatch):
+        service = ClickHouseService(pool_size=1)
+        monkeypatch.setattr(service.conf, "decision_codec", "lzma")
+
+        with pytest.raises(ValueError, match="CLICKHOUSE_DECISION_CODEC"):
+            service.connect()
+        assert service._pool.qsize() == 0
+
     def test_get_metric_keys(self, clickhouse_service, mock_clickhouse_client):
         mock_result = MagicMock()
         mock_result.result_rows = [("thrputUl_mbps_mean",), ("pdb_ms_mean",)]
@@ -157,12 +165,64 @@ class TestClickHouseService:
         assert call_args[1]["settings"]["async_insert"] == 1
 
     def test_write_batch(self, clickhouse_service, mock_clickhouse_client):
+        pytest.importorskip("pyarrow")
         data = [VALID_INPUT, VALID_INPUT]
         clickhouse_service.write_batch(data)
 
+        mock_clickhouse_client.insert.assert_not_called()
+        table_name, table = mock_clickhouse_client.insert_arrow.call_args[0]
+        assert table_name == "analytics.processed"
+        assert table.num_rows == 2
+        assert mock_clickhouse_client.insert_arrow.call_args[1]["settings"]["async_insert"] == 1
+
+    def test_write_batch_rows_format(self, clickhouse_service, mock_clickhouse_client):
+        with patch.object(clickhouse_service.conf, "insert_format", "rows"):
+            clickhouse_service.write_batch([VALID_INPUT, VALID_INPUT])
+
         mock_clickhouse_client.insert.assert_called_once()
         assert len(mock_clickhouse_client.insert.call_args[0][1]) == 2
 
+    def test_write_batch_native_uses_rows(self, clickhouse_service, mock_clickhouse_client):
+        with patch.object(clickhouse_service.conf, "transport", "native"):
+            clickhouse_service.write_batch([VALID_INPUT])
+
+        mock_clickhouse_client.insert_arrow.assert_not_called()
+        mock_clickhouse_client.insert.assert_called_once()
+
+    def test_write_decisions_continues_ids_per_cell(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.result_rows = [(7, 3)]
+        mock_clickhouse_client.query.return_value = mock_result
+        ts = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        decision = {"timestamp": ts, "compression_method": "gzip", "compressed_data": b"\x1f\x8b"}
+
+        with patch.object(clickhouse_service.conf, "insert_format", "rows"):
+            clickhouse_service.write_decisions([
+                {"cell_id": 7, **decision}, {"cell_id": 8, **decision}, {"cell_id": 7, **decision},
+            ])
+
+        assert mock_clickhouse_client.query.call_args[1]["parameters"] == {"cells": [7, 8]}
+        rows = mock_clickhouse_client.insert.call_args[0][1]
+        assert [(row[0], row[1]) for row in rows] == [(7, 4), (8, 1), (7, 5)]
+        assert rows[0][4] == b"\x1f\x8b"
+
+    def test_write_decisions_arrow(self, clickhouse_service, mock_clickhouse_client):
+        pytest.importorskip("pyarrow")
+        mock_result = MagicMock()
+        mock_result.result_rows = []
+        mock_clickhouse_client.query.return_value = mock_result
+
+        clickhouse_service.write_decisions([{
+            "cell_id": 1,
+            "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            "compression_method": "zstd",
+            "compressed_data": b"\x28\xb5\x2f\xfd",
+        }])
+
+        table = mock_clickhouse_client.insert_arrow.call_args[0][1]
+        assert table.column("id").to_pylist() == [1]
+        assert table.column("compressed_data").to_pylist() == [b"\x28\xb5\x2f\xfd"]
+
     def test_write_batch_empty(self, clickhouse_service, mock_clickhouse_client):
         clickhouse_service.write_batch([])
         mock_clickhouse_client.insert.assert_not_called()
@@ -179,6 +239,7 @@ class TestClickHouseService:
             60, 10, "1", "000001", "internet", "PERF_DATA", {},
             {"thrputUl_mbps_mean": 11.5, "pdb_ms_mean": 25.0},
         )]
+        mock_result.result_columns = [list(c) for c in zip(*mock_result.result_rows)]
         mock_clickhouse_client.query.return_value = mock_result
 
         results = clickhouse_service.query_processed(
@@ -219,3 +280,306 @@ class TestClickHouseService:
         params = mock_clickhouse_client.query.call_args[1]["parameters"]
         assert params["offset"] == 50
         assert params["limit"] == 25
+
+    def test_write_decision_stores_bytes(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.result_rows = [(0,)]
+        mock_clickhouse_client.query.return_value = mock_result
+
+        payload = b"\x1f\x8b\x08\x00binary"
+        clickhouse_service.write_decision(
+            cell_id=7,
+            timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            compression_method="gzip",
+            compressed_data=payload,
+        )
+
+        row = mock_clickhouse_client.insert.call_args[0][1][0]
+        assert row[-1] == payload
+
+    def test_query_decisions_reads_payload_as_bytes(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.column_names = ["cell_id", "compressed_data"]
+        mock_result.result_rows = [(7, b"\x00\x01")]
+        mock_result.result_columns = [list(c) for c in zip(*mock_result.result_rows)]
+        mock_clickhouse_client.query.return_value = mock_result
+
+        rows = clickhouse_service.query_decisions(start_time=0, end_time=9999999999)
+
+        assert rows == [{"cell_id": 7, "compressed_data": b"\x00\x01"}]
+        column_formats = mock_clickhouse_client.query.call_args[1]["column_formats"]
+        assert column_formats["compressed_data"] == "bytes"
+
+
+    def test_processed_validator_shares_the_query_filters(self, clickhouse_service, mock_clickhouse_client):
+        last = datetime(2024, 1, 1, 12, 1, tzinfo=timezone.utc)
+        mock_result = MagicMock()
+        mock_result.column_names = ["rows", "last"]
+        mock_result.result_columns = [[42], [last]]
+        mock_clickhouse_client.query.return_value = mock_result
+
+        validator = clickhouse_service.processed_validator(start_time=0, end_time=60, event="PERF_DATA")
+
+        assert validator == (42, last)
+        query = mock_clickhouse_client.query.call_args[0][0]
+        assert query.startswith("SELECT count() AS rows, max(window_end) AS last FROM analytics.processed WHERE")
+        assert "event = {event:String}" in query
+        assert "LIMIT" not in query
+
+    def test_decisions_validator_covers_replaced_rows(self, clickhouse_service, mock_clickhouse_client):
+        # A re-sent decision replaces its row: count and max(timestamp) would not move
+        mock_result = MagicMock()
+        mock_result.column_names = ["rows", "last", "digest"]
+        mock_result.result_columns = [[1], [None], [123]]
+        mock_clickhouse_client.query.return_value = mock_result
+
+        assert clickhouse_service.decisions_validator(start_time=0, end_time=60, cell_id=7) == (1, None, 123)
+        query = mock_clickhouse_client.query.call_args[0][0]
+        assert "sum(cityHash64(id)) AS digest FROM analytics.decisions WHERE" in query
+        # Payloads are never read to validate a page
+        assert "compressed_data" not in query
+        assert "cell_id = {cell_id:Int32}" in query
+
+
+class TestExtractedDecisionColumns:
+    @pytest.fixture(autouse=True)
+    def extracted_fields(self):
+        from src.configs.decision_conf import DecisionConf, DecisionField
+
+        fields = {
+            "action_type": DecisionField("action_type", "action.type", str),
+            "target_cell": DecisionField("target_cell", "action.target", int),
+        }
+        with patch.object(DecisionConf, "fields", fields), patch.object(DecisionConf, "_loaded", True):
+            yield fields
+
+    def test_connect_adds_columns(self, mock_clickhouse_client):
+        ClickHouseService(pool_size=1).connect()
+
+        commands = [c[0][0] for c in mock_clickhouse_client.command.call_args_list]
+        assert any("ADD COLUMN IF NOT EXISTS action_type Nullable(String)" in c for c in commands)
+        assert any("ADD COLUMN IF NOT EXISTS target_cell Nullable(Int64)" in c for c in commands)
+
+    def test_write_decision_includes_extracted_values(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.result_rows = [(0,)]
+        mock_clickhouse_client.query.return_value = mock_result
+
+        clickhouse_service.write_decision(
+            cell_id=1,
+            timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            compression_method="gzip",
+            compressed_data=b"",
+            fields={"action_type": "handover", "target_cell": 9},
+        )
+
+        call = mock_clickhouse_client.insert.call_args
+        assert call[1]["column_names"][-2:] == ["action_type", "target_cell"]
+        assert call[0][1][0][-2:] == ["handover", 9]
+
+    def test_query_decisions_filter_and_projection(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.column_names = []
+        mock_result.result_rows = []
+        mock_clickhouse_client.query.return_value = mock_result
+
+        clickhouse_service.query_decisions(
+            start_time=0,
+            end_time=10,
+            filters={"target_cell": 9},
+            columns=["action_type"],
+            include_payload=False,
+        )
+
+        query = mock_clickhouse_client.query.call_args[0][0]
+        params = mock_clickhouse_client.query.call_args[1]["parameters"]
+        assert "compressed_data" not in query
+        assert "action_type" in query
+        assert "target_cell = {f_target_cell:Int64}" in query
+        assert params["f_target_cell"] == 9
+
+    def test_query_decisions_unknown_column_raises(self, clickhouse_service):
+        with pytest.raises(ValueError, match="nope"):
+            clickhouse_service.query_decisions(start_time=0, end_time=10, filters={"nope": 1})
+
+
+class TestLatestQueries:
+    def test_latest_processed_uses_final_and_filters(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.column_names = ["window_start", "window_end", "snssai_sst", "metrics"]
+        mock_result.result_rows = [(
+            datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc),
+            datetime(2024, 1, 1, 12, 1, tzinfo=timezone.utc),
+            "1",
+            {"pdb_ms_mean": 25.0},
+        )]
+        mock_result.result_columns = [list(c) for c in zip(*mock_result.result_rows)]
+        mock_clickhouse_client.query.return_value = mock_result
+
+        rows = clickhouse_service.query_latest_processed(snssai_sst="1", window_duration_seconds=60)
+
+        query = mock_clickhouse_client.query.call_args[0][0]
+        params = mock_clickhouse_client.query.call_args[1]["parameters"]
+        assert "analytics.processed_latest FINAL" in query
+        assert params == {"snssai_sst": "1", "window_duration_seconds": 60}
+        assert rows[0]["pdb_ms_mean"] == 25.0
+        assert "window_end_time" in rows[0]
+
+    def test_latest_decisions_without_payload(self, clickhouse_service, mock_clickhouse_client):
+        mock_result = MagicMock()
+        mock_result.column_names = []
+        mock_result.result_rows = []
+        mock_clickhouse_client.query.return_value = mock_result
+
+        clickhouse_service.query_latest_decisions(include_payload=False)
+
+        query = mock_clickhouse_client.query.call_args[0][0]
+        assert "analytics.decisions_latest FINAL" in query
+        assert "compressed_data" not in query
+
+
+# ---------------------------------------------------------------------------
+# Transport selection
+# ---------------------------------------------------------------------------
+
+class TestTransport:
+    @pytest.fixture
+    def conf(self):
+        from src.configs.clickhouse_conf import ClickhouseConf
+
+        ClickhouseConf()
+        with patch.object(ClickhouseConf, "transport", "http"), patch.object(
+            ClickhouseConf, "compression", "lz4"
+        ):
+            yield ClickhouseConf
+
+    def test_http_passes_wire_compression(self, conf):
+        with patch("clickhouse_connect.get_client") as get_client:
+            ClickHouseService()._create_client()
+        assert get_client.call_args.kwargs["compress"] == "lz4"
+
+    def test_http_compression_none(self, conf):
+        conf.compression = "none"
+        with patch("clickhouse_connect.get_client") as get_client:
+            ClickHouseService()._create_client()
+        assert get_client.call_args.kwargs["compress"] is False
+
+    def test_native_uses_driver_with_server_side_params(self, conf):
+        conf.transport = "native"
+        conf.compression = "zstd"
+        with patch("src.services.clickhouse_native.DriverClient") as driver:
+            ClickHouseService()._create_client()
+        kwargs = driver.call_args.kwargs
+        assert kwargs["compression"] == "zstd"
+        assert kwargs["settings"] == {"server_side_params": True}
+
+    def test_unknown_transport_raises(self, conf):
+        conf.transport = "grpc"
+        with pytest.raises(ValueError, match="CLICKHOUSE_TRANSPORT"):
+            ClickHouseService()._create_client()
+
+    def test_broken_errors_depend_on_transport(self, conf):
+        from clickhouse_connect.driver.exceptions import OperationalError
+        from clickhouse_driver.errors import NetworkError
+
+        service = ClickHouseService()
+        assert service._is_broken(OperationalError("down"))
+        assert not service._is_broken(NetworkError("down"))
+        conf.transport = "native"
+        assert service._is_broken(NetworkError("down"))
+        assert not service._is_broken(ValueError("bad row"))
+
+
+class TestNativeClient:
+    @pytest.fixture
+    def driver(self):
+        with patch("src.services.clickhouse_native.DriverClient") as cls:
+            yield cls.return_value
+
+    def test_query_keeps_placeholders_and_returns_rows(self, driver):
+        from src.services.clickhouse_native import NativeClient
+
+        driver.execute.return_value = ([(1,), ("a",)], [("cell_id", "Int32"), ("name", "String")])
+        result = NativeClient("h", 9000, "u", "p").query(
+            "SELECT * FROM t WHERE cell_id = {cell_id:Int32}", parameters={"cell_id": 1}
+        )
+        query, params = driver.execute.call_args.args
+        assert "{cell_id:Int32}" in query
+        assert params == {"cell_id": 1}
+        assert result.column_names == ["cell_id", "name"]
+        assert result.result_rows == [(1, "a")]
+
+    def test_query_bytes_columns_only(self, driver):
+        from src.services.clickhouse_native import NativeClient
+
+        driver.execute.return_value = (
+            [(b"gzip",), (b"\x1f\x8b",)],
+            [("compression_method", "String"), ("compressed_data", "String")],
+        )
+        result = NativeClient("h", 9000, "u", "p").query(
+            "SELECT ...", column_formats={"compressed_data": "bytes"}
+        )
+        assert driver.execute.call_args.kwargs["settings"]["strings_as_bytes"] is True
+        assert result.result_rows == [("gzip", b"\x1f\x8b")]
+
+    def test_query_id_is_an_execute_argument(self, driver):
+        from src.services.clickhouse_native import NativeClient
+
+        driver.execute.return_value = ([], [])
+        NativeClient("h", 9000, "u", "p").query("SELECT 1", settings={"query_id": "q1"})
+
+        assert driver.execute.call_args.kwargs["query_id"] == "q1"
+        assert "query_id" not in driver.execute.call_args.kwargs["settings"]
+
+    def test_insert_builds_values_statement(self, driver):
+        from src.services.clickhouse_native import NativeClient
+
+        NativeClient("h", 9000, "u", "p").insert(
+            "analytics.processed", [[1, 2]], column_names=["a", "b"], settings={"async_insert": 1}
+        )
+        driver.execute.assert_called_once_with(
+            "INSERT INTO analytics.processed (a, b) VALUES", [[1, 2]], settings={"async_insert": 1}
+        )
+
+
+class TestAsyncQueries:
+    @pytest.mark.asyncio
+    async def test_query_runs_under_a_query_id(self, clickhouse_service, mock_clickhouse_client):
+        result = MagicMock()
+        result.column_names = ["rows", "last", "digest"]
+        result.result_columns = [[3], [None], [0]]
+        mock_clickhouse_client.query.return_value = result
+
+        assert await clickhouse_service.decisions_validator_async(start_time=0, end_time=60) == (3, None, 0)
+        assert mock_clickhouse_client.query.call_args.kwargs["settings"]["query_id"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_query_is_killed(self, clickhouse_service, mock_clickhouse_client):
+        import asyncio
+        import threading
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_query(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            raise RuntimeError("Query was cancelled")
+
+        mock_clickhouse_client.query.side_effect = slow_query
+        task = asyncio.create_task(clickhouse_service.query_processed_async(start_time=0, end_time=60))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The leader is detached from the request: give it a moment to issue the KILL
+        for _ in range(100):
+            if "KILL QUERY" in str(mock_clickhouse_client.command.call_args):
+                break
+            await asyncio.sleep(0.01)
+        release.set()
+
+        kill = mock_clickhouse_client.command.call_args
+        assert kill.args[0].startswith("KILL QUERY WHERE query_id")
+        assert kill.kwargs["parameters"]["query_id"] == mock_clickhouse_client.query.call_args.kwargs["settings"]["query_id"]
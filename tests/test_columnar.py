@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import MagicMock
+
+from src.models.columnar import ColumnarResult
+
+
+def _result(names, rows):
+    result = MagicMock()
+    result.column_names = names
+    result.result_columns = [list(c) for c in zip(*rows)]
+    return result
+
+
+class TestColumnarResult:
+    def test_to_rows_without_reshaping(self):
+        result = ColumnarResult.from_query(_result(["a", "b"], [(1, "x"), (2, "y")]))
+        assert len(result) == 2
+        assert result.to_rows() == [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]
+
+    def test_empty_result(self):
+        result = ColumnarResult.from_query(_result(["a", "metrics"], []))
+        result.explode_map("metrics")
+        assert len(result) == 0
+        assert result.to_rows() == []
+
+    def test_explode_map_one_column_per_key(self):
+        result = ColumnarResult(
+            ["event", "metrics"],
+            [["A", "B", "C"], [{"x_mean": 1.0, "y_mean": 2.0}, {"y_mean": 3.0}, {}]],
+        ).explode_map("metrics")
+
+        assert result.names == ["event", "x_mean", "y_mean"]
+        assert result.column("x_mean") == [1.0, None, None]
+        assert result.column("y_mean") == [2.0, 3.0, None]
+
+    def test_rows_omit_keys_absent_from_the_map(self):
+        rows = ColumnarResult(
+            ["event", "metrics"], [["A", "B"], [{"x_mean": 1.0}, {"y_mean": 3.0}]]
+        ).explode_map("metrics").to_rows()
+
+        assert rows == [{"event": "A", "x_mean": 1.0}, {"event": "B", "y_mean": 3.0}]
+
+    def test_nulls_in_regular_columns_are_kept(self):
+        rows = ColumnarResult(["a", "metrics"], [[None], [{"x": 1.0}]]).explode_map("metrics").to_rows()
+        assert rows == [{"a": None, "x": 1.0}]
+
+    def test_rename(self):
+        result = ColumnarResult(["window_start", "v"], [[1], [2]]).rename({"window_start": "window_start_time"})
+        assert result.to_rows() == [{"window_start_time": 1, "v": 2}]
+
+    def test_mismatched_lengths_raise(self):
+        with pytest.raises(ValueError):
+            ColumnarResult(["a", "b"], [[1]])
@@ -0,0 +1,174 @@
+import gzip
+
+import anyio.to_thread
+import orjson
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.compression_middleware import CompressionMiddleware, negotiate, parse_thresholds
+from src.responses import FastJSONResponse
+
+BIG = [{"cell_id": i, "event": "PERF_DATA", "thrputUl_mbps_mean": 10.5} for i in range(500)]
+
+
+def _app(**kwargs) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **kwargs)
+
+    @app.get("/api/v1/processed")
+    def processed():
+        return FastJSONResponse(BIG)
+
+    @app.get("/api/v1/processed/small")
+    def small():
+        return FastJSONResponse({"ok": True})
+
+    @app.get("/api/v1/decisions")
+    def decisions():
+        return FastJSONResponse(BIG)
+
+    @app.get("/api/v1/stream")
+    def stream():
+        def chunks():
+            yield b"["
+            for i in range(200):
+                yield (b"," if i else b"") + b'{"cell_id": %d}' % i
+            yield b"]"
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    @app.get("/api/v1/encoded")
+    def encoded():
+        return Response(gzip.compress(b"x" * 4096), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/api/v1/binary")
+    def binary():
+        return Response(b"\x00" * 4096, media_type="application/octet-stream")
+
+    @app.get("/api/v1/text")
+    def text():
+        return PlainTextResponse("x" * 4096)
+
+    return app
+
+
+def _raw(client: TestClient, path: str, accept: str):
+    # Ask httpx for the bytes on the wire, without transparent decoding
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+class TestNegotiate:
+    def test_prefers_zstd_then_br_then_gzip(self):
+        assert negotiate("gzip, zstd") == "zstd"
+        assert negotiate("gzip, br") in ("br", "gzip")
+        assert negotiate("gzip") == "gzip"
+
+    def test_q_values(self):
+        assert negotiate("zstd;q=0.5, gzip") == "gzip"
+        assert negotiate("zstd;q=0, gzip;q=0") is None
+        assert negotiate("*") == "zstd"
+        assert negotiate("identity") is None
+        assert negotiate("") is None
+
+    def test_parse_thresholds(self):
+        assert parse_thresholds("/a=10, /b=-1,bad,/c=x") == {"/a": 10, "/b": -1}
+
+
+class TestCompressionMiddleware:
+    @pytest.fixture
+    def client(self):
+        return TestClient(_app(minimum_size=512, thresholds={"/api/v1/decisions": -1}))
+
+    def test_zstd_body(self, client):
+        response, raw = _raw(client, "/api/v1/processed", "zstd, gzip")
+
+        assert response.headers["content-encoding"] == "zstd"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) == len(raw)
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(raw) == FastJSONResponse(BIG).body
+
+    def test_gzip_body(self, client):
+        response, raw = _raw(client, "/api/v1/processed", "gzip")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == FastJSONResponse(BIG).body
+
+    def test_no_accept_encoding_is_untouched(self, client):
+        response, raw = _raw(client, "/api/v1/processed", "identity")
+
+        assert "content-encoding" not in response.headers
+        assert raw == FastJSONResponse(BIG).body
+
+    def test_below_threshold_is_untouched(self, client):
+        response, raw = _raw(client, "/api/v1/processed/small", "gzip")
+
+        assert "content-encoding" not in response.headers
+        assert raw == b'{"ok":true}'
+
+    def test_per_path_threshold_disables(self, client):
+        response, _ = _raw(client, "/api/v1/decisions", "gzip")
+
+        assert "content-encoding" not in response.headers
+
+    def test_stream_is_compressed_per_chunk(self, client):
+        response, raw = _raw(client, "/api/v1/stream", "zstd")
+
+        assert response.headers["content-encoding"] == "zstd"
+        assert "content-length" not in response.headers
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+        assert [row["cell_id"] for row in orjson.loads(body)] == list(range(200))
+
+    @pytest.mark.asyncio
+    async def test_stream_chunks_are_decodable_as_they_arrive(self):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b"[1", "more_body": True})
+            await send({"type": "http.response.body", "body": b",2]", "more_body": False})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": "/api/v1/raw", "headers": [(b"accept-encoding", b"zstd")]}
+        await CompressionMiddleware(app, minimum_size=0)(scope, None, send)
+
+        decoder = zstandard.ZstdDecompressor().decompressobj()
+        assert [decoder.decompress(m["body"]) for m in sent[1:]] == [b"[1", b",2]"]
+        assert [m["more_body"] for m in sent[1:]] == [True, False]
+
+    def test_already_encoded_and_binary_are_untouched(self, client):
+        response, raw = _raw(client, "/api/v1/encoded", "zstd")
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == b"x" * 4096
+
+        response, _ = _raw(client, "/api/v1/binary", "zstd")
+        assert "content-encoding" not in response.headers
+
+    def test_text_is_compressed(self, client):
+        response, raw = _raw(client, "/api/v1/text", "gzip")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == b"x" * 4096
+
+    def test_large_bodies_are_offloaded(self, monkeypatch):
+        calls = []
+        real = anyio.to_thread.run_sync
+
+        async def run_sync(func, *args, **kwargs):
+            # Starlette also runs sync endpoints through here; only count compression
+            if getattr(func, "__name__", "") == "compress":
+                calls.append(func)
+            return await real(func, *args, **kwargs)
+
+        monkeypatch.setattr(anyio.to_thread, "run_sync", run_sync)
+        client = TestClient(_app(minimum_size=0, offload_size=1024))
+
+        _raw(client, "/api/v1/processed/small", "gzip")
+        assert calls == []
+        _raw(client, "/api/v1/processed", "gzip")
+        assert len(calls) == 1
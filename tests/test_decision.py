@@ -0,0 +1,169 @@
+import base64
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.configs.decision_conf import DecisionConf, DecisionField
+from src.models.decision import (
+    Decision,
+    HeaderScanner,
+    compress,
+    decompress,
+    extract_header,
+    resolve_pointer,
+)
+
+DOCUMENT = {"cell_id": 3, "timestamp": "2026-03-20T21:06:33.482Z", "actions": [{"type": "handover"}]}
+
+
+def _message(document: dict = DOCUMENT, method: str = "gzip") -> dict:
+    payload = compress(method, json.dumps(document).encode("utf-8"))
+    return {"compression": method, "data": base64.b64encode(payload).decode("ascii")}
+
+
+class TestCodecs:
+    @pytest.mark.parametrize("method", ["gzip", "zstd"])
+    def test_roundtrip(self, method):
+        assert decompress(method, compress(method, b"decision")) == b"decision"
+
+    def test_unknown_method_raises(self):
+        with pytest.raises(ValueError, match="lzma"):
+            decompress("lzma", b"")
+
+
+class TestDecisionFromMessage:
+    def test_parses_header_and_keeps_binary_payload(self):
+        decision = Decision.from_message(_message())
+
+        assert decision.cell_id == 3
+        assert decision.timestamp == datetime(2026, 3, 20, 21, 6, 33, 482000, tzinfo=timezone.utc)
+        assert decision.compression_method == "gzip"
+        assert json.loads(gzip.decompress(decision.payload)) == DOCUMENT
+
+    def test_missing_data_raises(self):
+        with pytest.raises(ValueError, match="Invalid decision message"):
+            Decision.from_message({"compression": "gzip"})
+
+    def test_missing_cell_id_raises(self):
+        document = {k: v for k, v in DOCUMENT.items() if k != "cell_id"}
+        with pytest.raises(ValueError, match="cell_id"):
+            Decision.from_message(_message(document))
+
+    def test_encoded_same_method_is_passthrough(self):
+        decision = Decision.from_message(_message())
+        method, payload = decision.encoded("gzip")
+        assert method == "gzip"
+        assert payload is decision.payload
+
+    def test_encoded_reencodes_to_zstd(self):
+        decision = Decision.from_message(_message())
+        method, payload = decision.encoded("zstd")
+        assert method == "zstd"
+        assert json.loads(decompress("zstd", payload)) == DOCUMENT
+
+
+class TestHeaderScanner:
+    TEXT = json.dumps({
+        "model": {"name": "x{y}", "weights": [1, [2, {"k": "\"]}"}]]},
+        "note": "escaped \\\" quote",
+        "cell_id": 12,
+        "flags": [],
+        "timestamp": "2026-01-01T00:00:00Z",
+        "tail": {"big": list(range(100))},
+    })
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 4096])
+    def test_finds_keys_across_chunk_boundaries(self, chunk_size):
+        scanner = HeaderScanner(["cell_id", "timestamp"])
+        for i in range(0, len(self.TEXT), chunk_size):
+            if scanner.feed(self.TEXT[i:i + chunk_size]):
+                break
+
+        assert scanner.found == {"cell_id": 12, "timestamp": "2026-01-01T00:00:00Z"}
+        # Stopped before the trailing member
+        assert i < self.TEXT.index('"tail"')
+
+    def test_reports_end_of_object(self):
+        scanner = HeaderScanner(["cell_id"])
+        assert not scanner.feed('{"a": 1}')
+        assert scanner.ended
+
+    def test_rejects_non_object(self):
+        with pytest.raises(ValueError):
+            HeaderScanner(["cell_id"]).feed("[1, 2]")
+
+
+class TestExtractHeader:
+    @pytest.mark.parametrize("method", ["gzip", "zstd"])
+    def test_stops_before_end_of_large_document(self, method):
+        document = {"cell_id": 1, "timestamp": "t", "actions": ["x" * 64] * 20000}
+        payload = compress(method, json.dumps(document).encode())
+
+        assert extract_header(method, payload) == {"cell_id": 1, "timestamp": "t"}
+
+    def test_falls_back_to_full_decode_for_nested_value(self):
+        payload = compress("gzip", json.dumps({"cell_id": {"id": 1}, "timestamp": "t"}).encode())
+        assert extract_header("gzip", payload) == {"cell_id": {"id": 1}, "timestamp": "t"}
+
+    def test_missing_key_is_absent(self):
+        payload = compress("gzip", json.dumps({"timestamp": "t"}).encode())
+        assert extract_header("gzip", payload) == {"timestamp": "t"}
+
+
+class TestExtractedFields:
+    FIELDS = [
+        DecisionField("action_type", "action.type", str),
+        DecisionField("target_cell", "action.target.cell", int),
+        DecisionField("score", "score", float),
+    ]
+
+    def test_scanner_descends_into_wanted_objects_only(self):
+        text = json.dumps({
+            "other": {"type": "ignored"},
+            "action": {"skip": [1, {"type": "no"}], "type": "handover", "target": {"cell": 9}},
+            "score": 0.5,
+        })
+        scanner = HeaderScanner(["action.type", "action.target.cell", "score"])
+        assert scanner.feed(text)
+        assert scanner.found == {"action.type": "handover", "action.target.cell": 9, "score": 0.5}
+
+    def test_from_message_extracts_typed_fields(self):
+        document = {**DOCUMENT, "action": {"type": "handover", "target": {"cell": "9"}}}
+        decision = Decision.from_message(_message(document), self.FIELDS)
+
+        assert decision.fields == {"action_type": "handover", "target_cell": 9, "score": None}
+
+    def test_unconvertible_field_is_null(self):
+        document = {**DOCUMENT, "score": "high"}
+        decision = Decision.from_message(_message(document), self.FIELDS)
+
+        assert decision.fields["score"] is None
+
+
+class TestDecisionConf:
+    def test_parses_types_and_paths(self):
+        fields = DecisionConf._parse({"action_type": {"path": "action.type"}, "score": "float"})
+
+        assert fields["action_type"].path == "action.type"
+        assert fields["action_type"].type is str
+        assert fields["score"].type is float
+
+    @pytest.mark.parametrize("name", ["limit", "format", "start_time", "include_payload"])
+    def test_query_parameter_names_are_rejected(self, name):
+        with pytest.raises(ValueError, match=f"\\[{name}\\]"):
+            DecisionConf._parse({name: "string"})
+
+
+class TestResolvePointer:
+    DOC = {"a": [{"b~c": 1, "d/e": 2}]}
+
+    def test_escapes_and_indices(self):
+        assert resolve_pointer(self.DOC, "/a/0/b~0c") == 1
+        assert resolve_pointer(self.DOC, "/a/0/d~1e") == 2
+        assert resolve_pointer(self.DOC, "") == self.DOC
+
+    def test_missing_raises_key_error(self):
+        with pytest.raises(KeyError):
+            resolve_pointer(self.DOC, "/a/5")
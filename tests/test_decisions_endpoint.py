@@ -0,0 +1,209 @@
+import base64
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.configs.decision_conf import DecisionConf, DecisionField
+from src.services.clickhouse import ClickHouseService
+
+PARAMS = {"start_time": 0, "end_time": 9999999999}
+
+
+@pytest.fixture
+def mock_clickhouse_service():
+    service_mock = MagicMock(spec=ClickHouseService)
+    with patch("src.services.databases.ClickHouse.get_service", return_value=service_mock):
+        yield service_mock
+
+
+@pytest.fixture(autouse=True)
+def extracted_fields():
+    fields = {"action_type": DecisionField("action_type", "action.type", str)}
+    with patch.object(DecisionConf, "fields", fields), patch.object(DecisionConf, "_loaded", True):
+        yield fields
+
+
+@pytest.fixture
+def test_client(mock_clickhouse_service):
+    from fastapi import FastAPI
+    from src.routers.v1 import v1_router
+
+    app = FastAPI()
+    app.include_router(v1_router, prefix="/api/v1", tags=["v1"])
+    return TestClient(app)
+
+
+class TestDecisionsEndpoint:
+    def test_payload_is_base64_encoded(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_decisions_async.return_value = [
+            {"cell_id": 1, "compression_method": "gzip", "compressed_data": b"\x1f\x8b\x00"}
+        ]
+
+        response = test_client.get("/api/v1/decisions", params=PARAMS)
+
+        assert response.status_code == 200
+        assert base64.b64decode(response.json()[0]["compressed_data"]) == b"\x1f\x8b\x00"
+
+    def test_extracted_filter_and_projection(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_decisions_async.return_value = []
+
+        response = test_client.get(
+            "/api/v1/decisions",
+            params={**PARAMS, "action_type": "handover", "columns": "action_type", "include_payload": False},
+        )
+
+        assert response.status_code == 200
+        kwargs = mock_clickhouse_service.query_decisions_async.call_args[1]
+        assert kwargs["filters"] == {"action_type": "handover"}
+        assert kwargs["columns"] == ["action_type"]
+        assert kwargs["include_payload"] is False
+
+    def test_unknown_column_returns_422(self, test_client, mock_clickhouse_service):
+        response = test_client.get("/api/v1/decisions", params={**PARAMS, "columns": "nope"})
+        assert response.status_code == 422
+
+    def test_fields(self, test_client):
+        response = test_client.get("/api/v1/decisions/fields")
+        assert response.json() == {"action_type": {"path": "action.type", "type": "str"}}
+
+    def test_service_error_returns_500(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_decisions_async.side_effect = Exception("DB error")
+
+        response = test_client.get("/api/v1/decisions", params=PARAMS)
+
+        assert response.status_code == 500
+        assert "DB error" in response.json()["detail"]
+
+
+def _stored(document: dict, method: str = "gzip") -> dict:
+    import json
+
+    from src.models.decision import compress
+
+    return {
+        "cell_id": document["cell_id"],
+        "id": 1,
+        "timestamp": "2024-01-01T00:00:00",
+        "compression_method": method,
+        "compressed_data": compress(method, json.dumps(document).encode()),
+    }
+
+
+class TestColumnarDecisions:
+    def test_columnar_base64_encodes_payload_column(self, test_client, mock_clickhouse_service):
+        from src.models.columnar import ColumnarResult
+
+        mock_clickhouse_service.query_decisions_columns_async.return_value = ColumnarResult(
+            ["cell_id", "compressed_data"], [[1, 2], [b"\x1f\x8b", b"\x28\xb5"]]
+        )
+
+        response = test_client.get("/api/v1/decisions", params={**PARAMS, "format": "columnar"})
+
+        body = response.json()
+        assert body["columns"] == ["cell_id", "compressed_data"]
+        assert body["data"][0] == [1, 2]
+        assert [base64.b64decode(v) for v in body["data"][1]] == [b"\x1f\x8b", b"\x28\xb5"]
+
+    def test_columnar_with_decode_returns_422(self, test_client):
+        response = test_client.get(
+            "/api/v1/decisions", params={**PARAMS, "format": "columnar", "decode": "true"}
+        )
+        assert response.status_code == 422
+
+
+class TestDecodedDecisions:
+    def test_decode_returns_parsed_documents_in_order(self, test_client, mock_clickhouse_service):
+        documents = [{"cell_id": i, "action": {"type": f"t{i}"}} for i in range(3)]
+        mock_clickhouse_service.query_decisions_async.return_value = [_stored(d) for d in documents]
+
+        response = test_client.get("/api/v1/decisions", params={**PARAMS, "decode": True})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [row["decision"] for row in body] == documents
+        assert "compressed_data" not in body[0]
+        assert mock_clickhouse_service.query_decisions_async.call_args[1]["include_payload"] is True
+
+    def test_decode_with_pointers(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_decisions_async.return_value = [
+            _stored({"cell_id": 1, "action": {"type": "handover"}}, "zstd")
+        ]
+
+        response = test_client.get(
+            "/api/v1/decisions",
+            params={**PARAMS, "decode": True, "pointer": ["/action/type", "/missing"]},
+        )
+
+        assert response.json()[0]["decision"] == {"/action/type": "handover", "/missing": None}
+
+    def test_corrupt_payload_reports_error(self, test_client, mock_clickhouse_service):
+        row = {**_stored({"cell_id": 1}), "compressed_data": b"garbage"}
+        mock_clickhouse_service.query_decisions_async.return_value = [row]
+
+        response = test_client.get("/api/v1/decisions", params={**PARAMS, "decode": True})
+
+        assert response.json()[0]["decision"] is None
+        assert response.json()[0]["error"]
+
+    def test_invalid_pointer_returns_422(self, test_client, mock_clickhouse_service):
+        response = test_client.get(
+            "/api/v1/decisions", params={**PARAMS, "decode": True, "pointer": "action"}
+        )
+        assert response.status_code == 422
+
+
+class TestDecisionDecoderPool:
+    def test_pool_preserves_order(self):
+        from src.services import decision_decoder
+        from src.services.decision_decoder import DecisionDecoder
+
+        rows = [_stored({"cell_id": i}) for i in range(40)]
+        with patch.object(decision_decoder, "DECODE_INLINE_BELOW", 0), \
+                patch.object(decision_decoder, "DECODE_WORKERS", 2):
+            try:
+                decoded = list(DecisionDecoder.decode(rows))
+            finally:
+                DecisionDecoder.shutdown()
+
+        import json
+        assert [json.loads(doc)["cell_id"] for doc, _ in decoded] == list(range(40))
+
+
+class TestLatestDecisions:
+    def test_latest_all_cells(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_latest_decisions.return_value = [
+            {"cell_id": 1, "compression_method": "gzip", "compressed_data": b"\x01"},
+            {"cell_id": 2, "compression_method": "gzip", "compressed_data": b"\x02"},
+        ]
+
+        response = test_client.get("/api/v1/decisions/latest")
+
+        assert response.status_code == 200
+        assert [row["cell_id"] for row in response.json()] == [1, 2]
+        assert mock_clickhouse_service.query_latest_decisions.call_args[1]["cell_id"] is None
+
+    def test_latest_decoded(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_latest_decisions.return_value = [_stored({"cell_id": 4})]
+
+        response = test_client.get("/api/v1/decisions/latest", params={"cell_id": 4, "decode": True})
+
+        assert response.json()[0]["decision"] == {"cell_id": 4}
+
+
+class TestConditionalRequests:
+    def test_matching_if_none_match_skips_the_query(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.decisions_validator_async.return_value = (3, "2024-01-01T12:00:00")
+        mock_clickhouse_service.query_decisions_async.return_value = [{"cell_id": 1}]
+        tag = test_client.get("/api/v1/decisions", params={**PARAMS, "cell_id": 1}).headers["etag"]
+        mock_clickhouse_service.query_decisions_async.reset_mock()
+
+        response = test_client.get(
+            "/api/v1/decisions", params={**PARAMS, "cell_id": 1}, headers={"If-None-Match": f"\"x\", {tag}"}
+        )
+
+        assert response.status_code == 304
+        mock_clickhouse_service.query_decisions_async.assert_not_called()
+        kwargs = mock_clickhouse_service.decisions_validator_async.call_args[1]
+        assert kwargs["cell_id"] == 1
+        assert kwargs["filters"] == {}
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from src.services.influx import InfluxService
 
 
@@ -76,3 +76,489 @@ class TestGetFields:
         influx_service.query_api.query.assert_called_once()
         query_str = influx_service.query_api.query.call_args[0][0]
         assert "fieldKeys" in query_str
+
+
+def _record(values: dict):
+    record = MagicMock()
+    record.values = values
+    record.get_time.return_value = values["_time"]
+    return record
+
+
+class TestQueryRawData:
+    """Tests for InfluxService.query_raw_data()."""
+
+    def test_query_pivots_and_pages_rows(self, influx_service):
+        influx_service.query_api.query_stream.return_value = []
+
+        influx_service.query_raw_data(0, 60, {"event": "PERF_DATA"})
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert 'pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")' in query
+        assert 'sort(columns: ["_time", "event", ' in query
+        # limit comes after the merge, so it counts rows
+        assert query.index("group()") < query.index("sort(") < query.index("limit(n: 51, offset: 0)")
+
+    def test_rows_are_flat_records(self, influx_service):
+        from datetime import datetime, timezone
+
+        t = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        influx_service.query_api.query_stream.return_value = [
+            _record({"result": "_result", "table": 0, "_time": t, "event": "PERF_DATA", "supi": "imsi-1",
+                     "rsrp": -90.0, "sinr": None, "shard": "7"}),
+            _record({"result": "_result", "table": 0, "_time": t, "event": "PERF_DATA", "supi": "imsi-2",
+                     "rsrp": None, "sinr": 12.0}),
+        ]
+
+        rows, next_cursor = influx_service.query_raw_data(0, 60, {})
+
+        # Two series at the same timestamp stay two rows
+        assert rows == [
+            {"timestamp": t.isoformat(), "event": "PERF_DATA", "supi": "imsi-1", "rsrp": -90.0},
+            {"timestamp": t.isoformat(), "event": "PERF_DATA", "supi": "imsi-2", "sinr": 12.0},
+        ]
+        assert next_cursor is None
+
+    def test_tag_values_are_escaped(self, influx_service):
+        influx_service.query_api.query_stream.return_value = []
+
+        influx_service.query_raw_data(0, 60, {"supi": 'x" or true or "'})
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert 'r["supi"] == "x\\" or true or \\""' in query
+
+
+class TestRawCursor:
+    """Cursor pagination of InfluxService.query_raw_data()."""
+
+    @staticmethod
+    def _records(seconds: list[int]):
+        from datetime import datetime, timezone
+
+        return [
+            _record({"_time": datetime.fromtimestamp(t, tz=timezone.utc), "supi": str(i)})
+            for i, t in enumerate(seconds)
+        ]
+
+    def test_extra_row_yields_cursor_at_last_timestamp(self, influx_service):
+        from src.services.influx import decode_cursor
+
+        influx_service.query_api.query_stream.return_value = self._records([1, 2, 2, 3])
+
+        rows, next_cursor = influx_service.query_raw_data(0, 60, {}, limit=3)
+
+        assert len(rows) == 3
+        # Last row is at t=2 and both rows at t=2 were sent
+        assert decode_cursor(next_cursor) == (2_000_000_000, 2)
+
+    def test_cursor_starts_range_and_skips_sent_rows(self, influx_service):
+        from src.services.influx import encode_cursor
+
+        influx_service.query_api.query_stream.return_value = []
+
+        influx_service.query_raw_data(0, 60, {}, cursor=encode_cursor(2_000_000_000, 2))
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert "range(start: time(v: 2000000000), stop: 60)" in query
+        assert "limit(n: 51, offset: 2)" in query
+
+    def test_series_are_cut_to_one_page_before_the_pivot(self, influx_service):
+        from src.services.influx import encode_cursor
+
+        influx_service.query_api.query_stream.return_value = []
+
+        influx_service.query_raw_data(0, 60, {}, cursor=encode_cursor(2_000_000_000, 2), limit=10)
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        # skip + limit + 1 rows per series: the rest of the range is never pivoted
+        assert query.index("limit(n: 13)") < query.index("pivot(") < query.index("sort(")
+
+    def test_page_within_one_timestamp_accumulates(self, influx_service):
+        from src.services.influx import decode_cursor, encode_cursor
+
+        influx_service.query_api.query_stream.return_value = self._records([2, 2, 2])
+
+        _, next_cursor = influx_service.query_raw_data(0, 60, {}, cursor=encode_cursor(2_000_000_000, 5), limit=2)
+
+        assert decode_cursor(next_cursor) == (2_000_000_000, 7)
+
+    def test_invalid_cursor_raises_value_error(self, influx_service):
+        with pytest.raises(ValueError):
+            influx_service.query_raw_data(0, 60, {}, cursor="not-a-cursor")
+
+
+class TestRawFieldProjection:
+    """fields= projection of InfluxService.query_raw_data()."""
+
+    @pytest.fixture(autouse=True)
+    def known(self, influx_service):
+        influx_service.get_fields = MagicMock(return_value=["rsrp", "sinr", "mean_latency"])
+        influx_service.query_api.query_stream.return_value = []
+
+    def test_fields_compiled_into_flux_filter(self, influx_service):
+        influx_service.query_raw_data(0, 60, {}, fields=["rsrp", "sinr"])
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert '|> filter(fn: (r) => r._field == "rsrp" or r._field == "sinr")' in query
+        # Projection happens before the pivot
+        assert query.index('r._field == "rsrp"') < query.index("pivot(")
+
+    def test_no_fields_reads_everything(self, influx_service):
+        influx_service.query_raw_data(0, 60, {})
+
+        assert "r._field" not in influx_service.query_api.query_stream.call_args[0][0]
+
+    def test_unknown_field_raises(self, influx_service):
+        with pytest.raises(ValueError, match="bogus"):
+            influx_service.query_raw_data(0, 60, {}, fields=["rsrp", "bogus"])
+
+        influx_service.query_api.query_stream.assert_not_called()
+
+    def test_field_list_is_cached_and_refreshed_on_miss(self, influx_service):
+        influx_service.query_raw_data(0, 60, {}, fields=["rsrp"])
+        influx_service.query_raw_data(0, 60, {}, fields=["sinr"])
+        assert influx_service.get_fields.call_count == 1
+
+        influx_service.get_fields.return_value = ["rsrp", "sinr", "mean_latency", "cqi"]
+        influx_service.query_raw_data(0, 60, {}, fields=["cqi"])
+        assert influx_service.get_fields.call_count == 2
+
+
+class TestSchemaTags:
+    """Tag keys come from the schema and the cardinality guard, not a fixed list."""
+
+    @pytest.fixture(autouse=True)
+    def schema(self, influx_service):
+        from src.models.raw import RawEncoder
+
+        influx_service.encoder = RawEncoder(tags={"dnn", "cellId"})
+        influx_service.query_api.query_stream.return_value = []
+        influx_service.query_api.query.return_value = []
+
+    def test_filters_on_fields_apply_after_the_pivot(self, influx_service):
+        influx_service.query_raw_data(0, 60, {"dnn": "internet", "supi": "imsi-1"})
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert query.index('r["dnn"] == "internet"') < query.index("pivot(")
+        assert query.index('r["supi"] == "imsi-1"') > query.index("pivot(")
+        # A cut before the pivot could drop matching rows; it comes after the filter
+        assert query.index('r["supi"] == "imsi-1"') < query.index("limit(n: 51)") < query.index("sort(")
+        assert query.index("limit(n: 51)") > query.index("pivot(")
+
+    def test_demoted_tags_are_filtered_after_the_pivot(self, influx_service):
+        influx_service.encoder.guard.overflowing.add("cellId")
+        influx_service.get_fields = MagicMock(return_value=["rsrp", "cellId"])
+
+        influx_service.query_raw_data(0, 60, {"cellId": "7"}, fields=["rsrp"])
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert query.index('r["cellId"] == "7"') > query.index("pivot(")
+        # The column filtered on is read
+        assert 'r._field == "cellId"' in query
+
+    def test_rows_are_sorted_by_configured_tags(self, influx_service):
+        influx_service.query_raw_data(0, 60, {})
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        # The shard tag last: it alone may tell same-timestamp rows apart
+        assert 'sort(columns: ["_time", "event", "dnn", "cellId", "shard"])' in query
+
+    def test_aggregates_only_group_and_filter_by_tags(self, influx_service):
+        influx_service.aggregate_raw_data(0, 3600, every="5m", functions=["mean"], tags={}, group_by=["cellId"])
+        assert 'group(columns: ["cellId", "_field"])' in influx_service.query_api.query.call_args[0][0]
+
+        with pytest.raises(ValueError, match="supi"):
+            influx_service.aggregate_raw_data(0, 3600, every="5m", functions=["mean"], tags={}, group_by=["supi"])
+        with pytest.raises(ValueError, match="supi"):
+            influx_service.aggregate_raw_data(0, 3600, every="5m", functions=["mean"], tags={"supi": "a"})
+
+
+class TestAggregateRawData:
+    """InfluxService.aggregate_raw_data()."""
+
+    def test_query_uses_aggregate_window_per_function(self, influx_service):
+        influx_service.query_api.query.return_value = []
+
+        influx_service.aggregate_raw_data(
+            0, 3600, every="5m", functions=["mean", "max"], tags={"event": "PERF_DATA"}, group_by=["supi"],
+        )
+
+        query = influx_service.query_api.query.call_args[0][0]
+        assert 'r["event"] == "PERF_DATA"' in query
+        assert 'group(columns: ["supi", "_field"])' in query
+        assert "aggregateWindow(every: 5m, fn: mean, createEmpty: false)" in query
+        assert "aggregateWindow(every: 5m, fn: max, createEmpty: false)" in query
+        assert 'types.isType(v: r._value, type: "int")' in query
+
+    def test_records_become_compact_series(self, influx_service):
+        from datetime import datetime, timezone
+
+        t0 = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        t1 = datetime(2024, 1, 1, 12, 5, tzinfo=timezone.utc)
+        table = MagicMock()
+        table.records = [
+            _record({"_time": t0, "_value": 1.0, "_field": "rsrp", "_agg": "mean", "supi": "a"}),
+            _record({"_time": t1, "_value": 2.0, "_field": "rsrp", "_agg": "mean", "supi": "a"}),
+            _record({"_time": t0, "_value": 5.0, "_field": "rsrp", "_agg": "mean", "supi": "b"}),
+        ]
+        influx_service.query_api.query.return_value = [table]
+
+        series = influx_service.aggregate_raw_data(0, 3600, "5m", ["mean"], {}, group_by=["supi"])
+
+        assert series == [
+            {"tags": {"supi": "a"}, "field": "rsrp", "fn": "mean",
+             "times": [t0.isoformat(), t1.isoformat()], "values": [1.0, 2.0]},
+            {"tags": {"supi": "b"}, "field": "rsrp", "fn": "mean", "times": [t0.isoformat()], "values": [5.0]},
+        ]
+
+    @pytest.mark.parametrize("kwargs", [
+        {"every": "5x"},
+        {"every": "0s"},
+        {"every": "1s", "end_time": 86400},
+        {"functions": ["avg"]},
+        {"functions": []},
+        {"group_by": ["cell"]},
+        {"end_time": 0},
+        {"start_time": 7200},
+    ])
+    def test_invalid_arguments_raise(self, influx_service, kwargs):
+        args = {"start_time": 0, "end_time": 3600, "every": "1m", "functions": ["mean"], "tags": {}, **kwargs}
+
+        with pytest.raises(ValueError):
+            influx_service.aggregate_raw_data(**args)
+
+        influx_service.query_api.query.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_empty_range_is_rejected_before_slicing(self, influx_service):
+        # A window-aligned start equal to the end used to fail inside the slicing
+        with pytest.raises(ValueError, match="end_time .* must be after start_time"):
+            await influx_service.aggregate_raw_data_async(600, 600, "5m", ["mean"], {})
+
+
+class TestStreamRawData:
+    """InfluxService.stream_raw_data()."""
+
+    def test_rows_are_converted_lazily(self, influx_service):
+        from datetime import datetime, timezone
+
+        read = []
+
+        def records():
+            for i in range(3):
+                read.append(i)
+                yield _record({"_time": datetime.fromtimestamp(i, tz=timezone.utc), "rsrp": float(i)})
+
+        influx_service.query_api.query_stream.return_value = records()
+
+        rows = influx_service.stream_raw_data(0, 60, {"event": "PERF_DATA"})
+        assert read == []
+        assert next(rows) == {"timestamp": "1970-01-01T00:00:00+00:00", "rsrp": 0.0}
+        assert read == [0]
+
+        query = influx_service.query_api.query_stream.call_args[0][0]
+        assert "pivot(" in query and "limit(" not in query and "sort(" not in query
+
+    def test_unknown_field_raises_before_reading(self, influx_service):
+        influx_service.get_fields = MagicMock(return_value=["rsrp"])
+
+        with pytest.raises(ValueError):
+            influx_service.stream_raw_data(0, 60, {}, fields=["bogus"])
+
+        influx_service.query_api.query_stream.assert_not_called()
+
+
+@pytest.fixture
+def async_query_api(influx_service):
+    """Async query API of the service, as returned by InfluxDBClientAsync."""
+    api = MagicMock()
+    api.query = AsyncMock(return_value=[])
+    influx_service._async_client = MagicMock()
+    influx_service._async_client.query_api.return_value = api
+    return api
+
+
+class TestAsyncQueries:
+    """Async variants, used by the async /raw handlers."""
+
+    @pytest.mark.asyncio
+    async def test_raw_page_reads_the_async_stream(self, influx_service, async_query_api):
+        from datetime import datetime, timezone
+
+        async def records():
+            for i in range(3):
+                yield _record({"_time": datetime.fromtimestamp(i, tz=timezone.utc), "supi": str(i)})
+
+        async_query_api.query_stream = AsyncMock(return_value=records())
+
+        rows, cursor = await influx_service.query_raw_data_async(0, 60, {"event": "PERF_DATA"}, limit=2)
+
+        assert [row["supi"] for row in rows] == ["0", "1"]
+        assert cursor is not None
+        assert "limit(n: 3, offset: 0)" in async_query_api.query_stream.call_args[0][0]
+        influx_service.query_api.query_stream.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_long_aggregate_fans_out_over_time_slices(self, influx_service, async_query_api, monkeypatch):
+        from datetime import datetime, timezone
+
+        monkeypatch.setattr(influx_service.conf, "query_slices", 4)
+        monkeypatch.setattr(influx_service.conf, "query_slice_seconds", 3600)
+
+        def table(start):
+            t = datetime.fromtimestamp(start + 300, tz=timezone.utc)
+            table = MagicMock()
+            table.records = [_record({"_time": t, "_value": float(start), "_field": "rsrp", "_agg": "mean"})]
+            return table
+
+        def bounds(query):
+            start, stop = query.split("range(start: ")[1].split(")")[0].split(", stop: ")
+            return int(start), int(stop)
+
+        async def query(q):
+            return [table(bounds(q)[0])]
+
+        async_query_api.query.side_effect = query
+
+        series = await influx_service.aggregate_raw_data_async(0, 4 * 3600, "5m", ["mean"], {})
+
+        ranges = sorted(bounds(call[0][0]) for call in async_query_api.query.call_args_list)
+        assert ranges == [(h * 3600, (h + 1) * 3600) for h in range(4)]
+        assert len(series) == 1
+        assert series[0]["values"] == [0.0, 3600.0, 7200.0, 10800.0]
+
+    @pytest.mark.asyncio
+    async def test_short_aggregate_is_one_query(self, influx_service, async_query_api, monkeypatch):
+        monkeypatch.setattr(influx_service.conf, "query_slice_seconds", 3600)
+
+        await influx_service.aggregate_raw_data_async(0, 1800, "5m", ["mean"], {})
+
+        assert async_query_api.query.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_field_raises(self, influx_service, async_query_api):
+        record = MagicMock()
+        record.get_value.return_value = "rsrp"
+        fields = MagicMock()
+        fields.records = [record]
+        async_query_api.query.return_value = [fields]
+
+        with pytest.raises(ValueError):
+            await influx_service.query_raw_data_async(0, 60, {}, fields=["bogus"])
+
+
+@pytest.mark.parametrize("start, end, count, expected", [
+    (0, 3600, 4, [(0, 900), (900, 1800), (1800, 2700), (2700, 3600)]),
+    # Inner bounds stay on window boundaries
+    (30, 200, 4, [(30, 60), (60, 120), (120, 180), (180, 200)]),
+    (0, 60, 4, [(0, 60)]),
+    (0, 3600, 0, [(0, 3600)]),
+])
+def test_slices(start, end, count, expected):
+    from src.services.influx import _slices
+
+    assert _slices(start, end, 60, count) == expected
+
+
+class TestWrites:
+    """Write options, precision and acknowledged-write accounting."""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        from src.metrics import Metrics
+
+        Metrics.reset()
+        yield
+        Metrics.reset()
+
+    DATA = {"timestamp": 1704067200.5, "tags": {"supi": "imsi-1"}, "event": "PERF_DATA", "metrics": {"rsrp": -90}}
+
+    def test_write_options_come_from_conf(self, influx_service, mock_influx_client, monkeypatch):
+        from influxdb_client.client.write_api import WriteType
+
+        monkeypatch.setattr(influx_service.conf, "write_batch_size", 123)
+        monkeypatch.setattr(influx_service.conf, "write_jitter_interval", 50)
+        monkeypatch.setattr(influx_service.conf, "write_max_retries", 2)
+        with patch("src.services.influx.InfluxDBClient", return_value=mock_influx_client):
+            influx_service.connect()
+
+        kwargs = mock_influx_client.write_api.call_args.kwargs
+        options = kwargs["write_options"]
+        assert options.write_type == WriteType.batching
+        assert (options.batch_size, options.jitter_interval, options.max_retries) == (123, 50, 2)
+        assert kwargs["success_callback"] == influx_service._on_written
+        assert kwargs["error_callback"] == influx_service._on_write_error
+
+    def test_points_use_configured_precision(self, influx_service, mock_influx_client, monkeypatch):
+        monkeypatch.setattr(influx_service.conf, "write_precision", "s")
+        with patch("src.services.influx.InfluxDBClient", return_value=mock_influx_client):
+            influx_service.connect()
+
+        influx_service.write_batch([self.DATA])
+
+        point = influx_service.write_api.write.call_args.kwargs["record"][0]
+        assert point.to_line_protocol().endswith(" 1704067200")
+
+    def test_callbacks_settle_queued_points(self, influx_service):
+        from src.metrics import Metrics
+
+        influx_service.write_batch([self.DATA] * 3)
+        assert Metrics.snapshot()["gauges"]["influx.write.pending"] == 3
+
+        influx_service._on_written(("b", "o", "ns"), b"raw a=1\nraw a=2")
+        influx_service._on_write_error(("b", "o", "ns"), b"raw a=3", RuntimeError("boom"))
+        influx_service._on_write_retry(("b", "o", "ns"), b"raw a=3", RuntimeError("boom"))
+
+        snapshot = Metrics.snapshot()
+        assert snapshot["gauges"]["influx.write.pending"] == 0
+        assert snapshot["counters"]["influx.write.points"] == 2
+        assert snapshot["counters"]["influx.write.failed_points"] == 1
+        assert snapshot["counters"]["influx.write.retries"] == 1
+        assert snapshot["timings"]["influx.write.latency_seconds"]["count"] == 2
+
+    def test_pending_gauge_is_safe_under_concurrent_writes(self, influx_service):
+        import threading
+
+        from src.metrics import Metrics
+
+        stop = threading.Event()
+
+        def churn():
+            while not stop.is_set():
+                for _ in range(50):
+                    influx_service.write_batch([self.DATA])
+                influx_service._on_written(("b", "o", "ns"), b"\n".join([b"raw a=1"] * 50))
+
+        writer = threading.Thread(target=churn)
+        writer.start()
+        try:
+            for _ in range(2000):
+                assert Metrics.snapshot()["gauges"]["influx.write.pending"] >= 0
+        finally:
+            stop.set()
+            writer.join()
+
+    def test_batching_failures_reach_the_sink(self, influx_service):
+        from src.sinks.influx_sink import InfluxSink
+
+        with patch("src.sinks.influx_sink.Influx.get_service", return_value=influx_service):
+            sink = InfluxSink(MagicMock())
+
+        assert sink.write_batch([self.DATA] * 2) is True
+        influx_service._on_write_error(("b", "o", "ns"), b"raw a=1\nraw a=2", RuntimeError("boom"))
+
+        assert sink.take_failed() == 2
+        assert sink.take_failed() == 0
+
+    def test_synchronous_failure_reaches_the_sink(self, influx_service, monkeypatch):
+        from src.metrics import Metrics
+        from src.sinks.influx_sink import InfluxSink
+
+        monkeypatch.setattr(influx_service.conf, "write_mode", "synchronous")
+        influx_service.write_api.write.side_effect = RuntimeError("unauthorized")
+        with patch("src.sinks.influx_sink.Influx.get_service", return_value=influx_service):
+            sink = InfluxSink(MagicMock())
+
+        assert sink.write_batch([self.DATA]) is False
+        assert Metrics.counter("influx.write.failed_points") == 1
+        assert Metrics.snapshot()["gauges"]["influx.write.pending"] == 0
@@ -0,0 +1,127 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.metrics import Metrics
+from src.services.pool import ClientPool, PoolTimeout
+
+
+class BrokenConnection(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    Metrics.reset()
+    yield
+    Metrics.reset()
+
+
+def make_pool(**kwargs) -> ClientPool:
+    defaults = dict(
+        min_size=1,
+        max_size=2,
+        timeout=0.2,
+        idle_timeout=0,
+        validate_after=0,
+        close=lambda client: client.close(),
+        is_broken=lambda e: isinstance(e, BrokenConnection),
+        name="test",
+    )
+    return ClientPool(MagicMock, **{**defaults, **kwargs})
+
+
+class TestClientPool:
+    def test_fill_creates_min_size(self):
+        pool = make_pool(min_size=2, max_size=4)
+        pool.fill()
+        assert pool.qsize() == 2
+        assert Metrics.counter("test.pool.created") == 2
+
+    def test_grows_to_max_then_times_out(self):
+        pool = make_pool()
+        pool.fill()
+        a = pool.acquire()
+        b = pool.acquire()
+        assert a is not b
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert Metrics.counter("test.pool.timeouts") == 1
+        assert pool.stats()["in_use"] == 2
+
+    def test_released_client_is_reused(self):
+        pool = make_pool()
+        pool.fill()
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert first is second
+        assert pool.stats() == {"size": 1, "in_use": 0, "idle": 1, "waiting": 0, "min_size": 1, "max_size": 2}
+
+    def test_waiters_are_served_in_order(self):
+        pool = make_pool(max_size=1, timeout=2)
+        pool.fill()
+        held = pool.acquire()
+        order = []
+
+        def borrow(i):
+            with pool.connection():
+                order.append(i)
+                time.sleep(0.01)
+
+        threads = []
+        for i in range(3):
+            t = threading.Thread(target=borrow, args=(i,))
+            t.start()
+            threads.append(t)
+            time.sleep(0.05)  # queue them in a known order
+        pool.release(held)
+        for t in threads:
+            t.join()
+
+        assert order == [0, 1, 2]
+
+    def test_unhealthy_client_is_replaced_on_borrow(self):
+        pool = make_pool(health_check=lambda client: client.alive)
+        pool.fill()
+        dead = pool.acquire()
+        dead.alive = False
+        pool.release(dead)
+
+        client = pool.acquire()
+
+        assert client is not dead
+        dead.close.assert_called_once()
+        assert Metrics.counter("test.pool.health_check_failures") == 1
+
+    def test_broken_client_is_discarded(self):
+        pool = make_pool()
+        pool.fill()
+        with pytest.raises(BrokenConnection):
+            with pool.connection() as client:
+                raise BrokenConnection()
+        client.close.assert_called_once()
+        assert pool.stats()["size"] == 0
+
+    def test_other_errors_keep_client(self):
+        pool = make_pool()
+        pool.fill()
+        with pytest.raises(ValueError):
+            with pool.connection():
+                raise ValueError("bad query")
+        assert pool.qsize() == 1
+
+    def test_evict_idle_keeps_min_size(self):
+        pool = make_pool(min_size=1, max_size=3, idle_timeout=0.01)
+        pool.fill()
+        clients = [pool.acquire() for _ in range(3)]
+        for client in clients:
+            pool.release(client)
+        time.sleep(0.02)
+
+        assert pool.evict_idle() == 2
+        assert pool.stats()["size"] == 1
+        assert Metrics.counter("test.pool.destroyed") == 2
@@ -4,13 +4,17 @@ from unittest.mock import MagicMock, patch
 import pytest
 from fastapi.testclient import TestClient
 
+from src.services.clickhouse import ClickHouseService
+
+from src.services.influx import InfluxService
+
 SAMPLE_START_TIME = int(datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc).timestamp())
 SAMPLE_END_TIME = int(datetime(2024, 1, 1, 13, 0, 0, tzinfo=timezone.utc).timestamp())
 
 
 @pytest.fixture
 def mock_clickhouse_service():
-    service_mock = MagicMock()
+    service_mock = MagicMock(spec=ClickHouseService)
     with patch("src.services.databases.ClickHouse.get_service", return_value=service_mock):
         yield service_mock
 
@@ -52,7 +56,7 @@ REQUIRED_PARAMS = {
 
 class TestProcessedEndpoint:
     def test_success(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row]
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
 
         response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
 
@@ -64,7 +68,7 @@ class TestProcessedEndpoint:
         assert data[0]["thrputUl_mbps_mean"] == 11.5
 
     def test_empty_result(self, test_client, mock_clickhouse_service):
-        mock_clickhouse_service.query_processed.return_value = []
+        mock_clickhouse_service.query_processed_async.return_value = []
 
         response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
 
@@ -81,7 +85,7 @@ class TestProcessedEndpoint:
         assert response.status_code == 422
 
     def test_optional_snssai_sd(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row]
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
 
         response = test_client.get(
             "/api/v1/processed",
@@ -89,11 +93,11 @@ class TestProcessedEndpoint:
         )
 
         assert response.status_code == 200
-        call_kwargs = mock_clickhouse_service.query_processed.call_args[1]
+        call_kwargs = mock_clickhouse_service.query_processed_async.call_args[1]
         assert call_kwargs["snssai_sd"] == "000001"
 
     def test_optional_event_filter(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row]
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
 
         response = test_client.get(
             "/api/v1/processed",
@@ -101,11 +105,11 @@ class TestProcessedEndpoint:
         )
 
         assert response.status_code == 200
-        call_kwargs = mock_clickhouse_service.query_processed.call_args[1]
+        call_kwargs = mock_clickhouse_service.query_processed_async.call_args[1]
         assert call_kwargs["event"] == "PERF_DATA"
 
     def test_optional_window_duration(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row]
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
 
         response = test_client.get(
             "/api/v1/processed",
@@ -113,11 +117,11 @@ class TestProcessedEndpoint:
         )
 
         assert response.status_code == 200
-        call_kwargs = mock_clickhouse_service.query_processed.call_args[1]
+        call_kwargs = mock_clickhouse_service.query_processed_async.call_args[1]
         assert call_kwargs["window_duration_seconds"] == 60
 
     def test_pagination_passed_to_service(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row]
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
 
         response = test_client.get(
             "/api/v1/processed",
@@ -125,16 +129,16 @@ class TestProcessedEndpoint:
         )
 
         assert response.status_code == 200
-        call_kwargs = mock_clickhouse_service.query_processed.call_args[1]
+        call_kwargs = mock_clickhouse_service.query_processed_async.call_args[1]
         assert call_kwargs["offset"] == 50
         assert call_kwargs["limit"] == 25
 
     def test_default_pagination(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row]
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
 
         test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
 
-        call_kwargs = mock_clickhouse_service.query_processed.call_args[1]
+        call_kwargs = mock_clickhouse_service.query_processed_async.call_args[1]
         assert call_kwargs["offset"] == 0
         assert call_kwargs["limit"] == 100
 
@@ -158,7 +162,7 @@ class TestProcessedEndpoint:
         assert response.status_code == 422
 
     def test_service_error_returns_500(self, test_client, mock_clickhouse_service):
-        mock_clickhouse_service.query_processed.side_effect = Exception("DB error")
+        mock_clickhouse_service.query_processed_async.side_effect = Exception("DB error")
 
         response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
 
@@ -166,7 +170,7 @@ class TestProcessedEndpoint:
         assert "DB error" in response.json()["detail"]
 
     def test_multiple_results(self, test_client, mock_clickhouse_service, sample_row):
-        mock_clickhouse_service.query_processed.return_value = [sample_row] * 5
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row] * 5
 
         response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
 
@@ -185,7 +189,7 @@ class TestProcessedEndpoint:
             "event": "PERF_DATA",
             "ue_tags": {"ueIpv4Addr": "10.0.0.1"},
         }
-        mock_clickhouse_service.query_processed.return_value = [row]
+        mock_clickhouse_service.query_processed_async.return_value = [row]
 
         response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
 
@@ -223,3 +227,237 @@ class TestFieldsEndpoint:
 
         assert response.status_code == 500
         assert "view missing" in response.json()["detail"]
+
+
+class TestLatestEndpoint:
+    def test_latest_success(self, test_client, mock_clickhouse_service, sample_row):
+        mock_clickhouse_service.query_latest_processed.return_value = [sample_row]
+
+        response = test_client.get("/api/v1/processed/latest", params={"snssai_sst": "1"})
+
+        assert response.status_code == 200
+        assert response.json()[0]["thrputUl_mbps_mean"] == 11.5
+        call_kwargs = mock_clickhouse_service.query_latest_processed.call_args[1]
+        assert call_kwargs["snssai_sst"] == "1"
+        assert call_kwargs["dnn"] is None
+
+    def test_latest_service_error(self, test_client, mock_clickhouse_service):
+        mock_clickhouse_service.query_latest_processed.side_effect = Exception("no table")
+
+        response = test_client.get("/api/v1/processed/latest")
+
+        assert response.status_code == 500
+        assert "no table" in response.json()["detail"]
+
+
+class TestColumnarFormat:
+    def test_columnar_sends_each_metric_name_once(self, test_client, mock_clickhouse_service):
+        from src.models.columnar import ColumnarResult
+
+        mock_clickhouse_service.query_processed_columns_async.return_value = ColumnarResult(
+            ["window_start_time", "event", "metrics"],
+            [
+                [datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 1, 12, 1)],
+                ["PERF_DATA", "PERF_DATA"],
+                [{"pdb_ms_mean": 25.0}, {"pdb_ms_mean": 26.0, "thrputUl_mbps_mean": 11.5}],
+            ],
+        ).explode_map("metrics")
+
+        response = test_client.get("/api/v1/processed", params={**REQUIRED_PARAMS, "format": "columnar"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["columns"] == ["window_start_time", "event", "pdb_ms_mean", "thrputUl_mbps_mean"]
+        assert body["data"][0] == ["2024-01-01T12:00:00", "2024-01-01T12:01:00"]
+        assert body["data"][3] == [None, 11.5]
+        mock_clickhouse_service.query_processed_async.assert_not_called()
+
+    def test_unknown_format_returns_422(self, test_client):
+        response = test_client.get("/api/v1/processed", params={**REQUIRED_PARAMS, "format": "csv"})
+        assert response.status_code == 422
+
+    def test_raw_columnar(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.query_raw_data_async.return_value = (
+            [{"timestamp": "t0", "event": "A", "rsrp": -90.0}, {"timestamp": "t1", "event": "A"}],
+            None,
+        )
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get(
+                "/api/v1/raw", params={"start_time": 0, "end_time": 10, "format": "columnar"}
+            )
+
+        assert response.json() == {
+            "columns": ["timestamp", "event", "rsrp"],
+            "data": [["t0", "t1"], ["A", "A"], [-90.0, None]],
+            "next_cursor": None,
+        }
+
+
+class TestRawCursor:
+    def test_cursor_is_passed_and_returned(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.query_raw_data_async.return_value = ([{"timestamp": "t0", "event": "A"}], "next")
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get("/api/v1/raw", params={"start_time": 0, "end_time": 10, "cursor": "abc"})
+
+        assert response.json() == {"data": [{"timestamp": "t0", "event": "A"}], "next_cursor": "next"}
+        assert influx.query_raw_data_async.call_args[1]["cursor"] == "abc"
+
+    def test_fields_are_split(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.query_raw_data_async.return_value = ([], None)
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            test_client.get("/api/v1/raw", params={"start_time": 0, "end_time": 10, "fields": "rsrp, sinr"})
+
+        assert influx.query_raw_data_async.call_args[1]["fields"] == ["rsrp", "sinr"]
+
+    def test_invalid_cursor_returns_422(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.query_raw_data_async.side_effect = ValueError("Invalid cursor: abc")
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get("/api/v1/raw", params={"start_time": 0, "end_time": 10, "cursor": "abc"})
+
+        assert response.status_code == 422
+
+
+class TestRawAggregate:
+    def test_parameters_are_passed(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.aggregate_raw_data_async.return_value = [
+            {"tags": {"supi": "a"}, "field": "rsrp", "fn": "mean", "times": ["t0"], "values": [1.0]}
+        ]
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get("/api/v1/raw/aggregate", params={
+                "start_time": 0, "end_time": 3600, "every": "5m", "fn": "mean,max",
+                "group_by": "supi", "fields": "rsrp", "event": "PERF_DATA",
+            })
+
+        assert response.status_code == 200
+        assert response.json()["series"][0]["values"] == [1.0]
+        kwargs = influx.aggregate_raw_data_async.call_args[1]
+        assert kwargs["functions"] == ["mean", "max"]
+        assert kwargs["group_by"] == ["supi"]
+        assert kwargs["fields"] == ["rsrp"]
+        assert kwargs["tags"] == {"event": "PERF_DATA"}
+
+    def test_invalid_window_returns_422(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.aggregate_raw_data_async.side_effect = ValueError("Invalid window size: 5x")
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get("/api/v1/raw/aggregate", params={"start_time": 0, "end_time": 10, "every": "5x"})
+
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize("end_time", [600, 0])
+    def test_empty_range_returns_422(self, test_client, end_time):
+        # Checked by the service before any query reaches InfluxDB
+        influx = InfluxService()
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get(
+                "/api/v1/raw/aggregate", params={"start_time": 600, "end_time": end_time, "every": "5m"}
+            )
+
+        assert response.status_code == 422
+        assert "must be after start_time" in response.json()["detail"]
+
+
+class TestRawStream:
+    def test_rows_are_sent_as_ndjson(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.stream_raw_data.return_value = iter([{"timestamp": "t0", "rsrp": -90.0}, {"timestamp": "t1"}])
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get("/api/v1/raw/stream", params={"start_time": 0, "end_time": 10, "supi": "a"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.content == b'{"timestamp":"t0","rsrp":-90.0}\n{"timestamp":"t1"}\n'
+        assert influx.stream_raw_data.call_args[1]["tags"] == {"supi": "a"}
+
+    def test_schema_tags_are_filters(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.stream_raw_data.return_value = iter([])
+        with patch("src.services.databases.Influx.get_service", return_value=influx), \
+                patch("src.configs.schema_conf.SchemaConf.get_tags", return_value={"cellId"}):
+            test_client.get("/api/v1/raw/stream", params={"start_time": 0, "end_time": 10, "cellId": "7", "x": "1"})
+
+        assert influx.stream_raw_data.call_args[1]["tags"] == {"cellId": "7"}
+
+    @pytest.mark.parametrize("path", ["/api/v1/raw", "/api/v1/raw/aggregate", "/api/v1/raw/stream"])
+    def test_tag_filters_are_documented(self, test_client, path):
+        parameters = test_client.get("/openapi.json").json()["paths"][path]["get"]["parameters"]
+
+        names = {p["name"] for p in parameters if p["in"] == "query"}
+        assert {"event", "snssai_sst", "snssai_sd", "dnn", "supi", "gpsi", "ueIpv4Addr"} <= names
+
+    def test_invalid_fields_return_422(self, test_client):
+        influx = MagicMock(spec=InfluxService)
+        influx.stream_raw_data.side_effect = ValueError("Unknown raw fields: ['x']")
+        with patch("src.services.databases.Influx.get_service", return_value=influx):
+            response = test_client.get("/api/v1/raw/stream", params={"start_time": 0, "end_time": 10, "fields": "x"})
+
+        assert response.status_code == 422
+
+
+class TestFastJSONResponse:
+    def test_numpy_values_serialise(self, test_client, mock_clickhouse_service, sample_row):
+        import numpy as np
+
+        mock_clickhouse_service.query_processed_async.return_value = [
+            {**sample_row, "sample_count": np.uint32(10), "pdb_ms_mean": np.float64(25.0)}
+        ]
+
+        response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
+
+        assert response.status_code == 200
+        row = response.json()[0]
+        assert row["sample_count"] == 10
+        assert row["window_start"] == "2024-01-01T12:00:00+00:00"
+
+
+class TestConditionalRequests:
+    def test_response_has_etag(self, test_client, mock_clickhouse_service, sample_row):
+        mock_clickhouse_service.processed_validator_async.return_value = (1, sample_row["window_end"])
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
+
+        response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS)
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+        # The page is fetched against the validator the ETag is derived from
+        assert mock_clickhouse_service.query_processed_async.call_args[1]["token"] == (1, sample_row["window_end"])
+
+    def test_matching_if_none_match_skips_the_query(self, test_client, mock_clickhouse_service, sample_row):
+        mock_clickhouse_service.processed_validator_async.return_value = (1, sample_row["window_end"])
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
+        tag = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS).headers["etag"]
+        mock_clickhouse_service.query_processed_async.reset_mock()
+
+        response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS, headers={"If-None-Match": tag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == tag
+        mock_clickhouse_service.query_processed_async.assert_not_called()
+        kwargs = mock_clickhouse_service.processed_validator_async.call_args[1]
+        assert kwargs["snssai_sst"] == "1" and kwargs["dnn"] == "internet"
+
+    def test_new_windows_change_the_etag(self, test_client, mock_clickhouse_service, sample_row):
+        mock_clickhouse_service.processed_validator_async.return_value = (1, sample_row["window_end"])
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
+        tag = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS).headers["etag"]
+
+        mock_clickhouse_service.processed_validator_async.return_value = (2, sample_row["window_end"])
+        response = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS, headers={"If-None-Match": tag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != tag
+
+    def test_etag_depends_on_the_page(self, test_client, mock_clickhouse_service, sample_row):
+        mock_clickhouse_service.processed_validator_async.return_value = (1, sample_row["window_end"])
+        mock_clickhouse_service.query_processed_async.return_value = [sample_row]
+
+        first = test_client.get("/api/v1/processed", params=REQUIRED_PARAMS).headers["etag"]
+        second = test_client.get("/api/v1/processed", params={**REQUIRED_PARAMS, "offset": 100}).headers["etag"]
+
+        assert first != second
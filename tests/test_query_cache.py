@@ -0,0 +1,257 @@
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.metrics import Metrics
+from src.services.query_cache import QueryCache
+
+SETTLED_END = int(time.time()) - 7200
+RECENT_END = int(time.time())
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    Metrics.reset()
+    yield
+    Metrics.reset()
+
+
+def make_cache(**kwargs) -> QueryCache:
+    defaults = dict(max_bytes=1000, settled_after=600, settled_ttl=3600, recent_ttl=5, name="test")
+    return QueryCache(**{**defaults, **kwargs})
+
+
+class TestQueryCache:
+    def test_hit_and_miss_metrics(self):
+        cache = make_cache()
+        load = MagicMock(return_value="rows")
+
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len) == "rows"
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len) == "rows"
+
+        load.assert_called_once()
+        assert Metrics.counter("test.cache.misses") == 1
+        assert Metrics.counter("test.cache.hits") == 1
+
+    def test_settled_ranges_outlive_recent_ones(self):
+        cache = make_cache(recent_ttl=0.05)
+        cache.put("old", "a", 1, "processed", 0, SETTLED_END)
+        cache.put("new", "b", 1, "processed", 0, RECENT_END)
+
+        time.sleep(0.1)
+
+        assert cache.get("old") == "a"
+        assert cache.get("new") is None
+
+    def test_lru_eviction_respects_memory_bound(self):
+        cache = make_cache(max_bytes=10)
+        cache.put("a", "a", 4, "processed", 0, SETTLED_END)
+        cache.put("b", "b", 4, "processed", 0, SETTLED_END)
+        cache.get("a")
+        cache.put("c", "c", 4, "processed", 0, SETTLED_END)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "a"
+        assert cache.nbytes == 8
+        assert Metrics.counter("test.cache.evictions") == 1
+
+    def test_oversized_values_are_not_cached(self):
+        cache = make_cache(max_bytes=10)
+        cache.put("a", "a", 11, "processed", 0, SETTLED_END)
+
+        assert len(cache) == 0
+
+    def test_disabled(self):
+        cache = make_cache(max_bytes=0)
+        load = MagicMock(return_value="rows")
+
+        cache.cached("k", "processed", 0, SETTLED_END, load, len)
+        cache.cached("k", "processed", 0, SETTLED_END, load, len)
+
+        assert load.call_count == 2
+
+    def test_revalidation_reloads_changed_ranges(self):
+        # Another replica wrote into the range: only the validator can tell
+        cache = make_cache(revalidate_after=0.05)
+        load = MagicMock(side_effect=["old", "new"])
+        validate = MagicMock(side_effect=[(1,), (1,), (2,), (2,)])
+
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, validate) == "old"
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, validate) == "old"
+        time.sleep(0.1)
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, validate) == "old"
+        time.sleep(0.1)
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, validate) == "new"
+
+        assert load.call_count == 2
+        assert validate.call_count == 4
+        assert Metrics.counter("test.cache.revalidations") == 1
+
+    def test_entries_are_only_served_for_the_token_they_were_loaded_against(self):
+        # The caller's ETag comes from a fresher validator: the body must match it
+        cache = make_cache()
+        load = MagicMock(side_effect=["old", "new"])
+
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, token=(1,)) == "old"
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, token=(1,)) == "old"
+        assert cache.cached("k", "processed", 0, SETTLED_END, load, len, token=(2,)) == "new"
+
+        assert load.call_count == 2
+        assert Metrics.counter("test.cache.revalidations") == 1
+
+    def test_short_lived_entries_are_not_revalidated(self):
+        cache = make_cache(revalidate_after=30)
+        validate = MagicMock(return_value=(1,))
+
+        cache.cached("k", "processed", 0, RECENT_END, lambda: "rows", len, validate)
+
+        validate.assert_not_called()
+
+    def test_max_ttl_caps_settled_entries(self):
+        cache = make_cache()
+        cache.put("k", "a", 1, "processed", 0, SETTLED_END, max_ttl=0.05)
+
+        time.sleep(0.1)
+
+        assert cache.get("k") is None
+
+    def test_invalidate_overlapping_ranges_of_table(self):
+        cache = make_cache()
+        cache.put("hit", "a", 1, "processed", 100, 200)
+        cache.put("before", "b", 1, "processed", 0, 99)
+        cache.put("other", "c", 1, "decisions", 100, 200)
+
+        assert cache.invalidate("processed", 150, 160) == 1
+
+        assert cache.get("hit") is None
+        assert cache.get("before") == "b"
+        assert cache.get("other") == "c"
+
+    def test_recently_written_ranges_get_short_ttl(self):
+        # Async inserts may not be visible yet: do not pin a stale result for an hour
+        cache = make_cache(recent_ttl=0.05)
+        cache.invalidate("processed", 100, 200)
+        cache.put("k", "a", 1, "processed", 0, 150)
+
+        time.sleep(0.1)
+
+        assert cache.get("k") is None
+
+
+@pytest.fixture
+def mock_clickhouse_client():
+    with patch("clickhouse_connect.get_client") as mock:
+        client = MagicMock()
+        mock.return_value = client
+        yield client
+
+
+def _processed_result():
+    result = MagicMock()
+    result.column_names = ["window_start", "window_end", "event", "metrics"]
+    result.result_columns = [
+        [datetime(2024, 1, 1, 12, tzinfo=timezone.utc)],
+        [datetime(2024, 1, 1, 12, 1, tzinfo=timezone.utc)],
+        ["PERF_DATA"],
+        [{"pdb_ms_mean": 25.0}],
+    ]
+    return result
+
+
+class TestServiceCache:
+    @pytest.fixture
+    def service(self, mock_clickhouse_client):
+        from src.services.clickhouse import ClickHouseService
+
+        service = ClickHouseService(pool_size=1)
+        # Revalidation queries are covered separately; here every query is a data query
+        service.cache.revalidate_after = 0
+        mock_clickhouse_client.query.return_value = _processed_result()
+        return service
+
+    def test_identical_queries_hit_the_database_once(self, service, mock_clickhouse_client):
+        first = service.query_processed(start_time=0, end_time=SETTLED_END, event="PERF_DATA")
+        second = service.query_processed(start_time=0, end_time=SETTLED_END, event="PERF_DATA")
+
+        assert first == second == [{
+            "window_start_time": datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+            "window_end_time": datetime(2024, 1, 1, 12, 1, tzinfo=timezone.utc),
+            "event": "PERF_DATA",
+            "pdb_ms_mean": 25.0,
+        }]
+        assert mock_clickhouse_client.query.call_count == 1
+
+    def test_different_parameters_are_different_keys(self, service, mock_clickhouse_client):
+        service.query_processed(start_time=0, end_time=SETTLED_END, event="PERF_DATA")
+        service.query_processed(start_time=0, end_time=SETTLED_END, event="UE_MOBILITY")
+
+        assert mock_clickhouse_client.query.call_count == 2
+
+    def test_columnar_reads_do_not_alter_the_cached_entry(self, service):
+        columns = service.query_processed_columns(start_time=0, end_time=SETTLED_END)
+        assert columns.names == ["window_start_time", "window_end_time", "event", "pdb_ms_mean"]
+
+        rows = service.query_processed(start_time=0, end_time=SETTLED_END)
+        assert rows[0]["pdb_ms_mean"] == 25.0
+
+    def test_sink_write_invalidates_overlapping_entries(self, service, mock_clickhouse_client):
+        from src.sinks.clickhouse_sink import ClickHouseSink
+
+        service.query_processed(start_time=0, end_time=SETTLED_END)
+        with patch("src.sinks.clickhouse_sink.ClickHouse.get_service", return_value=service):
+            sink = ClickHouseSink(MagicMock())
+        sink.write_batch([{
+            "tags": {"snssai_sst": "1", "dnn": "internet", "event": "PERF_DATA"},
+            "window_start": SETTLED_END - 120,
+            "window_end": SETTLED_END - 60,
+            "sample_count": 3,
+        }])
+        service.query_processed(start_time=0, end_time=SETTLED_END)
+
+        assert mock_clickhouse_client.query.call_count == 2
+
+    def test_decision_batch_invalidates_its_range(self, service):
+        from src.sinks.clickhouse_sink import ClickHouseSink
+
+        service.write_decisions = MagicMock()
+        service.cache.put("hit", "a", 1, "decisions", 0, SETTLED_END)
+        with patch("src.sinks.clickhouse_sink.ClickHouse.get_service", return_value=service):
+            sink = ClickHouseSink(MagicMock())
+
+        assert sink.write_decisions([{"cell_id": 1, "timestamp": datetime.fromtimestamp(SETTLED_END - 60, tz=timezone.utc)}])
+
+        assert service.cache.get("hit") is None
+
+    def test_stale_entries_are_reloaded_after_a_remote_write(self, service, mock_clickhouse_client):
+        service.cache.revalidate_after = 0.05
+        validator = MagicMock()
+        validator.column_names = ["rows", "last"]
+        validator.result_columns = [[1], [datetime(2024, 1, 1, 12, 1, tzinfo=timezone.utc)]]
+        changed = MagicMock()
+        changed.column_names = ["rows", "last"]
+        changed.result_columns = [[2], [datetime(2024, 1, 1, 12, 2, tzinfo=timezone.utc)]]
+        mock_clickhouse_client.query.side_effect = [validator, _processed_result(), changed, changed, _processed_result()]
+
+        service.query_processed(start_time=0, end_time=SETTLED_END)
+        time.sleep(0.1)
+        service.query_processed(start_time=0, end_time=SETTLED_END)
+
+        queries = [call.args[0] for call in mock_clickhouse_client.query.call_args_list]
+        assert [q.startswith("SELECT count()") for q in queries] == [True, False, True, True, False]
+        assert Metrics.counter("clickhouse.cache.revalidations") == 1
+
+    def test_page_matches_the_validator_behind_the_etag(self, service, mock_clickhouse_client):
+        # Validator and page are cached separately; a write seen by a fresh
+        # validator must not be paired with the page cached before it
+        first = service.query_processed(start_time=0, end_time=SETTLED_END, token=(1, None))
+        mock_clickhouse_client.query.return_value = _processed_result()
+        mock_clickhouse_client.query.return_value.result_columns[2] = ["UE_MOBILITY"]
+
+        same = service.query_processed(start_time=0, end_time=SETTLED_END, token=(1, None))
+        fresh = service.query_processed(start_time=0, end_time=SETTLED_END, token=(2, None))
+
+        assert same == first
+        assert fresh[0]["event"] == "UE_MOBILITY"
+        assert mock_clickhouse_client.query.call_count == 2
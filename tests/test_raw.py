@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.metrics import Metrics
+from src.models.raw import Raw, RawEncoder, TagGuard
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    Metrics.reset()
+    yield
+    Metrics.reset()
+
+
+def raw(tags: dict | None = None, **metrics) -> Raw:
+    return Raw(timestamp=1704067200, tags=tags or {}, event="PERF_DATA", metrics=metrics)
+
+
+def line(encoder: RawEncoder, record: Raw) -> str:
+    return encoder.encode(record).to_line_protocol()
+
+
+class TestRawEncoder:
+    def test_without_schema_every_tag_is_a_tag(self):
+        encoder = RawEncoder()
+
+        assert line(encoder, raw({"supi": "imsi-1"}, rsrp=-90)) == (
+            "raw,event=PERF_DATA,supi=imsi-1 rsrp=-90 1704067200000000000"
+        )
+
+    def test_only_configured_tags_become_tags(self):
+        encoder = RawEncoder(tags={"dnn"})
+
+        assert line(encoder, raw({"dnn": "internet", "supi": "imsi-1"}, rsrp=-90)) == (
+            'raw,dnn=internet,event=PERF_DATA,shard=58 rsrp=-90,supi="imsi-1" 1704067200000000000'
+        )
+
+    def test_typed_fields_are_converted(self):
+        encoder = RawEncoder(fields={"cell": int, "active": bool, "seen": datetime, "rsrp": float})
+        seen = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        fields = encoder.encode(raw(cell="7", active="true", seen=seen, rsrp=-90, extra={"a": 1}))._fields
+
+        assert fields == {
+            "cell": 7.0, "active": 1.0, "seen": "2024-01-01T00:00:00+00:00", "rsrp": -90.0, "extra": '{"a": 1}',
+        }
+        # Numbers stay floats whatever their schema type, as untyped ones always were
+        assert isinstance(fields["cell"], float) and isinstance(fields["active"], float)
+
+    def test_unconvertible_value_is_dropped(self):
+        encoder = RawEncoder(fields={"cell": int})
+
+        assert encoder.encode(raw(cell="north", rsrp=-90))._fields == {"rsrp": -90.0}
+        assert encoder.encode(raw(cell=7.5, rsrp=-90))._fields == {"rsrp": -90.0}
+        assert Metrics.counter("raw.fields.invalid") == 2
+
+    @pytest.mark.parametrize("overflow, expected", [
+        ("field", 'raw,event=PERF_DATA,shard=41 rsrp=-90,supi="imsi-3" 1704067200000000000'),
+        ("drop", "raw,event=PERF_DATA,shard=41 rsrp=-90 1704067200000000000"),
+    ])
+    def test_tag_past_threshold_is_demoted(self, overflow, expected):
+        encoder = RawEncoder(max_tag_values=2, overflow=overflow)
+        for supi in ("imsi-1", "imsi-2", "imsi-1"):
+            assert f",supi={supi} " in line(encoder, raw({"supi": supi}, rsrp=-90))
+
+        assert line(encoder, raw({"supi": "imsi-3"}, rsrp=-90)) == expected
+        # Known values are demoted as well: the key stays off the series key
+        series_key = line(encoder, raw({"supi": "imsi-1"}, rsrp=-90)).split(" ")[0]
+        assert series_key == "raw,event=PERF_DATA,shard=58"
+        assert Metrics.counter("raw.tags.overflowed") == 1
+
+    def test_same_timestamp_points_of_untagged_ues_stay_apart(self):
+        # Same series and timestamp would make InfluxDB keep only the last point
+        encoder = RawEncoder(tags={"dnn"})
+        records = [raw({"dnn": "internet", "supi": f"imsi-{i}"}, rsrp=-90) for i in range(1, 4)]
+
+        series_keys = {line(encoder, record).split(" ")[0] for record in records}
+
+        assert len(series_keys) == 3
+        # Bounded: one series per shard at most, and the same UE keeps its shard
+        assert line(encoder, records[0]) == line(encoder, records[0])
+        assert all(0 <= int(key.split("shard=")[1]) < 64 for key in series_keys)
+
+    def test_shards_can_be_disabled(self):
+        encoder = RawEncoder(tags={"dnn"}, shards=0)
+
+        assert "shard=" not in line(encoder, raw({"dnn": "internet", "supi": "imsi-1"}, rsrp=-90))
+
+    def test_points_with_every_tag_kept_get_no_shard(self):
+        encoder = RawEncoder(tags={"dnn", "supi"})
+
+        assert line(encoder, raw({"dnn": "internet", "supi": "imsi-1"}, rsrp=-90)).startswith(
+            "raw,dnn=internet,event=PERF_DATA,supi=imsi-1 "
+        )
+
+
+class TestTagGuard:
+    def test_memory_is_released_on_overflow(self):
+        guard = TagGuard(max_values=1)
+
+        assert guard.admit("supi", "a")
+        assert not guard.admit("supi", "b")
+        assert guard.overflowing == {"supi"}
+        assert guard._values == {}
+        assert guard.admit("dnn", "internet")
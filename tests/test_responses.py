@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+import orjson
+
+from src.responses import dumps
+
+
+class TestDumps:
+    def test_datetimes_numpy_and_bytes(self):
+        body = orjson.loads(dumps({
+            "t": datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+            "naive": datetime(2024, 1, 1, 12),
+            "arr": np.array([1.5, 2.5]),
+            "scalar": np.float32(0.5),
+            "blob": b"\x00\x01",
+            "dec": Decimal("1.25"),
+            1: "non-str key",
+        }))
+
+        assert body == {
+            "t": "2024-01-01T12:00:00+00:00",
+            "naive": "2024-01-01T12:00:00",
+            "arr": [1.5, 2.5],
+            "scalar": 0.5,
+            "blob": "AAE=",
+            "dec": 1.25,
+            "1": "non-str key",
+        }
+
+
+class TestConditional:
+    def _request(self, query: str = "", if_none_match: str | None = None):
+        from starlette.requests import Request
+
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        return Request({"type": "http", "path": "/", "query_string": query.encode(), "headers": headers})
+
+    def test_weak_comparison(self):
+        from src.responses import etag, is_not_modified
+
+        tag = etag(self._request("a=1"), (1, datetime(2024, 1, 1)))
+
+        assert tag.startswith('W/"')
+        assert is_not_modified(self._request(if_none_match=tag), tag)
+        assert is_not_modified(self._request(if_none_match=tag.removeprefix("W/")), tag)
+        assert is_not_modified(self._request(if_none_match="*"), tag)
+        assert not is_not_modified(self._request(if_none_match='W/"other"'), tag)
+        assert not is_not_modified(self._request(), tag)
+
+
+class TestCancelOnDisconnect:
+    @staticmethod
+    def _request(messages: list[dict]):
+        import asyncio
+
+        from starlette.requests import Request
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        return Request({"type": "http", "path": "/", "query_string": b"", "headers": []}, receive)
+
+    @pytest.mark.asyncio
+    async def test_returns_result(self):
+        from src.responses import cancel_on_disconnect
+
+        async def work():
+            return "rows"
+
+        request = self._request([{"type": "http.request", "body": b"", "more_body": False}])
+        assert await cancel_on_disconnect(request, work()) == "rows"
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_the_work(self):
+        import asyncio
+
+        from src.responses import ClientDisconnected, cancel_on_disconnect
+
+        cancelled = False
+
+        async def work():
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        request = self._request([
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        ])
+        with pytest.raises(ClientDisconnected):
+            await asyncio.wait_for(cancel_on_disconnect(request, work()), 1)
+        assert cancelled
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.metrics import Metrics
+from src.services.single_flight import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    Metrics.reset()
+    yield
+    Metrics.reset()
+
+
+def slow(result, started: threading.Event | None = None, delay: float = 0.1):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if started:
+            started.set()
+        time.sleep(delay)
+        return result
+
+    return fn, calls
+
+
+class TestSingleFlight:
+    def test_concurrent_sync_calls_share_one_execution(self):
+        flight = SingleFlight(name="test")
+        fn, calls = slow(["row"])
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(lambda _: flight.do("q", fn), range(20)))
+
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert Metrics.counter("test.singleflight.coalesced") == 19
+
+    def test_exception_reaches_every_waiter(self):
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("q", fail)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2 and errors[0] is errors[1]
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        fn, calls = slow("x", delay=0)
+
+        flight.do("q", fn)
+        flight.do("q", fn)
+
+        assert len(calls) == 2
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+        fn, calls = slow("x", delay=0.05)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda key: flight.do(key, fn), ["a", "b"]))
+
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_async_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def query():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "rows"
+
+        results = await asyncio.gather(*(flight.do_async("q", query) for _ in range(10)))
+
+        assert results == ["rows"] * 10
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_async_callers_join_a_sync_call_in_flight(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        fn, calls = slow("rows", started)
+
+        thread = threading.Thread(target=flight.do, args=("q", fn))
+        thread.start()
+        await asyncio.to_thread(started.wait)
+
+        assert await flight.do_async("q", fn) == "rows"
+        thread.join()
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_blocking_fn_runs_off_the_event_loop(self):
+        flight = SingleFlight()
+        fn, calls = slow("rows")
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        assert await flight.do_async("q", fn) == "rows"
+        task.cancel()
+
+        assert ticks > 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_fail_followers(self):
+        flight = SingleFlight()
+
+        async def query():
+            await asyncio.sleep(0.05)
+            return "rows"
+
+        leader = asyncio.create_task(flight.do_async("q", query))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("q", query))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "rows"
+
+    @pytest.mark.asyncio
+    async def test_call_is_cancelled_when_every_caller_is(self):
+        flight = SingleFlight(name="test")
+        cancelled = asyncio.Event()
+
+        async def query():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(flight.do_async("q", query)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert Metrics.counter("test.singleflight.abandoned") == 1
+        # The next caller starts a fresh call
+        assert await asyncio.wait_for(flight.do_async("q", lambda: "rows"), 1) == "rows"
+
+
+def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+class TestServiceCoalescing:
+    """The leader's query is held until every other caller has joined it."""
+
+    def test_concurrent_processed_queries_share_one_database_call(self):
+        from src.services.clickhouse import ClickHouseService
+
+        result = MagicMock()
+        result.column_names = ["event"]
+        result.result_columns = [["PERF_DATA"]]
+        release = threading.Event()
+
+        def query(*args, **kwargs):
+            assert release.wait(5)
+            return result
+
+        with patch("clickhouse_connect.get_client") as get_client:
+            get_client.return_value.query.side_effect = query
+            service = ClickHouseService(pool_size=0)
+            service.cache.max_bytes = 0
+
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                futures = [
+                    executor.submit(service.query_processed, start_time=0, end_time=60) for _ in range(20)
+                ]
+                wait_until(lambda: Metrics.counter("clickhouse.singleflight.coalesced") == 19)
+                release.set()
+                rows = [future.result() for future in futures]
+
+        assert rows == [[{"event": "PERF_DATA"}]] * 20
+        assert get_client.return_value.query.call_count == 1
+
+    def test_concurrent_raw_queries_share_one_database_call(self):
+        from src.services.influx import InfluxService
+
+        service = InfluxService()
+        service.query_api = MagicMock()
+        release = threading.Event()
+
+        def query(*args, **kwargs):
+            assert release.wait(5)
+            return []
+
+        service.query_api.query_stream.side_effect = query
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [
+                executor.submit(service.query_raw_data, 0, 60, {"event": "PERF_DATA"}) for _ in range(10)
+            ]
+            wait_until(lambda: Metrics.counter("influx.singleflight.coalesced") == 9)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert results == [([], None)] * 10
+        assert service.query_api.query_stream.call_count == 1
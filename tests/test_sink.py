@@ -17,6 +17,7 @@ def mock_influx_sink(mock_logger):
         instance = mock.return_value
         instance.write = MagicMock(return_value=True)
         instance.write_batch = MagicMock(return_value=True)
+        instance.take_failed = MagicMock(return_value=0)
         yield instance
 
 
@@ -27,6 +28,7 @@ def mock_clickhouse_sink(mock_logger):
         instance = mock.return_value
         instance.write = MagicMock(return_value=True)
         instance.write_batch = MagicMock(return_value=True)
+        instance.write_decisions = MagicMock(return_value=True)
         yield instance
 
 
@@ -261,3 +263,72 @@ class TestKafkaSinkManager:
         assert len(batch) == 2
         assert batch[0]["datarate"] == 100
         assert batch[1]["datarate"] == 200
+
+    def test_route_decision_stores_binary_payload(self, kafka_sink_manager):
+        """Decisions are written as decoded bytes, not base64 text."""
+        import base64
+        import gzip
+
+        document = {"cell_id": 5, "timestamp": "2024-01-01T12:00:00Z"}
+        payload = gzip.compress(json.dumps(document).encode())
+        test_data = {
+            "topic": "network.decisions",
+            "content": json.dumps({"compression": "gzip", "data": base64.b64encode(payload).decode()}),
+        }
+
+        service = MagicMock()
+        service.conf.decision_codec = "gzip"
+        service.conf.decision_zstd_level = 3
+        with patch("src.services.databases.ClickHouse.get_service", return_value=service):
+            kafka_sink_manager.route_message(test_data)
+        kafka_sink_manager._flush_decisions()
+
+        decision = kafka_sink_manager.clickhouse_sink.write_decisions.call_args[0][0][0]
+        assert decision["cell_id"] == 5
+        assert decision["compression_method"] == "gzip"
+        assert decision["compressed_data"] == payload
+
+    def test_decisions_are_batched(self, kafka_sink_manager, mock_clickhouse_sink):
+        """Decisions are buffered and inserted together, not one insert per message."""
+        import base64
+        import gzip
+
+        service = MagicMock()
+        service.conf.decision_codec = "gzip"
+        service.conf.decision_zstd_level = 3
+        with patch("src.services.databases.ClickHouse.get_service", return_value=service):
+            for cell in (1, 2, 3):
+                payload = gzip.compress(json.dumps({"cell_id": cell, "timestamp": "2024-01-01T12:00:00Z"}).encode())
+                kafka_sink_manager.route_message({
+                    "topic": "network.decisions",
+                    "content": json.dumps({"compression": "gzip", "data": base64.b64encode(payload).decode()}),
+                })
+        kafka_sink_manager._flush_decisions()
+
+        batches = [c[0][0] for c in mock_clickhouse_sink.write_decisions.call_args_list]
+        assert [d["cell_id"] for batch in batches for d in batch] == [1, 2, 3]
+        assert len(batches) < 3
+        service.write_decision.assert_not_called()
+
+    def test_route_message_counts_tag_cardinality(self, kafka_sink_manager):
+        """Raw and processed tags are counted per topic as they are routed."""
+        raw = [{"event": "PERF_DATA", "tags": {"supi": f"imsi-{i}"}, "metrics": {}} for i in range(3)]
+        kafka_sink_manager.route_message({"topic": "network.data.ingested", "content": json.dumps(raw)})
+        kafka_sink_manager.route_message({
+            "topic": "network.data.processed",
+            "content": json.dumps({"tags": {"dnn": "internet"}, "sample_count": 1}),
+        })
+
+        estimates = kafka_sink_manager.cardinality.estimates()
+        window = next(iter(estimates["network.data.ingested"]["supi"]))
+        assert estimates["network.data.ingested"]["supi"][window] == 3
+        assert estimates["network.data.ingested"]["event"][window] == 1
+        assert estimates["network.data.processed"]["dnn"][window] == 1
+
+    def test_flush_reports_records_rejected_after_queuing(self, kafka_sink_manager, mock_influx_sink):
+        """Failures reported by the batching write callbacks reach the next flush."""
+        mock_influx_sink.take_failed.return_value = 3
+
+        kafka_sink_manager._flush_influx()
+
+        assert kafka_sink_manager.influx_failed == 3